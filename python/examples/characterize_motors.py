@@ -0,0 +1,33 @@
+import time
+from XRPcustom.defaults import *
+from XRPcustom.feedforward import characterize, save_constants
+
+# Measures feedforward constants of the drive motors and saves them to feedforward.json.
+# After that, XRPcustom.defaults uses them automatically for drivetrain.set_speed()
+
+RED = (32,0,0)
+GREEN = (0,32,0)
+
+display.clear()
+display.set_leds(RED)
+display.write_line(1,'Motor characterization', fg = display.CYAN)
+display.write_line(3,'Raise the robot so the\nwheels spin freely')
+display.write_line(5,'Press any button\n to start')
+display.wait_for_button()
+display.set_leds(GREEN)
+
+constants = {}
+display.clear()
+display.write_line(1, "Left motor...")
+constants["left"] = characterize(left_motor)
+display.write_line(2, "Right motor...")
+constants["right"] = characterize(right_motor)
+save_constants(constants)
+
+display.set_leds(RED)
+display.clear()
+for line, name in ((1, "left"), (3, "right")):
+    c = constants[name]
+    print(name, c)
+    display.write_line(line, f"{name}: ks={c['ks']:.3f}\n kv={c['kv']:.4f} ka={c['ka']:.5f}")
+display.write_line(6, "Saved", fg=display.GREEN)
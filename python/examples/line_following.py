@@ -1,5 +1,6 @@
 import time
 from XRPcustom.defaults import *
+from XRPcustom.rate_loop import RateLoop
    
 
 # LED colors. These can't be used for display colors - those use different format!!
@@ -32,6 +33,9 @@ speed = 20
 Kp = 6
 # position of white line 
 error = 0
+# run the loop every 10 ms
+loop = RateLoop(0.01)
+loop.start()
 while not linearray.all_black():
     
     #drivetrain.set_effort(speed-Kp*error, speed+Kp*error)
@@ -41,5 +45,8 @@ while not linearray.all_black():
     pos=linearray.line_pos()
     error = (pos-50)/50 # ranges from -1 (line all the way to the right)
                         # to 1 (line all the way to the left )
+    loop.wait()
 
 drivetrain.stop()
+# check that the loop kept up with its 10 ms period
+loop.print_stats()
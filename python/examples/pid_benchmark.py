@@ -0,0 +1,30 @@
+import sys
+import gc
+import time
+# Allow running on a host MicroPython (unix port) from the python/ folder
+sys.path.append("lib")
+sys.path.append("XRP-default-software")
+from XRPcustom.pid import PID, FixedRatePID
+
+"""
+Measures the time (in us) and memory allocated per PID update.
+Runs on the robot, or on a host MicroPython: micropython examples/pid_benchmark.py
+"""
+
+N = 2000
+
+def bench(name, update, error):
+    gc.collect()
+    alloc_before = gc.mem_alloc()
+    start = time.ticks_us()
+    for _ in range(N):
+        update(error)
+    elapsed = time.ticks_diff(time.ticks_us(), start)
+    allocated = gc.mem_alloc() - alloc_before
+    print(f"{name:28s} {elapsed / N:8.2f} us/update {allocated / N:8.1f} bytes/update")
+
+pid = PID(kp=0.035, ki=0.03, max_integral=50)
+fixed = FixedRatePID(kp=0.035, ki=0.03, dt=0.02, max_integral=50)
+
+bench("PID.update", pid.update, 1.5)
+bench("FixedRatePID.update", fixed.update, 1.5)
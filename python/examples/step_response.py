@@ -0,0 +1,68 @@
+import time
+from array import array
+from XRPcustom.defaults import *
+
+# Measures the step response of the speed control loop of the left motor for several PWM frequencies:
+# rise time (10% to 90%), overshoot and speed ripple once settled.
+# Raise the robot so that the wheels spin freely before running.
+
+PWM_FREQS = (50, 1000, 20000)
+TARGET_RPM = 30     # a slow speed, where PWM frequency matters most
+DURATION = 1.5      # seconds per test
+
+samples = int(DURATION * motor_scheduler.freq)
+speeds = array('f', [0]*samples)
+count = 0
+
+def record():
+    # scheduler listener: runs right after the speed controller, on every tick
+    global count
+    if count < samples:
+        speeds[count] = left_motor.get_speed()
+        count += 1
+
+def analyze():
+    dt = 1 / motor_scheduler.freq
+    rise_start = rise_end = None
+    for i in range(samples):
+        if rise_start is None and speeds[i] >= 0.1*TARGET_RPM:
+            rise_start = i
+        if rise_end is None and speeds[i] >= 0.9*TARGET_RPM:
+            rise_end = i
+            break
+    peak = max(speeds)
+    # ripple: standard deviation over the second half of the test
+    tail = speeds[samples//2:]
+    mean = sum(tail) / len(tail)
+    ripple = (sum((s - mean)**2 for s in tail) / len(tail)) ** 0.5
+    rise = (rise_end - rise_start)*dt if rise_end is not None and rise_start is not None else None
+    return rise, (peak - TARGET_RPM)/TARGET_RPM*100, mean, ripple
+
+display.clear()
+display.write_line(1, 'Step response', fg = display.CYAN)
+display.write_line(3, 'Raise the robot so the\nwheels spin freely')
+display.write_line(5, 'Press any button\n to start')
+display.wait_for_button()
+display.clear()
+
+motor_scheduler.add_listener(record)
+print("pwm_hz  rise_s  overshoot_%  mean_rpm  ripple_rpm")
+line = 1
+for freq in PWM_FREQS:
+    left_motor.set_pwm_freq(freq)
+    left_motor.set_speed(0)
+    time.sleep(1)
+    left_motor.speedController.clear_history()
+    count = 0
+    left_motor.set_speed(TARGET_RPM)
+    while count < samples:
+        time.sleep(0.05)
+    left_motor.set_speed(0)
+    rise, overshoot, mean, ripple = analyze()
+    rise_text = f"{rise:6.3f}" if rise is not None else "   n/a"
+    print(f"{freq:6d}  {rise_text}  {overshoot:11.1f}  {mean:8.1f}  {ripple:10.2f}")
+    display.write_line(line, f"{freq} Hz: rise {rise_text} s\n ripple {ripple:.2f} rpm")
+    line += 2
+
+motor_scheduler.remove_listener(record)
+left_motor.set_pwm_freq(50)
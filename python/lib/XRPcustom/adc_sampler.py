@@ -0,0 +1,126 @@
+from machine import Pin, ADC, Timer
+from array import array
+import micropython
+
+"""
+Background sampling of analog inputs (analog reflectance sensors, battery voltage).
+One timer visits the channels round-robin; each visit reads the channel several times back-to-back
+(oversampling), averages the readings (decimation) and updates a low-pass filtered value.
+All values are kept in preallocated integer arrays, so sampling doesn't allocate memory.
+"""
+
+# Filtered values are stored with this many extra fractional bits
+FILTER_FRACTION_BITS = 4
+
+class AdcSampler:
+
+    _DEFAULT_ADC_SAMPLER_INSTANCE = None
+
+    @classmethod
+    def get_default_adc_sampler(cls):
+        """
+        Get the default ADC sampler instance, shared by the default sensors. This is a singleton, so only one instance will ever exist.
+        """
+        if cls._DEFAULT_ADC_SAMPLER_INSTANCE is None:
+            cls._DEFAULT_ADC_SAMPLER_INSTANCE = cls()
+        return cls._DEFAULT_ADC_SAMPLER_INSTANCE
+
+    def __init__(self, freq: int = 1000, oversample: int = 8, filter_shift: int = 2, max_channels: int = 4):
+        """
+        :param freq: The rate of channel visits, in Hz; each channel is visited freq/(number of channels) times per second
+        :type freq: int
+        :param oversample: The number of ADC readings averaged on every visit
+        :type oversample: int
+        :param filter_shift: The default strength of the low-pass filter: each new value moves the filtered value by 1/2**filter_shift of the difference (0 disables filtering)
+        :type filter_shift: int
+        :param max_channels: The maximal number of channels
+        :type max_channels: int
+        """
+        self.freq = freq
+        self.oversample = oversample
+        self.filter_shift = filter_shift
+        self._adcs = []
+        self._raw = array('i', [0]*max_channels)
+        self._filtered = array('i', [0]*max_channels)
+        self._shifts = array('b', [0]*max_channels)
+        self._next = 0
+        self.samples = 0
+        # Use a virtual timer so we can leave the hardware timers up for the user
+        self._timer = Timer(-1)
+        self._running = False
+
+    def add_channel(self, pin: int|str, filter_shift: int = None) -> int:
+        """
+        Adds an analog input to the sampling rotation, starting the sampling if it is not running yet.
+
+        :param pin: The pin of the analog input
+        :type pin: int|str
+        :param filter_shift: The strength of the low-pass filter for this channel; if None, the default of the sampler
+        :type filter_shift: int
+        :return: The channel number, used to read the values
+        :rtype: int
+        """
+        if len(self._adcs) == len(self._raw):
+            raise ValueError("No free ADC sampler channels")
+        adc = ADC(Pin(pin))
+        # Start the filter from a first reading, so the value is valid right away
+        channel = len(self._adcs)
+        self._raw[channel] = adc.read_u16()
+        self._filtered[channel] = self._raw[channel] << FILTER_FRACTION_BITS
+        self._shifts[channel] = self.filter_shift if filter_shift is None else filter_shift
+        self._adcs.append(adc)
+        if not self._running:
+            self.start()
+        return channel
+
+    def start(self):
+        """
+        Starts (or restarts) background sampling
+        """
+        self._timer.init(freq=self.freq, callback=lambda t: self._tick())
+        self._running = True
+
+    def stop(self):
+        """
+        Stops background sampling; the last values are kept
+        """
+        self._timer.deinit()
+        self._running = False
+
+    @micropython.native
+    def _tick(self):
+        n = len(self._adcs)
+        if n == 0:
+            return
+        i = self._next
+        adc = self._adcs[i]
+        total = 0
+        for _ in range(self.oversample):
+            total += adc.read_u16()
+        value = total // self.oversample
+        self._raw[i] = value
+        f = self._filtered[i]
+        self._filtered[i] = f + (((value << FILTER_FRACTION_BITS) - f) >> self._shifts[i])
+        i += 1
+        if i >= n:
+            i = 0
+        self._next = i
+        self.samples += 1
+
+    def get_raw(self, channel: int) -> int:
+        """
+        :param channel: The channel number
+        :type channel: int
+        :return: The average of the latest oversampled readings, from 0 to 65535
+        :rtype: int
+        """
+        return self._raw[channel]
+
+    def get_value(self, channel: int) -> int:
+        """
+        :param channel: The channel number
+        :type channel: int
+        :return: The low-pass filtered value, from 0 to 65535
+        :rtype: int
+        """
+        return self._filtered[channel] >> FILTER_FRACTION_BITS
@@ -0,0 +1,66 @@
+from .adc_sampler import AdcSampler
+
+"""
+Battery voltage, measured continuously in the background by an AdcSampler.
+"""
+
+# The board divides the battery voltage before the ADC input
+VOLTAGE_DIVIDER = 4.03
+ADC_VOLTS = 3.3 / 65535
+
+class BatteryMonitor:
+
+    _DEFAULT_BATTERY_MONITOR_INSTANCE = None
+
+    @classmethod
+    def get_default_battery_monitor(cls):
+        """
+        Get the default battery monitor instance. This is a singleton, so only one instance will ever exist.
+        """
+        if cls._DEFAULT_BATTERY_MONITOR_INSTANCE is None:
+            cls._DEFAULT_BATTERY_MONITOR_INSTANCE = cls()
+        return cls._DEFAULT_BATTERY_MONITOR_INSTANCE
+
+    def __init__(self, vin_pin: int|str = "BOARD_VIN_MEASURE", nominal_voltage: float = 6.0, sampler: AdcSampler = None):
+        """
+        :param vin_pin: The pin measuring the battery voltage
+        :type vin_pin: int|str
+        :param nominal_voltage: The voltage at which voltage compensation leaves the effort unchanged
+        :type nominal_voltage: float
+        :param sampler: The sampler reading the voltage; by default, the shared ADC sampler
+        :type sampler: AdcSampler
+        """
+        if sampler is None:
+            sampler = AdcSampler.get_default_adc_sampler()
+        self.sampler = sampler
+        self.nominal_voltage = nominal_voltage
+        # Slow filter: motor current makes the voltage ripple
+        self._channel = sampler.add_channel(vin_pin, filter_shift=6)
+        # Below this, the motors are not powered (switch off or no batteries): don't compensate
+        self.min_voltage = 4.0
+        # Never boost the effort more than this
+        self.max_compensation = 1.5
+
+    def get_voltage(self) -> float:
+        """
+        :return: The filtered battery voltage, in volts
+        :rtype: float
+        """
+        return self.sampler.get_value(self._channel) * ADC_VOLTS * VOLTAGE_DIVIDER
+
+    def is_powered(self) -> bool:
+        """
+        :return: If the batteries are connected and the power switch is on
+        :rtype: bool
+        """
+        return self.get_voltage() >= self.min_voltage
+
+    def get_compensation(self) -> float:
+        """
+        :return: The factor to multiply motor efforts by: nominal voltage / battery voltage
+        :rtype: float
+        """
+        voltage = self.get_voltage()
+        if voltage < self.min_voltage:
+            return 1
+        return min(self.nominal_voltage / voltage, self.max_compensation)
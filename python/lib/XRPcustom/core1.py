@@ -0,0 +1,201 @@
+from .motor_scheduler import MotorScheduler
+from .differential_drive import DifferentialDrive
+from .imu import IMU
+from array import array
+import _thread
+import math
+import sys
+import time
+
+"""
+Runs the real-time control work on the second core of the RP2040/RP2350:
+motor speed loops (and everything attached to the motor scheduler, such as odometry)
+and IMU integration. The user program, display and webserver keep core 0 to themselves.
+"""
+
+# Indices of the values in the shared state
+STATE_X = 0
+STATE_Y = 1
+STATE_HEADING = 2
+STATE_LEFT_RPM = 3
+STATE_RIGHT_RPM = 4
+STATE_YAW = 5
+STATE_SIZE = 6
+
+class SharedState:
+    """
+    Values written by one core and read by the other without locks (a sequence lock).
+    The writer makes the sequence counter odd while it updates the values, and even again when done;
+    a reader retries if the counter was odd or changed while it was copying.
+    """
+
+    def __init__(self, size: int):
+        self._values = array('f', [0]*size)
+        self._copy = array('f', [0]*size)
+        self._seq = array('i', [0])
+
+    def begin_write(self):
+        """
+        Writer only: call before changing values
+        """
+        self._seq[0] += 1
+
+    def end_write(self):
+        """
+        Writer only: call after changing values
+        """
+        self._seq[0] += 1
+
+    def read(self, tries: int = 10):
+        """
+        :return: A consistent copy of the values (the array is reused on every call), or None if the writer kept changing them
+        :rtype: array
+        """
+        values = self._values
+        copy = self._copy
+        for _ in range(tries):
+            seq = self._seq[0]
+            if seq & 1:
+                continue
+            for i in range(len(values)):
+                copy[i] = values[i]
+            if self._seq[0] == seq:
+                return copy
+        return None
+
+
+class Core1Loop:
+
+    def __init__(self, drivetrain: DifferentialDrive = None, imu: IMU = None, scheduler: MotorScheduler = None):
+        """
+        Moves the motor control loop ticks and IMU updates from core 0 timers to a loop running on core 1.
+        The drivetrain pose, wheel speeds and IMU yaw are published on every tick through a SharedState.
+
+        :param drivetrain: The drivetrain whose state is published; by default, the default drivetrain
+        :type drivetrain: DifferentialDrive
+        :param imu: The IMU to update; by default, the default IMU. An IMU in data-ready interrupt mode stays on core 0
+        :type imu: IMU
+        :param scheduler: The motor control loop; by default, the shared motor scheduler
+        :type scheduler: MotorScheduler
+        """
+        if drivetrain is None:
+            drivetrain = DifferentialDrive.get_default_differential_drive()
+        if imu is None:
+            imu = IMU.get_default_imu()
+        if scheduler is None:
+            scheduler = MotorScheduler.get_default_motor_scheduler()
+        self.drivetrain = drivetrain
+        self.imu = imu if imu._int1 is None else None
+        self.scheduler = scheduler
+        self.state = SharedState(STATE_SIZE)
+        self.overruns = 0
+        # The exception that stopped the loop, if any
+        self.error = None
+        self._running = False
+        self._stopped = True
+        # True from start() until stop() has moved the work back to the core 0 timers
+        self._started = False
+
+    def start(self):
+        """
+        Starts the loop on core 1; the motor scheduler and IMU timers on core 0 are stopped
+        """
+        if self._running:
+            return
+        self.scheduler.set_external_ticks(True)
+        if self.imu is not None:
+            self.imu.set_external_updates(True)
+        self.overruns = 0
+        self.error = None
+        self._started = True
+        self._running = True
+        self._stopped = False
+        _thread.start_new_thread(self._run, ())
+
+    def stop(self):
+        """
+        Stops the loop on core 1 and moves the work back to the core 0 timers.
+        Also needed after the loop stopped on an exception, which leaves the motors stopped and the timers off
+        """
+        if not self._started:
+            return
+        self._running = False
+        while not self._stopped:
+            time.sleep_ms(1)
+        self._started = False
+        self.scheduler.set_external_ticks(False)
+        if self.imu is not None:
+            self.imu.set_external_updates(False)
+
+    def is_running(self) -> bool:
+        """
+        :return: If the loop is running on core 1. False after an exception stopped it; see error
+        :rtype: bool
+        """
+        return self._running
+
+    def _advance(self, deadline, now, period):
+        deadline = time.ticks_add(deadline, period)
+        if time.ticks_diff(now, deadline) >= 0:
+            # A whole period behind: skip the missed ticks instead of running them in a burst
+            self.overruns += 1
+            deadline = time.ticks_add(now, period)
+        return deadline
+
+    def _run(self):
+        scheduler = self.scheduler
+        imu = self.imu
+        next_tick = time.ticks_us()
+        next_imu = next_tick
+        try:
+            while self._running:
+                now = time.ticks_us()
+                if imu is not None and time.ticks_diff(now, next_imu) >= 0:
+                    imu._update_imu_readings()
+                    next_imu = self._advance(next_imu, now, 1000000 // imu.timer_frequency)
+                if time.ticks_diff(now, next_tick) >= 0:
+                    scheduler._tick()
+                    self._publish()
+                    next_tick = self._advance(next_tick, now, 1000000 // scheduler.freq)
+        except Exception as e:
+            # Nothing updates the motors anymore: don't leave them running at their last effort
+            self.error = e
+            sys.print_exception(e)
+            self.drivetrain.stop()
+        finally:
+            self._running = False
+            self._stopped = True
+
+    def _publish(self):
+        drivetrain = self.drivetrain
+        x, y, theta = drivetrain.odometry._pose
+        state = self.state
+        values = state._values
+        state.begin_write()
+        values[STATE_X] = x
+        values[STATE_Y] = y
+        values[STATE_HEADING] = math.degrees(theta)
+        values[STATE_LEFT_RPM] = drivetrain.left_motor.get_speed()
+        values[STATE_RIGHT_RPM] = drivetrain.right_motor.get_speed()
+        values[STATE_YAW] = drivetrain.imu.get_yaw() if drivetrain.imu is not None else 0
+        state.end_write()
+
+    def get_state(self):
+        """
+        A consistent snapshot of the published state, indexed by STATE_X, STATE_Y, STATE_HEADING (degrees),
+        STATE_LEFT_RPM, STATE_RIGHT_RPM and STATE_YAW. The returned array is reused on every call.
+
+        :return: The state, or None if it could not be read (the writer kept changing it)
+        :rtype: array
+        """
+        return self.state.read()
+
+    def get_pose(self):
+        """
+        :return: The pose published by core 1: x and y in cm, and the heading in degrees
+        :rtype: tuple<float>
+        """
+        values = self.state.read()
+        if values is None:
+            return self.drivetrain.get_pose()
+        return values[STATE_X], values[STATE_Y], values[STATE_HEADING]
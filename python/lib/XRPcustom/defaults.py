@@ -1,16 +1,19 @@
 from XRPLib.board import Board
 # note: this is where se are using our own drivetrain, not XRPLib one 
 from .differential_drive import DifferentialDrive 
-from XRPLib.motor import SinglePWMMotor, DualPWMMotor
-from XRPLib.encoder import Encoder
-from XRPLib.encoded_motor import EncodedMotor
-from XRPLib.rangefinder import Rangefinder
-from XRPLib.imu import IMU
-from XRPLib.reflectance import Reflectance
-from XRPLib.servo import Servo
+from .motor import SinglePWMMotor, DualPWMMotor
+from .encoder import Encoder
+from .encoded_motor import EncodedMotor
+from .motor_scheduler import MotorScheduler
+from .rangefinder import Rangefinder
+from .imu import IMU
+from .reflectance import Reflectance
+from .servo import Servo
 from XRPLib.webserver import Webserver
 from .xrpdisplay import XrpDisplay
 from .linearray import LineArray
+from .feedforward import apply_saved_constants
+from .battery import BatteryMonitor
 from machine import Pin, I2C
 
 """
@@ -22,10 +25,12 @@ left_motor = EncodedMotor.get_default_encoded_motor(index=1)
 right_motor = EncodedMotor.get_default_encoded_motor(index=2)
 motor_three = EncodedMotor.get_default_encoded_motor(index=3)
 motor_four = EncodedMotor.get_default_encoded_motor(index=4)
+motor_scheduler = MotorScheduler.get_default_motor_scheduler()
 imu = IMU.get_default_imu()
 drivetrain = DifferentialDrive.get_default_differential_drive()
 rangefinder = Rangefinder.get_default_rangefinder()
 reflectance = Reflectance.get_default_reflectance()
+battery = BatteryMonitor.get_default_battery_monitor()
 servo_one = Servo.get_default_servo(index=1)
 servo_two = Servo.get_default_servo(index=2)
 webserver = Webserver.get_default_webserver()
@@ -35,6 +40,8 @@ linearray = LineArray(i2c)
 display = XrpDisplay()
 
 drivetrain.set_zero_effort_behavior(True) # set motors to brake when effort is zero, rather than coasting. 
+# use feedforward speed control if the drive motors were characterized (see examples/characterize_motors.py)
+apply_saved_constants({"left": left_motor, "right": right_motor})
 
 if hasattr(Pin.board, "SERVO_3"):
     servo_three = Servo.get_default_servo(index=3)
@@ -1,8 +1,12 @@
-from XRPLib.encoded_motor import EncodedMotor
-from XRPLib.imu import IMU
+from .encoded_motor import EncodedMotor
+from .imu import IMU
 from XRPLib.controller import Controller
-from XRPLib.pid import PID
-from XRPLib.timeout import Timeout
+from .motion_profile import MotionProfile, TrapezoidalProfile, SCurveProfile
+from .odometry import Odometry
+from .drive_commands import DriveCommand, StraightCommand, TurnCommand, ProfiledStraightCommand, ProfiledTurnCommand, ArcCommand
+from .motion_queue import QueueCommand
+from .pure_pursuit import PurePursuitCommand
+from .rate_loop import RateLoop
 import time
 import math
 
@@ -50,6 +54,11 @@ class DifferentialDrive:
         self.wheel_diam = wheel_diam
         self.track_width = wheel_track
 
+        # Pose tracking, updated in the background by the motor control loop
+        self.odometry = Odometry(left_motor, right_motor, wheel_diam, wheel_track, imu)
+        # Paces the blocking motions (straight, turn, ...); its statistics show if the loop keeps up
+        self.control_loop = RateLoop(0.01)
+
     def set_effort(self, left_effort: float, right_effort: float) -> None:
         """
         Set the raw effort of both motors individually
@@ -63,7 +72,7 @@ class DifferentialDrive:
         self.left_motor.set_effort(left_effort)
         self.right_motor.set_effort(right_effort)
 
-    def set_speed(self, left_speed: float, right_speed: float) -> None:
+    def set_speed(self, left_speed: float, right_speed: float, left_acceleration: float = 0, right_acceleration: float = 0) -> None:
         """
         Set the speed of both motors individually
 
@@ -71,11 +80,45 @@ class DifferentialDrive:
         :type leftSpeed: float
         :param rightSpeed: The speed (In Centimeters per Second) to set the right motor to.
         :type rightSpeed: float
+        :param left_acceleration: The target acceleration of the left wheel (cm/s^2), used for feedforward speed control
+        :type left_acceleration: float
+        :param right_acceleration: The target acceleration of the right wheel (cm/s^2), used for feedforward speed control
+        :type right_acceleration: float
         """
         # Convert from cm/s to RPM
         cmpsToRPM = 60 / (math.pi * self.wheel_diam)
-        self.left_motor.set_speed(left_speed*cmpsToRPM)
-        self.right_motor.set_speed(right_speed*cmpsToRPM)
+        self.left_motor.set_speed(left_speed*cmpsToRPM, left_acceleration*cmpsToRPM)
+        self.right_motor.set_speed(right_speed*cmpsToRPM, right_acceleration*cmpsToRPM)
+
+    def wheel_speeds(self, speed: float, curvature: float):
+        """
+        Splits the speed of the center of the robot into the wheel speeds for driving along a curve
+
+        :param speed: The speed of the center of the robot (cm/s); the same conversion applies to accelerations
+        :type speed: float
+        :param curvature: The curvature of the path (1/cm): 1/radius, positive for turning left, 0 for straight
+        :type curvature: float
+        :return: The left and right wheel speeds
+        :rtype: tuple<float>
+        """
+        difference = speed*curvature*self.track_width/2
+        return speed - difference, speed + difference
+
+    def curvature_drive(self, speed: float, curvature: float, acceleration: float = 0) -> None:
+        """
+        Drives along a curve of the given curvature, with speed control of both wheels.
+        Like set_speed(), it returns immediately; call it periodically to steer (e.g. from a path follower).
+
+        :param speed: The speed of the center of the robot (cm/s); negative to drive backwards
+        :type speed: float
+        :param curvature: The curvature of the path (1/cm): 1/radius, positive for turning left, 0 for straight
+        :type curvature: float
+        :param acceleration: The target acceleration of the center of the robot (cm/s^2), used for feedforward speed control
+        :type acceleration: float
+        """
+        left_speed, right_speed = self.wheel_speeds(speed, curvature)
+        left_acceleration, right_acceleration = self.wheel_speeds(acceleration, curvature)
+        self.set_speed(left_speed, right_speed, left_acceleration, right_acceleration)
 
     def set_zero_effort_behavior(self, brake_at_zero_effort):
 
@@ -87,6 +130,16 @@ class DifferentialDrive:
         self.left_motor.set_zero_effort_behavior(brake_at_zero_effort)
         self.right_motor.set_zero_effort_behavior(brake_at_zero_effort)
 
+    def set_voltage_compensation(self, battery):
+        """
+        Enables or disables battery voltage compensation of both motors
+
+        :param battery: The battery monitor to compensate with, or None to disable compensation
+        :type battery: BatteryMonitor
+        """
+        self.left_motor.set_voltage_compensation(battery)
+        self.right_motor.set_voltage_compensation(battery)
+
     def stop(self) -> None:
         """
         Stops both drivetrain motors by setting power to zero.
@@ -120,6 +173,33 @@ class DifferentialDrive:
         self.left_motor.reset_encoder_position()
         self.right_motor.reset_encoder_position()
 
+    def get_pose(self):
+        """
+        :return: The current pose of the robot: x and y in cm, and the heading in degrees.
+            The robot starts at (0, 0), facing along the x axis; positive heading is counterclockwise.
+        :rtype: tuple<float>
+        """
+        return self.odometry.get_pose()
+
+    def set_pose(self, x: float, y: float, heading: float) -> None:
+        """
+        Sets the current pose of the robot
+
+        :param x: The x coordinate, in cm
+        :type x: float
+        :param y: The y coordinate, in cm
+        :type y: float
+        :param heading: The heading, in degrees
+        :type heading: float
+        """
+        self.odometry.set_pose(x, y, heading)
+
+    def reset_pose(self) -> None:
+        """
+        Resets the pose of the robot to (0, 0), heading 0
+        """
+        self.odometry.reset()
+
     def get_left_encoder_position(self) -> float:
         """
         :return: the current position of the left motor's encoder in cm.
@@ -135,7 +215,65 @@ class DifferentialDrive:
         return self.right_motor.get_position()*math.pi*self.wheel_diam
 
 
-    def straight(self, distance: float, max_effort: float = 0.5, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None) -> bool:
+    def run_command(self, command: DriveCommand) -> bool:
+        """
+        Runs a drive command until it finishes, blocking the program
+
+        :param command: The command to run
+        :type command: DriveCommand
+        :return: if the command reached its target before the timeout
+        :rtype: bool
+        """
+        command.start()
+        self.control_loop.start()
+        while not command.step():
+            self.control_loop.wait()
+        command.finish()
+        return command.result
+
+    async def run_command_async(self, command: DriveCommand) -> bool:
+        """
+        Runs a drive command from an asyncio task, yielding to other tasks between control updates.
+        If the task is cancelled (e.g. when an obstacle appears), the robot stops and CancelledError is raised.
+
+        :param command: The command to run
+        :type command: DriveCommand
+        :return: if the command reached its target before the timeout
+        :rtype: bool
+        """
+        loop = RateLoop(0.01)
+        command.start()
+        loop.start()
+        try:
+            while not command.step():
+                await loop.wait_async()
+        finally:
+            command.finish()
+        return command.result
+
+    def _straight_command(self, distance, max_effort, timeout, main_controller, secondary_controller, max_speed, max_acceleration, max_jerk):
+        if max_speed is None:
+            return StraightCommand(self, distance, max_effort, timeout, main_controller, secondary_controller)
+        if max_effort < 0:
+            distance *= -1
+        if max_jerk is None:
+            profile = TrapezoidalProfile(distance, max_speed, max_acceleration)
+        else:
+            profile = SCurveProfile(distance, max_speed, max_acceleration, max_jerk)
+        return ProfiledStraightCommand(self, profile, timeout, main_controller, secondary_controller)
+
+    def _turn_command(self, turn_degrees, max_effort, timeout, main_controller, secondary_controller, use_imu, max_speed, max_acceleration, max_jerk, tolerance):
+        if max_speed is None:
+            return TurnCommand(self, turn_degrees, max_effort, timeout, main_controller, secondary_controller, use_imu, tolerance)
+        if max_effort < 0:
+            turn_degrees *= -1
+        if max_jerk is None:
+            profile = TrapezoidalProfile(turn_degrees, max_speed, max_acceleration)
+        else:
+            profile = SCurveProfile(turn_degrees, max_speed, max_acceleration, max_jerk)
+        return ProfiledTurnCommand(self, profile, timeout, main_controller, secondary_controller, use_imu, tolerance)
+
+    def straight(self, distance: float, max_effort: float = 0.5, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None, max_speed: float = None, max_acceleration: float = 50, max_jerk: float = None) -> bool:
         """
         Go forward the specified distance in centimeters, and exit function when distance has been reached.
         Max_effort is bounded from -1 (reverse at full speed) to 1 (forward at full speed)
@@ -150,76 +288,25 @@ class DifferentialDrive:
         :type main_controller: Controller
         :param secondary_controller: The secondary controller, for correcting heading error that may result during the drive.
         :type secondary_controller: Controller
+        :param max_speed: If given, the robot follows a motion profile with this cruise speed (cm/s) instead of using max_effort; see profiled_straight()
+        :type max_speed: float
+        :param max_acceleration: The acceleration of the motion profile (cm/s^2)
+        :type max_acceleration: float
+        :param max_jerk: If given, a jerk-limited (S-curve) profile is used instead of a trapezoidal one (cm/s^3)
+        :type max_jerk: float
         :return: if the distance was reached before the timeout
         :rtype: bool
         """
-        # ensure effort is always positive while distance could be either positive or negative
-        if max_effort < 0:
-            max_effort *= -1
-            distance *= -1
-
-        time_out = Timeout(timeout)
-        starting_left = self.get_left_encoder_position()
-        starting_right = self.get_right_encoder_position()
-
-
-        if main_controller is None:
-            main_controller = PID(
-                kp = 0.1,
-                ki = 0.04,
-                kd = 0.04,
-                min_output = 0.15,
-                max_output = max_effort,
-                max_integral = 10,
-                tolerance = 0.25,
-                tolerance_count = 3,
-            )
-
-        # Secondary controller to keep encoder values in sync
-        if secondary_controller is None:
-            secondary_controller = PID(
-                kp = 0.009, kd=0.0005,
-            )
-
-        if self.imu is not None:
-            # record current heading to maintain it
-            initial_heading = self.imu.get_yaw()
-        else:
-            initial_heading = 0
-
-        while True:
-
-            # calculate the distance traveled
-            left_delta = self.get_left_encoder_position() - starting_left
-            right_delta = self.get_right_encoder_position() - starting_right
-            dist_traveled = (left_delta + right_delta) / 2
-
-            # PID for distance
-            distance_error = distance - dist_traveled
-            effort = main_controller.update(distance_error)
-            
-            if main_controller.is_done() or time_out.is_done():
-                break
-
-            # calculate heading correction
-            if self.imu is not None:
-                # record current heading to maintain it
-                current_heading = self.imu.get_yaw()
-            else:
-                current_heading = ((right_delta-left_delta)/2)*360/(self.track_width*math.pi)
-
-            headingCorrection = secondary_controller.update(initial_heading - current_heading)
-            
-            self.set_effort(effort - headingCorrection, effort + headingCorrection)
-
-            time.sleep(0.01)
-
-        self.stop()
-
-        return not time_out.is_done()
+        return self.run_command(self._straight_command(distance, max_effort, timeout, main_controller, secondary_controller, max_speed, max_acceleration, max_jerk))
 
+    async def straight_async(self, distance: float, max_effort: float = 0.5, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None, max_speed: float = None, max_acceleration: float = 50, max_jerk: float = None) -> bool:
+        """
+        Same as straight(), but for use in asyncio tasks: await drivetrain.straight_async(...)
+        Other tasks keep running while the robot moves; cancelling the task stops the robot.
+        """
+        return await self.run_command_async(self._straight_command(distance, max_effort, timeout, main_controller, secondary_controller, max_speed, max_acceleration, max_jerk))
 
-    def turn(self, turn_degrees: float, max_effort: float = 0.5, timeout: float = 1.5, main_controller: Controller = None, secondary_controller: Controller = None, use_imu:bool = True) -> bool:
+    def turn(self, turn_degrees: float, max_effort: float = 0.5, timeout: float = 1.5, main_controller: Controller = None, secondary_controller: Controller = None, use_imu:bool = True, max_speed: float = None, max_acceleration: float = 360, max_jerk: float = None, tolerance: float = 2) -> bool:
         """
         Turn the robot some relative heading given in turnDegrees, and exit function when the robot has reached that heading.
         effort is bounded from -1 (turn counterclockwise the relative heading at full speed) to 1 (turn clockwise the relative heading at full speed)
@@ -237,67 +324,156 @@ class DifferentialDrive:
         :type secondary_controller: Controller
         :param use_imu: A boolean flag that changes if the main controller bases its movement off of the imu (True) or the encoders (False)
         :type use_imu: bool
+        :param max_speed: If given, the robot follows a motion profile with this turn rate (degrees/s) instead of using max_effort; see profiled_turn()
+        :type max_speed: float
+        :param max_acceleration: The angular acceleration of the motion profile (degrees/s^2)
+        :type max_acceleration: float
+        :param max_jerk: If given, a jerk-limited (S-curve) profile is used instead of a trapezoidal one (degrees/s^3)
+        :type max_jerk: float
+        :param tolerance: How close to the target heading the turn ends (In Degrees). Only used by the default main controller
+        :type tolerance: float
         :return: if the distance was reached before the timeout
         :rtype: bool
         """
+        return self.run_command(self._turn_command(turn_degrees, max_effort, timeout, main_controller, secondary_controller, use_imu, max_speed, max_acceleration, max_jerk, tolerance))
 
-        if max_effort < 0:
-            max_effort = -max_effort
-            turn_degrees = -turn_degrees
-
-        time_out = Timeout(timeout)
-        starting_left = self.get_left_encoder_position()
-        starting_right = self.get_right_encoder_position()
-
-        if main_controller is None:
-            main_controller =  PID(
-                # kp = 0.2,
-                # ki = 0.004,
-                # kd = 0.0036,
-                kd = 0.003, #scale*(0.0036 + 0.0034 * (max(max_effort, 0.5) - 0.5) * 2),
-                kp = 0.02,
-                ki = 0.003, # 0.003,
-                #kd = 0.007,
-                min_output = 0.12,
-                max_output = max_effort,
-                max_integral = 30,
-                tolerance = 2, #degree
-                tolerance_count = 3
-            )
-        # Secondary controller to keep encoder values in sync
-        if secondary_controller is None:
-            secondary_controller = PID(
-                kp = 0.25,
-            )
- 
-        if use_imu and (self.imu is not None):
-            turn_degrees += self.imu.get_yaw()
-
-        while True:
-            
-            # calculate encoder correction to minimize drift
-            left_delta = self.get_left_encoder_position() - starting_left
-            right_delta = self.get_right_encoder_position() - starting_right
-            encoder_correction = secondary_controller.update(left_delta + right_delta)
+    async def turn_async(self, turn_degrees: float, max_effort: float = 0.5, timeout: float = 1.5, main_controller: Controller = None, secondary_controller: Controller = None, use_imu:bool = True, max_speed: float = None, max_acceleration: float = 360, max_jerk: float = None, tolerance: float = 2) -> bool:
+        """
+        Same as turn(), but for use in asyncio tasks: await drivetrain.turn_async(...)
+        Other tasks keep running while the robot moves; cancelling the task stops the robot.
+        """
+        return await self.run_command_async(self._turn_command(turn_degrees, max_effort, timeout, main_controller, secondary_controller, use_imu, max_speed, max_acceleration, max_jerk, tolerance))
+
+    def profiled_straight(self, profile: MotionProfile, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None) -> bool:
+        """
+        Drive straight following a motion profile (distances in cm). The wheels track the profile velocity
+        with speed control (using feedforward if enabled on the motors), corrected by the position error.
+
+        :param profile: The motion profile to follow, in centimeters
+        :type profile: MotionProfile
+        :param timeout: The amount of time allowed after the end of the profile to reach the distance (In Seconds)
+        :type timeout: float
+        :param main_controller: The main controller, converting the position error (cm) to a speed correction (cm/s)
+        :type main_controller: Controller
+        :param secondary_controller: The secondary controller, converting the heading error (degrees) to a wheel speed difference (cm/s)
+        :type secondary_controller: Controller
+        :return: if the distance was reached before the timeout
+        :rtype: bool
+        """
+        return self.run_command(ProfiledStraightCommand(self, profile, timeout, main_controller, secondary_controller))
+
+    def profiled_turn(self, profile: MotionProfile, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None, use_imu: bool = True) -> bool:
+        """
+        Turn following a motion profile (angles in degrees, positive is counterclockwise). The wheels track
+        the profile turn rate with speed control, corrected by the heading error.
+
+        :param profile: The motion profile to follow, in degrees
+        :type profile: MotionProfile
+        :param timeout: The amount of time allowed after the end of the profile to reach the angle (In Seconds)
+        :type timeout: float
+        :param main_controller: The main controller, converting the heading error (degrees) to a turn rate correction (degrees/s)
+        :type main_controller: Controller
+        :param secondary_controller: The secondary controller, for maintaining position during the turn by controlling the encoder count difference (cm -> cm/s)
+        :type secondary_controller: Controller
+        :param use_imu: A boolean flag that changes if the heading is measured with the imu (True) or the encoders (False)
+        :type use_imu: bool
+        :return: if the angle was reached before the timeout
+        :rtype: bool
+        """
+        return self.run_command(ProfiledTurnCommand(self, profile, timeout, main_controller, secondary_controller, use_imu))
 
-            if use_imu and (self.imu is not None):
-                # calculate turn error (in degrees) from the imu
-                turn_error = turn_degrees - self.imu.get_yaw()
-            else:
-                # calculate turn error (in degrees) from the encoder counts
-                turn_error = turn_degrees - ((right_delta-left_delta)/2)*360/(self.track_width*math.pi)
+    def run_queue(self, segments: list, max_speed: float = 30, max_acceleration: float = 50, max_corner_jump: float = 5, timeout: float = 1) -> bool:
+        """
+        Drives a sequence of segments as one continuous motion, without stopping between them.
+        Segments are created with motion_queue.straight(distance), motion_queue.turn(degrees) and motion_queue.arc(radius, degrees).
+        Speeds and accelerations refer to the faster wheel. The robot slows down at a joint only as much as
+        needed to keep the jump of wheel speeds below max_corner_jump, e.g. almost to a stop before a turn in place,
+        but hardly at all between a straight and a wide arc.
+
+        :param segments: The list of segments to drive
+        :type segments: list
+        :param max_speed: The maximal wheel speed (cm/s)
+        :type max_speed: float
+        :param max_acceleration: The maximal wheel acceleration (cm/s^2)
+        :type max_acceleration: float
+        :param max_corner_jump: The maximal instant change of a wheel speed between segments (cm/s)
+        :type max_corner_jump: float
+        :param timeout: The amount of time allowed after the end of the planned motion to reach the final position (In Seconds)
+        :type timeout: float
+        :return: if the final position was reached before the timeout
+        :rtype: bool
+        """
+        return self.run_command(QueueCommand(self, segments, max_speed, max_acceleration, max_corner_jump, timeout))
 
-            # Pass the turn error to the main controller to get a turn speed
-            turn_speed = main_controller.update(turn_error)
+    async def run_queue_async(self, segments: list, max_speed: float = 30, max_acceleration: float = 50, max_corner_jump: float = 5, timeout: float = 1) -> bool:
+        """
+        Same as run_queue(), but for use in asyncio tasks
+        """
+        return await self.run_command_async(QueueCommand(self, segments, max_speed, max_acceleration, max_corner_jump, timeout))
 
-            # exit if timeout or tolerance reached
-            if main_controller.is_done() or time_out.is_done():
-                break
+    def _arc_command(self, radius, turn_degrees, max_speed, max_acceleration, timeout, main_controller, secondary_controller):
+        if radius <= 0:
+            raise ValueError("Arc radius must be positive")
+        # positive angle turns left (counterclockwise)
+        curvature = 1/radius if turn_degrees >= 0 else -1/radius
+        profile = TrapezoidalProfile(radius*math.radians(abs(turn_degrees)), max_speed, max_acceleration)
+        return ArcCommand(self, profile, curvature, timeout, main_controller, secondary_controller)
 
-            self.set_effort(-turn_speed - encoder_correction, turn_speed - encoder_correction)
+    def arc(self, radius: float, turn_degrees: float, max_speed: float = 20, max_acceleration: float = 50, timeout: float = 1, main_controller: Controller = None, secondary_controller: Controller = None) -> bool:
+        """
+        Drive forward along a circular arc, and exit function when the angle has been turned.
+        Both the path length and the heading (from the odometry) are controlled, so the robot stays on the circle.
+
+        :param radius: The radius of the arc, measured to the center of the robot (In Centimeters)
+        :type radius: float
+        :param turn_degrees: The angle to turn along the arc (In Degrees); positive turns left, negative turns right
+        :type turn_degrees: float
+        :param max_speed: The maximal speed of the center of the robot (cm/s)
+        :type max_speed: float
+        :param max_acceleration: The acceleration of the motion profile (cm/s^2)
+        :type max_acceleration: float
+        :param timeout: The amount of time allowed after the end of the profile to reach the end of the arc (In Seconds)
+        :type timeout: float
+        :param main_controller: The main controller, converting the path length error (cm) to a speed correction (cm/s)
+        :type main_controller: Controller
+        :param secondary_controller: The secondary controller, converting the heading error (degrees) to a wheel speed difference (cm/s)
+        :type secondary_controller: Controller
+        :return: if the end of the arc was reached before the timeout
+        :rtype: bool
+        """
+        return self.run_command(self._arc_command(radius, turn_degrees, max_speed, max_acceleration, timeout, main_controller, secondary_controller))
 
-            time.sleep(0.01)
+    async def arc_async(self, radius: float, turn_degrees: float, max_speed: float = 20, max_acceleration: float = 50, timeout: float = 1, main_controller: Controller = None, secondary_controller: Controller = None) -> bool:
+        """
+        Same as arc(), but for use in asyncio tasks
+        """
+        return await self.run_command_async(self._arc_command(radius, turn_degrees, max_speed, max_acceleration, timeout, main_controller, secondary_controller))
 
-        self.stop()
+    def follow_path(self, waypoints: list, max_speed: float = 20, max_acceleration: float = 50, lookahead: float = 10, tolerance: float = 1, timeout: float = None) -> bool:
+        """
+        Drive through a list of waypoints without stopping, using the pure pursuit algorithm: the robot keeps
+        steering towards a point lookahead cm further along the path. Waypoints are (x, y) positions in cm,
+        in the same coordinates as get_pose(). The robot slows down in sharp turns and stops at the last waypoint.
+
+        :param waypoints: The list of (x, y) waypoints, in cm
+        :type waypoints: list
+        :param max_speed: The maximal wheel speed (cm/s)
+        :type max_speed: float
+        :param max_acceleration: The maximal acceleration (cm/s^2)
+        :type max_acceleration: float
+        :param lookahead: The lookahead distance (cm). Longer is smoother, shorter follows corners more closely
+        :type lookahead: float
+        :param tolerance: How close to the last waypoint the robot must get (cm)
+        :type tolerance: float
+        :param timeout: The amount of time before the robot stops trying to follow the path (In Seconds)
+        :type timeout: float
+        :return: if the end of the path was reached before the timeout
+        :rtype: bool
+        """
+        return self.run_command(PurePursuitCommand(self, waypoints, max_speed, max_acceleration, lookahead, tolerance, timeout))
 
-        return not time_out.is_done()
+    async def follow_path_async(self, waypoints: list, max_speed: float = 20, max_acceleration: float = 50, lookahead: float = 10, tolerance: float = 1, timeout: float = None) -> bool:
+        """
+        Same as follow_path(), but for use in asyncio tasks
+        """
+        return await self.run_command_async(PurePursuitCommand(self, waypoints, max_speed, max_acceleration, lookahead, tolerance, timeout))
@@ -0,0 +1,384 @@
+from XRPLib.controller import Controller
+from XRPLib.timeout import Timeout
+from .pid import PID
+from .motion_profile import MotionProfile
+import time
+import math
+
+"""
+Drivetrain motions as command objects, advanced one step at a time.
+DifferentialDrive runs them either blocking (straight(), turn(), ...)
+or from asyncio tasks (straight_async(), turn_async(), ...).
+"""
+
+class DriveCommand:
+    """
+    Base class for drivetrain commands. Call start() once, then step() periodically (every 10 ms or so)
+    until it returns True, then finish(). After finish(), result tells if the target was reached before the timeout.
+    """
+
+    def __init__(self, drivetrain, timeout: float = None):
+        self.drivetrain = drivetrain
+        self.timeout = timeout
+        self.result = None
+        self._time_out = None
+        self._done = False
+
+    def start(self):
+        """
+        Records the starting position and starts the timeout
+        """
+        self._done = False
+        self.result = None
+        self._time_out = Timeout(self.timeout)
+        self.starting_left = self.drivetrain.get_left_encoder_position()
+        self.starting_right = self.drivetrain.get_right_encoder_position()
+        self._start()
+
+    def step(self) -> bool:
+        """
+        Runs one control update
+
+        :return: True if the command has finished (target reached or timed out)
+        :rtype: bool
+        """
+        if not self._done:
+            self._done = self._step()
+        return self._done
+
+    def is_done(self) -> bool:
+        """
+        :return: True if the command has finished
+        :rtype: bool
+        """
+        return self._done
+
+    def finish(self):
+        """
+        Stops the drivetrain. Also used to cancel a command that has not finished
+        """
+        self._done = True
+        self.drivetrain.stop()
+        self.result = self._time_out is not None and not self._time_out.is_done()
+
+    def _timed_out(self) -> bool:
+        return self._time_out.is_done()
+
+    def _start(self):
+        pass
+
+    def _step(self) -> bool:
+        return True
+
+
+class StraightCommand(DriveCommand):
+
+    def __init__(self, drivetrain, distance: float, max_effort: float = 0.5, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None):
+        """
+        Drives the given distance (cm) at up to max_effort; see DifferentialDrive.straight()
+        """
+        super().__init__(drivetrain, timeout)
+        # ensure effort is always positive while distance could be either positive or negative
+        if max_effort < 0:
+            max_effort *= -1
+            distance *= -1
+        self.distance = distance
+
+        if main_controller is None:
+            main_controller = PID(
+                kp = 0.1,
+                ki = 0.04,
+                kd = 0.04,
+                min_output = 0.15,
+                max_output = max_effort,
+                max_integral = 10,
+                tolerance = 0.25,
+                tolerance_count = 3,
+            )
+
+        # Secondary controller to keep encoder values in sync
+        if secondary_controller is None:
+            secondary_controller = PID(
+                kp = 0.009, kd=0.0005,
+            )
+        self.main_controller = main_controller
+        self.secondary_controller = secondary_controller
+
+    def _start(self):
+        if self.drivetrain.imu is not None:
+            # record current heading to maintain it
+            self.initial_heading = self.drivetrain.imu.get_yaw()
+        else:
+            self.initial_heading = 0
+
+    def _step(self) -> bool:
+        drivetrain = self.drivetrain
+
+        # calculate the distance traveled
+        left_delta = drivetrain.get_left_encoder_position() - self.starting_left
+        right_delta = drivetrain.get_right_encoder_position() - self.starting_right
+        dist_traveled = (left_delta + right_delta) / 2
+
+        # PID for distance
+        distance_error = self.distance - dist_traveled
+        if isinstance(self.main_controller, PID):
+            effort = self.main_controller.update(distance_error, measurement=dist_traveled)
+        else:
+            effort = self.main_controller.update(distance_error)
+
+        if self.main_controller.is_done() or self._timed_out():
+            return True
+
+        # calculate heading correction
+        if drivetrain.imu is not None:
+            current_heading = drivetrain.imu.get_yaw()
+        else:
+            current_heading = ((right_delta-left_delta)/2)*360/(drivetrain.track_width*math.pi)
+
+        headingCorrection = self.secondary_controller.update(self.initial_heading - current_heading)
+
+        drivetrain.set_effort(effort - headingCorrection, effort + headingCorrection)
+        return False
+
+
+class TurnCommand(DriveCommand):
+
+    def __init__(self, drivetrain, turn_degrees: float, max_effort: float = 0.5, timeout: float = 1.5, main_controller: Controller = None, secondary_controller: Controller = None, use_imu: bool = True, tolerance: float = 2):
+        """
+        Turns by the given angle (degrees) at up to max_effort; see DifferentialDrive.turn()
+        """
+        super().__init__(drivetrain, timeout)
+        if max_effort < 0:
+            max_effort = -max_effort
+            turn_degrees = -turn_degrees
+        self.turn_degrees = turn_degrees
+        self.use_imu = use_imu and (drivetrain.imu is not None)
+
+        if main_controller is None:
+            main_controller =  PID(
+                min_output = 0.12,
+                max_output = max_effort,
+                max_integral = 30,
+                tolerance = tolerance, #degree
+                tolerance_count = 3,
+                # gains by error (degrees): stiffer close to the target, softer for large turns
+                gain_schedule = [
+                    (5,  0.03,  0.003, 0.003),
+                    (30, 0.025, 0.003, 0.003),
+                    (90, 0.02,  0.003, 0.003),
+                ],
+                anti_windup = 1.0,
+                derivative_filter = 0.02,
+            )
+        # Secondary controller to keep encoder values in sync
+        if secondary_controller is None:
+            secondary_controller = PID(
+                kp = 0.25,
+            )
+        self.main_controller = main_controller
+        self.secondary_controller = secondary_controller
+
+    def _start(self):
+        self.target = self.turn_degrees
+        if self.use_imu:
+            self.target += self.drivetrain.imu.get_yaw()
+
+    def _step(self) -> bool:
+        drivetrain = self.drivetrain
+
+        # calculate encoder correction to minimize drift
+        left_delta = drivetrain.get_left_encoder_position() - self.starting_left
+        right_delta = drivetrain.get_right_encoder_position() - self.starting_right
+        encoder_correction = self.secondary_controller.update(left_delta + right_delta)
+
+        if self.use_imu:
+            # calculate turn error (in degrees) from the imu
+            heading = drivetrain.imu.get_yaw()
+        else:
+            # calculate turn error (in degrees) from the encoder counts
+            heading = ((right_delta-left_delta)/2)*360/(drivetrain.track_width*math.pi)
+        turn_error = self.target - heading
+
+        # Pass the turn error to the main controller to get a turn speed
+        if isinstance(self.main_controller, PID):
+            turn_speed = self.main_controller.update(turn_error, measurement=heading)
+        else:
+            turn_speed = self.main_controller.update(turn_error)
+
+        # exit if timeout or tolerance reached
+        if self.main_controller.is_done() or self._timed_out():
+            return True
+
+        drivetrain.set_effort(-turn_speed - encoder_correction, turn_speed - encoder_correction)
+        return False
+
+
+class ProfiledStraightCommand(DriveCommand):
+
+    def __init__(self, drivetrain, profile: MotionProfile, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None):
+        """
+        Drives straight following a motion profile (cm); see DifferentialDrive.profiled_straight()
+        """
+        super().__init__(drivetrain, None if timeout is None else profile.duration + timeout)
+        self.profile = profile
+
+        if main_controller is None:
+            main_controller = PID(
+                kp = 3,
+                ki = 1,
+                max_output = 20,
+                max_integral = 5,
+                tolerance = 0.25,
+                tolerance_count = 3,
+            )
+        if secondary_controller is None:
+            secondary_controller = PID(
+                kp = 0.5, kd = 0.02,
+                max_output = 20,
+            )
+        self.main_controller = main_controller
+        self.secondary_controller = secondary_controller
+
+    def _start(self):
+        if self.drivetrain.imu is not None:
+            self.initial_heading = self.drivetrain.imu.get_yaw()
+        else:
+            self.initial_heading = 0
+        self.start_time = time.ticks_ms()
+
+    def _step(self) -> bool:
+        drivetrain = self.drivetrain
+        t = time.ticks_diff(time.ticks_ms(), self.start_time) / 1000
+        position, velocity, acceleration = self.profile.sample(t)
+
+        left_delta = drivetrain.get_left_encoder_position() - self.starting_left
+        right_delta = drivetrain.get_right_encoder_position() - self.starting_right
+        dist_traveled = (left_delta + right_delta) / 2
+
+        correction = self.main_controller.update(position - dist_traveled)
+        if (self.profile.is_done(t) and self.main_controller.is_done()) or self._timed_out():
+            return True
+
+        if drivetrain.imu is not None:
+            current_heading = drivetrain.imu.get_yaw()
+        else:
+            current_heading = ((right_delta-left_delta)/2)*360/(drivetrain.track_width*math.pi)
+        heading_correction = self.secondary_controller.update(self.initial_heading - current_heading)
+
+        speed = velocity + correction
+        drivetrain.set_speed(speed - heading_correction, speed + heading_correction, acceleration, acceleration)
+        return False
+
+
+class ProfiledTurnCommand(DriveCommand):
+
+    def __init__(self, drivetrain, profile: MotionProfile, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None, use_imu: bool = True, tolerance: float = 2):
+        """
+        Turns following a motion profile (degrees); see DifferentialDrive.profiled_turn()
+        """
+        super().__init__(drivetrain, None if timeout is None else profile.duration + timeout)
+        self.profile = profile
+        self.use_imu = use_imu and (drivetrain.imu is not None)
+
+        if main_controller is None:
+            main_controller = PID(
+                kp = 3,
+                ki = 1,
+                max_output = 90,
+                max_integral = 10,
+                tolerance = tolerance,
+                tolerance_count = 3,
+            )
+        if secondary_controller is None:
+            secondary_controller = PID(
+                kp = 2,
+                max_output = 10,
+            )
+        self.main_controller = main_controller
+        self.secondary_controller = secondary_controller
+        # wheel travel (cm) per degree of rotation
+        self.cm_per_degree = drivetrain.track_width*math.pi/360
+
+    def _start(self):
+        if self.use_imu:
+            self.initial_heading = self.drivetrain.imu.get_yaw()
+        self.start_time = time.ticks_ms()
+
+    def _step(self) -> bool:
+        drivetrain = self.drivetrain
+        t = time.ticks_diff(time.ticks_ms(), self.start_time) / 1000
+        angle, rate, acceleration = self.profile.sample(t)
+
+        left_delta = drivetrain.get_left_encoder_position() - self.starting_left
+        right_delta = drivetrain.get_right_encoder_position() - self.starting_right
+        encoder_correction = self.secondary_controller.update(-(left_delta + right_delta))
+
+        if self.use_imu:
+            turned = drivetrain.imu.get_yaw() - self.initial_heading
+        else:
+            turned = ((right_delta-left_delta)/2)/self.cm_per_degree
+
+        correction = self.main_controller.update(angle - turned)
+        if (self.profile.is_done(t) and self.main_controller.is_done()) or self._timed_out():
+            return True
+
+        wheel_speed = (rate + correction)*self.cm_per_degree
+        wheel_acceleration = acceleration*self.cm_per_degree
+        drivetrain.set_speed(-wheel_speed + encoder_correction, wheel_speed + encoder_correction, -wheel_acceleration, wheel_acceleration)
+        return False
+
+
+class ArcCommand(DriveCommand):
+
+    def __init__(self, drivetrain, profile: MotionProfile, curvature: float, timeout: float = None, main_controller: Controller = None, secondary_controller: Controller = None):
+        """
+        Drives along a circular arc following a motion profile of the path length (cm); see DifferentialDrive.arc()
+        """
+        super().__init__(drivetrain, None if timeout is None else profile.duration + timeout)
+        self.profile = profile
+        self.curvature = curvature
+
+        # Path length error (cm) -> speed correction (cm/s)
+        if main_controller is None:
+            main_controller = PID(
+                kp = 3,
+                ki = 1,
+                max_output = 20,
+                max_integral = 5,
+                tolerance = 0.25,
+                tolerance_count = 3,
+            )
+        # Heading error (degrees) -> wheel speed difference (cm/s)
+        if secondary_controller is None:
+            secondary_controller = PID(
+                kp = 0.5, kd = 0.02,
+                max_output = 20,
+            )
+        self.main_controller = main_controller
+        self.secondary_controller = secondary_controller
+
+    def _start(self):
+        self.initial_heading = self.drivetrain.odometry.get_heading()
+        self.start_time = time.ticks_ms()
+
+    def _step(self) -> bool:
+        drivetrain = self.drivetrain
+        t = time.ticks_diff(time.ticks_ms(), self.start_time) / 1000
+        position, velocity, acceleration = self.profile.sample(t)
+
+        left_delta = drivetrain.get_left_encoder_position() - self.starting_left
+        right_delta = drivetrain.get_right_encoder_position() - self.starting_right
+        dist_traveled = (left_delta + right_delta) / 2
+
+        correction = self.main_controller.update(position - dist_traveled)
+        if (self.profile.is_done(t) and self.main_controller.is_done()) or self._timed_out():
+            return True
+
+        # The heading should follow the distance actually traveled, keeping the robot on the circle
+        target_heading = self.initial_heading + math.degrees(self.curvature*dist_traveled)
+        heading_correction = self.secondary_controller.update(target_heading - drivetrain.odometry.get_heading())
+
+        left_speed, right_speed = drivetrain.wheel_speeds(velocity + correction, self.curvature)
+        left_acceleration, right_acceleration = drivetrain.wheel_speeds(acceleration, self.curvature)
+        drivetrain.set_speed(left_speed - heading_correction, right_speed + heading_correction, left_acceleration, right_acceleration)
+        return False
@@ -0,0 +1,318 @@
+from .motor import SinglePWMMotor, DualPWMMotor
+from .encoder import Encoder
+from XRPLib.controller import Controller
+from .pid import FixedRatePID
+from .motor_scheduler import MotorScheduler
+from .feedforward import FeedforwardPID
+import sys
+import time
+
+class EncodedMotor:
+
+    ZERO_EFFORT_BREAK = True
+    ZERO_EFFORT_COAST = False
+
+    # Update period (in seconds) at which the default speed controller gains were tuned
+    DEFAULT_UPDATE_PERIOD = 0.02
+    DEFAULT_SPEED_KP = 0.035
+    DEFAULT_SPEED_KI = 0.03
+    DEFAULT_SPEED_MAX_INTEGRAL = 50
+
+    _DEFAULT_LEFT_MOTOR_INSTANCE = None
+    _DEFAULT_RIGHT_MOTOR_INSTANCE = None
+    _DEFAULT_MOTOR_THREE_INSTANCE = None
+    _DEFAULT_MOTOR_FOUR_INSTANCE = None
+
+    @classmethod
+    def get_default_encoded_motor(cls, index:int = 1):
+        """
+        Get one of the default XRP motor instances. These are singletons, so only one instance of each of these will ever exist.
+        Raises an exception if an invalid index is requested.
+
+        :param index: The index of the motor to get; 1 for left, 2 for right, 3 for motor 3, 4 for motor 4
+        :type index: int
+        """
+        
+        if "RP2350" in sys.implementation._machine:
+            MotorImplementation = DualPWMMotor
+        else:
+            MotorImplementation = SinglePWMMotor
+
+        if index == 1:
+            if cls._DEFAULT_LEFT_MOTOR_INSTANCE is None:
+                cls._DEFAULT_LEFT_MOTOR_INSTANCE = cls(
+                    MotorImplementation("MOTOR_L_IN_1", "MOTOR_L_IN_2", flip_dir=True),
+                    Encoder(0, "MOTOR_L_ENCODER_A", "MOTOR_L_ENCODER_B")
+                )
+            motor = cls._DEFAULT_LEFT_MOTOR_INSTANCE
+        elif index == 2:
+            if cls._DEFAULT_RIGHT_MOTOR_INSTANCE is None:
+                cls._DEFAULT_RIGHT_MOTOR_INSTANCE = cls(
+                    MotorImplementation("MOTOR_R_IN_1", "MOTOR_R_IN_2"),
+                    Encoder(1, "MOTOR_R_ENCODER_A", "MOTOR_R_ENCODER_B")
+                )
+            motor = cls._DEFAULT_RIGHT_MOTOR_INSTANCE
+        elif index == 3:
+            if cls._DEFAULT_MOTOR_THREE_INSTANCE is None:
+                cls._DEFAULT_MOTOR_THREE_INSTANCE = cls(
+                    MotorImplementation("MOTOR_3_IN_1", "MOTOR_3_IN_2", flip_dir=True),
+                    Encoder(2, "MOTOR_3_ENCODER_A", "MOTOR_3_ENCODER_B")
+                )
+            motor = cls._DEFAULT_MOTOR_THREE_INSTANCE
+        elif index == 4:
+            if cls._DEFAULT_MOTOR_FOUR_INSTANCE is None:
+                cls._DEFAULT_MOTOR_FOUR_INSTANCE = cls(
+                    MotorImplementation("MOTOR_4_IN_1", "MOTOR_4_IN_2"),
+                    Encoder(3, "MOTOR_4_ENCODER_A", "MOTOR_4_ENCODER_B")
+                )
+            motor = cls._DEFAULT_MOTOR_FOUR_INSTANCE
+        else:
+            return Exception("Invalid motor index")
+        return motor
+    
+    def __init__(self, motor, encoder: Encoder, scheduler: MotorScheduler = None):
+        """
+        :param motor: The motor driver
+        :param encoder: The encoder of this motor
+        :type encoder: Encoder
+        :param scheduler: The control loop scheduler running the speed control of this motor. If None, the default (shared) scheduler is used
+        :type scheduler: MotorScheduler
+        """
+        self._motor = motor
+        self._encoder = encoder
+
+        self.brake_at_zero = False
+
+        self.target_speed = None
+        self.target_speed_rpm = None
+        self.DEFAULT_SPEED_CONTROLLER = FixedRatePID(
+            kp=self.DEFAULT_SPEED_KP,
+            ki=self.DEFAULT_SPEED_KI,
+            kd=0,
+            dt=self.DEFAULT_UPDATE_PERIOD,
+            max_integral=self.DEFAULT_SPEED_MAX_INTEGRAL
+        )
+        self.speedController = self.DEFAULT_SPEED_CONTROLLER
+        self.prev_position = 0
+        self.prev_sample_time = time.ticks_us()
+        # Change in position (counts) measured by the last control loop tick
+        self.last_delta = 0
+        self._sample_interval = 0
+        self.speed = 0
+        # All motors share one control loop, so their speeds are sampled at the same instant
+        if scheduler is None:
+            scheduler = MotorScheduler.get_default_motor_scheduler()
+        self._scheduler = scheduler
+        # Registering sets the update period and the speed conversion constants
+        self._scheduler.register(self)
+
+    def _set_update_period(self, period: float):
+        """
+        Non-api method; called by the scheduler whenever the control loop rate changes
+
+        :param period: The control loop period, in seconds
+        :type period: float
+        """
+        self._update_period = period
+        # Cached conversion constants between counts per tick and rpm (60 sec/min)
+        self._rpm_per_count_per_tick = 60 / (self._encoder.resolution * period)
+        self._counts_per_tick_per_rpm = 1 / self._rpm_per_count_per_tick
+        # Error in counts per tick scales with the period, so the default gains scale inversely;
+        # the integral (in error units) scales with the period, keeping the effort limit ki*max_integral the same
+        scale = self.DEFAULT_UPDATE_PERIOD / period
+        self.DEFAULT_SPEED_CONTROLLER.kp = self.DEFAULT_SPEED_KP * scale
+        self.DEFAULT_SPEED_CONTROLLER.ki = self.DEFAULT_SPEED_KI * scale
+        self.DEFAULT_SPEED_CONTROLLER.max_integral = self.DEFAULT_SPEED_MAX_INTEGRAL / scale
+        self.DEFAULT_SPEED_CONTROLLER.dt = period
+        self.DEFAULT_SPEED_CONTROLLER.set_coefficients()
+        if self.target_speed_rpm is not None:
+            self.target_speed = self.target_speed_rpm * self._counts_per_tick_per_rpm
+
+    def get_update_period(self) -> float:
+        """
+        :return: The period of the speed control loop, in seconds. Change it with the scheduler's set_freq()
+        :rtype: float
+        """
+        return self._update_period
+
+
+    def set_effort(self, effort: float):
+        """
+        :param effort: The effort to set this motor to, from -1 to 1
+        :type effort: float
+        """
+        if self.brake_at_zero and effort == 0:
+            self.brake()
+        else:
+            self._motor.set_effort(effort)
+    
+    def set_pwm_freq(self, freq: int):
+        """
+        Sets the PWM frequency of the motor driver (50 Hz by default); higher frequencies give smoother torque at low speed
+
+        :param freq: The PWM frequency, in Hz
+        :type freq: int
+        """
+        self._motor.set_pwm_freq(freq)
+
+    def set_voltage_compensation(self, battery):
+        """
+        Enables or disables battery voltage compensation: efforts are scaled by nominal/actual battery voltage,
+        so that the same effort gives the same speed from a full to a low battery
+
+        :param battery: The battery monitor to compensate with, or None to disable compensation
+        :type battery: BatteryMonitor
+        """
+        self._motor.set_voltage_compensation(battery)
+
+    # EncodedMotor.set_zero_effort_behavior(EncodedMotor.ZERO_POWER_BRAKE)
+    def set_zero_effort_behavior(self, brake_at_zero_effort):
+        """
+        Sets the behavior of the motor at 0 effort to either brake (hold position) or coast (free spin)
+        :param brake_at_zero_effort: Whether or not to brake at 0 effort. Can use EncodedMotor.ZERO_EFFORT_BREAK or EncodedMotor.ZERO_EFFORT_COAST for clarity.
+        :type brake_at_zero_effort: bool
+        """
+        self.brake_at_zero = brake_at_zero_effort
+
+    def brake(self):
+        """
+        Causes the motor to resist rotation.
+        """
+        # Exact impl of brake depends on which board is being used. 
+        self._motor.brake()
+
+    def coast(self):
+        """
+        Allows the motor to spin freely.
+        """
+        self._motor.coast()
+
+    def get_position(self) -> float:
+        """
+        :return: The position of the encoded motor, in revolutions, relative to the last time reset was called.
+        :rtype: float
+        """
+        if self._motor.flip_dir:
+            invert = -1
+        else:
+            invert = 1
+        return self._encoder.get_position()*invert
+    
+    def get_position_counts(self) -> int:
+        """
+        :return: The position of the encoded motor, in encoder counts, relative to the last time reset was called.
+        :rtype: int
+        """
+        if self._motor.flip_dir:
+            invert = -1
+        else:
+            invert = 1
+        return self._encoder.get_position_counts()*invert
+
+    def reset_encoder_position(self):
+        """
+        Resets the encoder position back to zero.
+        """
+        # Keep the control loop from seeing the reset as a sudden movement
+        state = self._scheduler._enter()
+        self._encoder.reset_encoder_position()
+        self.prev_position = 0
+        self._scheduler._exit(state)
+
+    def get_speed(self) -> float:
+        """
+        :return: The speed of the motor, in rpm
+        :rtype: float
+        """
+        return self.speed*self._rpm_per_count_per_tick
+
+    def set_speed(self, speed_rpm: float = None, acceleration: float = 0):
+        """
+        Sets target speed (in rpm) to be maintained passively
+        Call with no parameters or 0 to turn off speed control
+
+        :param target_speed_rpm: The target speed for the motor in rpm, or None
+        :type target_speed_rpm: float, or None
+        :param acceleration: The target acceleration in rpm/s, used by a feedforward speed controller
+        :type acceleration: float
+        """
+        if speed_rpm is None or speed_rpm == 0:
+            self.target_speed = None
+            self.target_speed_rpm = None
+            if isinstance(self.speedController, FeedforwardPID):
+                self.speedController.set_target(0)
+            self.set_effort(0)
+            return
+        self.target_speed_rpm = speed_rpm
+        self.target_speed = speed_rpm*self._counts_per_tick_per_rpm
+        if isinstance(self.speedController, FeedforwardPID):
+            self.speedController.set_target(speed_rpm, acceleration)
+
+    def set_speed_controller(self, new_controller: Controller):
+        """
+        Sets a new controller for speed control
+
+        :param new_controller: The new Controller for speed control
+        :type new_controller: Controller
+        """
+        self.speedController = new_controller
+        self.speedController.clear_history()
+
+    def set_feedforward(self, ks: float, kv: float, ka: float = 0):
+        """
+        Switches speed control to feedforward plus the default PID controller.
+        Use feedforward.characterize() to measure the constants.
+
+        :param ks: static friction effort
+        :type ks: float
+        :param kv: effort per rpm
+        :type kv: float
+        :param ka: effort per rpm/s
+        :type ka: float
+        """
+        self.set_speed_controller(FeedforwardPID(ks, kv, ka, feedback=self.DEFAULT_SPEED_CONTROLLER))
+
+    def _sample(self):
+        """
+        Non-api method; called by the scheduler to read the encoder position and the time, with no other work,
+        so that all encoders are read back-to-back
+        """
+        current_position = self.get_position_counts()
+        now = time.ticks_us()
+        self.last_delta = current_position - self.prev_position
+        self._sample_interval = time.ticks_diff(now, self.prev_sample_time)
+        self.prev_position = current_position
+        self.prev_sample_time = now
+
+    def _estimate_speed(self):
+        """
+        Non-api method; called by the scheduler after all encoders were read, to compute the speed (in counts per tick)
+        """
+        delta = self.last_delta
+        if hasattr(self._encoder, "estimate_velocity"):
+            # Encoder velocity is in raw direction, counts per second
+            if self._motor.flip_dir:
+                delta = -delta
+            velocity = self._encoder.estimate_velocity(delta, self._sample_interval, self.prev_sample_time)
+            if self._motor.flip_dir:
+                velocity = -velocity
+            self.speed = velocity * self._update_period
+        else:
+            self.speed = delta
+
+    def _control(self):
+        """
+        Non-api method; called by the scheduler after all motors were sampled, to update the effort for speed control
+        """
+        if self.target_speed is not None:
+            error = self.target_speed - self.speed
+            effort = self.speedController.update(error)
+            self._motor.set_effort(effort)
+
+    def _update(self):
+        """
+        Non-api method; samples and updates this motor on its own
+        """
+        self._sample()
+        self._estimate_speed()
+        self._control()
\ No newline at end of file
@@ -0,0 +1,139 @@
+from XRPLib.encoder import Encoder as _XRPLibEncoder
+import machine
+import rp2
+import time
+
+class Encoder(_XRPLibEncoder):
+    """
+    Encoder that, in addition to counting, measures the time between edges.
+    A second PIO state machine (index + 4, i.e. on the other PIO block) counts clock cycles
+    between rising edges of one encoder channel. This gives a high resolution speed at low RPM,
+    where counting edges per control tick is quantized to a handful of counts.
+    """
+
+    # At this many counts per tick and above, the speed is taken from counts only
+    BLEND_COUNTS = 8
+    # No edge for this long means the motor is stopped
+    STOP_TIMEOUT_US = 100000
+    # Depth of the RX FIFO of the edge timer; push(noblock) drops new periods while it is full
+    FIFO_DEPTH = 4
+    # Cycles per period besides the 2-cycle loops of _edge_timer: detecting the rise (jmp pin),
+    # mov isr, push, restarting X (mov) and leaving the high loop (jmp pin, jmp low)
+    EDGE_CYCLES = 6
+
+    def __init__(self, index, encAPin: int|str, encBPin: int|str):
+        """
+        :param index: The index of the state machine to be used for counting, indexed 0-3. State machine index+4 is used for edge timing
+        :type index: int
+        :param encAPin: The pin the encoder channel A is connected to
+        :type encAPin: int
+        :param encBPin: The pin the encoder channel B is connected to
+        :type encBPin: int
+        """
+        super().__init__(index, encAPin, encBPin)
+        timedPin = machine.Pin(min(encAPin, encBPin), machine.Pin.IN)
+        self._sm_freq = machine.freq()
+        self.period_sm = rp2.StateMachine(index + 4, self._edge_timer, freq=self._sm_freq, jmp_pin=timedPin)
+        self._period_us = 0
+        self._last_read_time = time.ticks_us()
+        self._last_edge_time = self._last_read_time
+        self._first_period = True
+        self._direction = 1
+        self.velocity = 0
+        self.period_sm.active(1)
+
+    def _read_period(self, now):
+        # Drains the RX FIFO: keeps the newest period, and the time of the newest edge
+        count = 0
+        total_loops = 0
+        while self.period_sm.rx_fifo():
+            loops = self.period_sm.get()
+            count += 1
+            total_loops += loops
+        last_read = self._last_read_time
+        self._last_read_time = now
+        if count == 0:
+            return
+        # The first measurement starts at an arbitrary point of the waveform; later ones are full periods
+        if not (self._first_period and count == 1):
+            self._period_us = (2*loops + self.EDGE_CYCLES) * 1000000 / self._sm_freq
+        self._first_period = False
+        if count >= self.FIFO_DEPTH:
+            # Periods were dropped, so the newest edge time is unknown: take the read time.
+            # With a full FIFO there were at least 16 counts since the last read, so the count method has the full weight
+            self._last_edge_time = now
+            return
+        # The periods read add up to the time from the previous newest edge (or the start of the state machine) to the newest one
+        elapsed_us = int((2*total_loops + self.EDGE_CYCLES*count) / self._sm_freq * 1000000)
+        edge_time = time.ticks_add(self._last_edge_time, elapsed_us)
+        # The newest edge came after the previous read, and not later than now
+        if time.ticks_diff(edge_time, last_read) < 0:
+            edge_time = last_read
+        elif time.ticks_diff(edge_time, now) > 0:
+            edge_time = now
+        self._last_edge_time = edge_time
+
+    def get_period_us(self) -> float:
+        """
+        :return: The latest measured period of the encoder channel (4 counts), in microseconds, or 0 if not measured yet
+        :rtype: float
+        """
+        self._read_period(time.ticks_us())
+        return self._period_us
+
+    def estimate_velocity(self, delta_counts: int, dt_us: int, now: int = None) -> float:
+        """
+        Blends the period (time between edges) and count (edges per interval) speed measurements.
+        The period method is used at low speeds and the count method at high speeds.
+        Call once per control tick.
+
+        :param delta_counts: The change in position, in counts, since the last call
+        :type delta_counts: int
+        :param dt_us: The time since the last call, in microseconds
+        :type dt_us: int
+        :param now: The time (time.ticks_us()) at which delta_counts was read; if None, the current time
+        :type now: int
+        :return: The velocity, in counts per second
+        :rtype: float
+        """
+        if now is None:
+            now = time.ticks_us()
+        self._read_period(now)
+        if delta_counts > 0:
+            self._direction = 1
+        elif delta_counts < 0:
+            self._direction = -1
+
+        count_velocity = delta_counts * 1000000 / dt_us if dt_us > 0 else 0
+
+        since_edge = time.ticks_diff(now, self._last_edge_time)
+        if self._period_us == 0 or since_edge > self.STOP_TIMEOUT_US:
+            period_velocity = 0
+        else:
+            # If there was no edge for longer than the last period, the motor is slowing down
+            period = max(self._period_us, since_edge)
+            period_velocity = self._direction * 4000000 / period
+
+        weight = min(1, abs(delta_counts) / self.BLEND_COUNTS)
+        self.velocity = weight*count_velocity + (1 - weight)*period_velocity
+        return self.velocity
+
+    @rp2.asm_pio()
+    def _edge_timer():
+        # Register descriptions:
+        # X - Counts down once per loop (2 cycles) since the last rising edge
+        # ISR - Elapsed loops, pushed on every rising edge
+        wrap_target()
+        mov(x, invert(null))    # Start counting from 0xFFFFFFFF
+        label("high")           # Pin is high: count until it falls
+        jmp(pin, "high_dec")
+        jmp("low")
+        label("high_dec")
+        jmp(x_dec, "high")
+        label("low")            # Pin is low: count until it rises
+        jmp(pin, "rise")
+        jmp(x_dec, "low")
+        label("rise")
+        mov(isr, invert(x))     # Number of loops since the last rising edge
+        push(noblock)
+        wrap()
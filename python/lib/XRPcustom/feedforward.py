@@ -0,0 +1,214 @@
+from XRPLib.controller import Controller
+from array import array
+import json
+import time
+
+"""
+Feedforward speed control (static friction + velocity + acceleration), combined with a feedback controller,
+and a characterization routine to measure the feedforward constants of a motor
+"""
+
+DEFAULT_CONSTANTS_FILE = "feedforward.json"
+
+class FeedforwardPID(Controller):
+
+    def __init__(self, ks: float = 0.0, kv: float = 0.0, ka: float = 0.0, feedback: Controller = None, max_output: float = 1.0):
+        """
+        Computes effort = ks*sign(v) + kv*v + ka*a + feedback(error),
+        where v and a are the target velocity and acceleration set with set_target()
+
+        :param ks: static friction gain, effort needed to start moving
+        :param kv: velocity gain, effort per unit of velocity (rpm for motors)
+        :param ka: acceleration gain, effort per unit of acceleration (rpm/s for motors)
+        :param feedback: The feedback controller correcting the remaining error, usually a PID. If None, only feedforward is used
+        :param max_output: maximum output
+        """
+        self.ks = ks
+        self.kv = kv
+        self.ka = ka
+        self.feedback = feedback
+        self.max_output = max_output
+
+        self.target_velocity = 0
+        self.target_acceleration = 0
+        self._feedforward = 0
+
+    def calculate(self, velocity: float, acceleration: float = 0) -> float:
+        """
+        :param velocity: The target velocity
+        :type velocity: float
+        :param acceleration: The target acceleration
+        :type acceleration: float
+        :return: The feedforward effort for the given target
+        :rtype: float
+        """
+        if velocity > 0:
+            static = self.ks
+        elif velocity < 0:
+            static = -self.ks
+        else:
+            static = 0
+        return static + self.kv * velocity + self.ka * acceleration
+
+    def set_target(self, velocity: float, acceleration: float = 0):
+        """
+        Sets the target velocity and acceleration used for the feedforward term
+
+        :param velocity: The target velocity
+        :type velocity: float
+        :param acceleration: The target acceleration, if known (e.g. from a motion profile)
+        :type acceleration: float
+        """
+        self.target_velocity = velocity
+        self.target_acceleration = acceleration
+        self._feedforward = self.calculate(velocity, acceleration)
+
+    def update(self, error: float) -> float:
+        """
+        Handle a new update of this controller given an error.
+
+        :param error: The velocity error
+        :type error: float
+
+        :return: The feedforward effort plus the feedback correction
+        :rtype: float
+        """
+        output = self._feedforward
+        if self.feedback is not None:
+            output += self.feedback.update(error)
+        return max(-self.max_output, min(self.max_output, output))
+
+    def is_done(self) -> bool:
+        """
+        :return: If the feedback controller has settled
+        :rtype: bool
+        """
+        if self.feedback is None:
+            return True
+        return self.feedback.is_done()
+
+    def clear_history(self):
+        if self.feedback is not None:
+            self.feedback.clear_history()
+
+
+def characterize(motor, max_effort: float = 0.8, steps: int = 8, settle_time: float = 1.0, step_effort: float = 0.5) -> dict:
+    """
+    Measures the feedforward constants of a motor. The robot must be raised so the wheels spin freely.
+    Sweeps efforts in both directions, fits effort = ks + kv*rpm to the steady state speeds,
+    then applies a step of effort from rest and fits ka to the acceleration.
+
+    :param motor: The motor to characterize
+    :type motor: EncodedMotor
+    :param max_effort: The largest effort of the sweep
+    :type max_effort: float
+    :param steps: The number of efforts in each direction
+    :type steps: int
+    :param settle_time: Time to reach steady speed at each effort, in seconds
+    :type settle_time: float
+    :param step_effort: The effort used for the acceleration test
+    :type step_effort: float
+    :return: The constants, with keys ks, kv and ka
+    :rtype: dict
+    """
+    motor.set_speed()
+
+    # Steady state sweep: (|rpm|, |effort|) pairs for both directions
+    speeds = []
+    efforts = []
+    for direction in (1, -1):
+        for i in range(1, steps + 1):
+            effort = direction * max_effort * i / steps
+            motor.set_effort(effort)
+            time.sleep(settle_time)
+            rpm = 0
+            for _ in range(5):
+                rpm += motor.get_speed()
+                time.sleep(0.02)
+            speeds.append(abs(rpm / 5))
+            efforts.append(abs(effort))
+        motor.set_effort(0)
+        time.sleep(settle_time)
+
+    # Least squares fit of effort = ks + kv*rpm
+    n = len(speeds)
+    mean_v = sum(speeds) / n
+    mean_e = sum(efforts) / n
+    svv = sum((v - mean_v)**2 for v in speeds)
+    sve = sum((v - mean_v)*(e - mean_e) for v, e in zip(speeds, efforts))
+    kv = sve / svv if svv > 0 else 0
+    ks = max(0, mean_e - kv*mean_v)
+
+    # Step response: the effort not explained by ks and kv accelerates the motor.
+    # Speeds are recorded on every control loop tick, so each difference spans exactly one period
+    period = motor.get_update_period()
+    samples = max(2, int(0.5 / period))
+    rpms = array('f', [0]*samples)
+    recorded = [0]
+    def record():
+        if recorded[0] < samples:
+            rpms[recorded[0]] = motor.get_speed()
+            recorded[0] += 1
+    scheduler = motor._scheduler
+    prev_rpm = motor.get_speed()
+    scheduler.add_listener(record)
+    motor.set_effort(step_effort)
+    while recorded[0] < samples:
+        time.sleep(0.01)
+    scheduler.remove_listener(record)
+    motor.set_effort(0)
+    saa = 0
+    sra = 0
+    for rpm in rpms:
+        acceleration = (rpm - prev_rpm) / period
+        residual = step_effort - ks - kv*rpm
+        saa += acceleration*acceleration
+        sra += residual*acceleration
+        prev_rpm = rpm
+    ka = max(0, sra / saa) if saa > 0 else 0
+
+    return {"ks": ks, "kv": kv, "ka": ka}
+
+def save_constants(constants: dict, filename: str = DEFAULT_CONSTANTS_FILE):
+    """
+    Saves feedforward constants, e.g. {"left": {"ks": ..., "kv": ..., "ka": ...}, "right": {...}}
+
+    :param constants: The constants to save
+    :type constants: dict
+    :param filename: The file to save to
+    :type filename: str
+    """
+    with open(filename, "w") as f:
+        json.dump(constants, f)
+
+def load_constants(filename: str = DEFAULT_CONSTANTS_FILE) -> dict:
+    """
+    :param filename: The file saved by save_constants()
+    :type filename: str
+    :return: The saved constants, or None if there is no such file
+    :rtype: dict
+    """
+    try:
+        with open(filename) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def apply_saved_constants(motors: dict, filename: str = DEFAULT_CONSTANTS_FILE) -> bool:
+    """
+    Enables feedforward speed control on the given motors, using saved constants
+
+    :param motors: The motors by name, e.g. {"left": left_motor, "right": right_motor}
+    :type motors: dict
+    :param filename: The file saved by save_constants()
+    :type filename: str
+    :return: True if constants were found and applied
+    :rtype: bool
+    """
+    constants = load_constants(filename)
+    if constants is None:
+        return False
+    for name, motor in motors.items():
+        if name in constants:
+            motor.set_feedforward(**constants[name])
+    return True
@@ -0,0 +1,417 @@
+try:
+    from XRPLib.imu_defs import *
+except (TypeError, ModuleNotFoundError):
+    # Import wrapped in a try/except so that autodoc generation can process properly
+    pass
+from XRPLib.imu import IMU as _XRPLibIMU
+from machine import Pin, disable_irq, enable_irq
+from micropython import const
+from array import array
+import micropython
+import _thread
+import time
+
+"""
+IMU with optional data-ready interrupt sampling.
+By default, behaves exactly like XRPLib IMU (polling with a virtual timer).
+If int1_pin is given, the LSM6DSO gyroscope data-ready signal is routed to INT1
+and every new sample is read as soon as the sensor produces it.
+
+Gyro and accelerometer data are read with one burst into a persistent buffer and
+converted with integer math. The sampling path adds the gyro readings to integer sums,
+which the angle getters convert to degrees, so the sampling path does not allocate memory.
+Fixed-point units: gyro in 1/8 mdps, accelerometer in ug.
+"""
+
+LSM_REG_COUNTER_BDR_REG1 = const(0x0B)
+LSM_REG_INT1_CTRL        = const(0x0D)
+LSM_DRDY_PULSED          = const(0x80) # COUNTER_BDR_REG1: pulsed (75 us) data-ready instead of latched
+LSM_INT1_DRDY_G          = const(0x02) # INT1_CTRL: gyroscope data-ready on INT1
+
+# Fixed-point scale at the lowest range: 4.375 mdps/LSB = 35 (1/8 mdps)/LSB, 0.061 mg/LSB = 61 ug/LSB
+GYRO_FIXED_PER_LSB_125DPS = const(35)
+GYRO_FIXED_PER_MDPS       = const(8)
+# Gyro sums are moved into the float angles before they leave the small int range (2**30)
+GYRO_SUM_FOLD             = const(1 << 28)
+ACC_UG_PER_LSB_2G         = const(61)
+
+@micropython.viper
+def _unpack_scaled(src: ptr8, dst: ptr32, scales: ptr32, offsets: ptr32, n: int):
+    # Convert n little-endian int16 values from src into scaled, offset-corrected int32 values in dst
+    i = 0
+    while i < n:
+        v = src[2*i] | (src[2*i + 1] << 8)
+        if v & 0x8000:
+            v -= 0x10000
+        dst[i] = v * scales[i] - offsets[i]
+        i += 1
+
+class IMU(_XRPLibIMU):
+
+    _DEFAULT_IMU_INSTANCE = None
+
+    def __init__(self, scl_pin: int|str = "I2C_SCL_1", sda_pin: int|str = "I2C_SDA_1", addr=LSM_ADDR_PRIMARY, int1_pin: int|str = None):
+        """
+        :param int1_pin: The pin connected to the LSM6DSO INT1 output. If None, a soft timer is used to poll the sensor
+        :type int1_pin: int|str
+        """
+        if int1_pin is not None:
+            self._int1 = Pin(int1_pin, Pin.IN)
+        else:
+            self._int1 = None
+        # Preallocate bound method, so that the IRQ handler doesn't allocate memory
+        self._scheduled_update_ref = self._scheduled_update
+        self.reset_sample_stats()
+
+        # Persistent burst read buffer (gyro x,y,z then acc x,y,z, as in the register map)
+        self._burst_buf = bytearray(12)
+        self._gyro_view = memoryview(self._burst_buf)[0:6]
+        # Fixed-point readings, scale factors and offsets, in the same order
+        self._acc_gyro_fixed = array('i', [0]*6)
+        # The background sampler has its own buffers: it can run between any two bytecodes of a foreground read
+        self._irq_buf = bytearray(6)
+        self._irq_gyro_fixed = array('i', [0]*3)
+        # Sums of gyro readings (pitch, roll, yaw) not yet added to the float angles
+        self._gyro_sums = array('i', [0]*3)
+        self._fixed_scales = array('i', [GYRO_FIXED_PER_LSB_125DPS]*3 + [ACC_UG_PER_LSB_2G]*3)
+        self._fixed_offsets = array('i', [0]*6)
+        self._gyro_deg_per_fixed = 0
+        # True while readings are updated by another loop (core 1) instead of the timer
+        self._external_updates = False
+        # Set while the timer is stopped in external mode (e.g. during calibrate), so that the other loop skips updates
+        self._paused = False
+        # Only set in external mode: disable_irq() only masks interrupts on the calling core, so the
+        # integration state and the I2C bus are also locked. None in timer mode, where the timer
+        # interrupting a lock holder on the same core would deadlock
+        self._lock = None
+        # Counts every time the yaw is set or reset, so that integrators of yaw changes (odometry) can skip the jump
+        self.yaw_resets = 0
+        super().__init__(scl_pin, sda_pin, addr)
+
+    def _reset_member_variables(self):
+        super()._reset_member_variables()
+        self.yaw_resets += 1
+        for i in range(3):
+            self._gyro_sums[i] = 0
+        for i in range(6):
+            self._fixed_offsets[i] = 0
+
+    def _update_fixed_scales(self):
+        for i in range(3):
+            self._fixed_scales[i] = GYRO_FIXED_PER_LSB_125DPS * self._gyro_scale_factor
+            self._fixed_scales[i+3] = ACC_UG_PER_LSB_2G * self._acc_scale_factor
+
+    def acc_scale(self, value=None):
+        result = super().acc_scale(value)
+        self._update_fixed_scales()
+        return result
+
+    def gyro_scale(self, value=None):
+        result = super().gyro_scale(value)
+        self._update_fixed_scales()
+        return result
+
+    def _fold_gyro_sums(self):
+        # Adds the integer gyro sums to the float angles. Allocates, so it runs in the getters,
+        # and from the sampling path only when a sum gets large
+        k = self._gyro_deg_per_fixed
+        sums = self._gyro_sums
+        state = self._enter()
+        self.running_pitch += sums[0] * k
+        self.running_roll += sums[1] * k
+        self.running_yaw += sums[2] * k
+        for i in range(3):
+            sums[i] = 0
+        self._exit(state)
+
+    def _enter(self):
+        # Start of a section that changes the integration state
+        if self._lock is not None:
+            self._lock.acquire()
+        return disable_irq()
+
+    def _exit(self, state):
+        enable_irq(state)
+        if self._lock is not None:
+            self._lock.release()
+
+    def get_pitch(self):
+        """
+        Get the pitch of the IMU in degrees. Unbounded in range
+
+        :return: The pitch of the IMU in degrees
+        :rtype: float
+        """
+        self._fold_gyro_sums()
+        return self.running_pitch
+
+    def get_yaw(self):
+        """
+        Get the yaw (heading) of the IMU in degrees. Unbounded in range
+
+        :return: The yaw (heading) of the IMU in degrees
+        :rtype: float
+        """
+        self._fold_gyro_sums()
+        return self.running_yaw
+
+    def get_heading(self):
+        """
+        Get's the heading of the IMU, but bounded between [0, 360)
+
+        :return: The heading of the IMU in degrees, bound between [0, 360)
+        :rtype: float
+        """
+        return self.get_yaw() % 360
+
+    def get_roll(self):
+        """
+        Get the roll of the IMU in degrees. Unbounded in range
+
+        :return: The roll of the IMU in degrees
+        :rtype: float
+        """
+        self._fold_gyro_sums()
+        return self.running_roll
+
+    def reset_pitch(self):
+        """
+        Reset the pitch to 0
+        """
+        self.set_pitch(0)
+
+    def reset_roll(self):
+        """
+        Reset the roll to 0
+        """
+        self.set_roll(0)
+
+    def set_pitch(self, pitch):
+        """
+        Set the pitch to a specific angle in degrees
+
+        :param pitch: The pitch to set the IMU to
+        :type pitch: float
+        """
+        state = self._enter()
+        self.running_pitch = pitch
+        self._gyro_sums[0] = 0
+        self._exit(state)
+
+    def set_roll(self, roll):
+        """
+        Set the roll to a specific angle in degrees
+
+        :param roll: The roll to set the IMU to
+        :type roll: float
+        """
+        state = self._enter()
+        self.running_roll = roll
+        self._gyro_sums[1] = 0
+        self._exit(state)
+
+    def reset_yaw(self):
+        """
+        Reset the yaw (heading) to 0
+        """
+        self.set_yaw(0)
+
+    def set_yaw(self, yaw):
+        """
+        Set the yaw (heading) to a specific angle in degrees
+
+        :param yaw: The yaw (heading) to set the IMU to
+        :type yaw: float
+        """
+        state = self._enter()
+        self.running_yaw = yaw
+        self._gyro_sums[2] = 0
+        self.yaw_resets += 1
+        self._exit(state)
+
+    def get_acc_gyro_fixed(self):
+        """
+        Allocation-free burst read of all 12 output bytes.
+        The order of the values is gyro x, y, z (in 1/8 mdps), then accelerometer x, y, z (in ug).
+        The returned array is reused on every call.
+
+        :return: The offset-corrected gyroscope and accelerometer readings
+        :rtype: array
+        """
+        lock = self._lock
+        if lock is not None:
+            lock.acquire()
+        self.i2c.readfrom_mem_into(self.addr, LSM_REG_OUTX_L_G, self._burst_buf)
+        if lock is not None:
+            lock.release()
+        _unpack_scaled(self._burst_buf, self._acc_gyro_fixed, self._fixed_scales, self._fixed_offsets, 6)
+        return self._acc_gyro_fixed
+
+    def get_gyro_rates(self):
+        """
+            Retrieves the array of readings from the Gyroscope, in mdps
+            The order of the values is x, y, z.
+        """
+        lock = self._lock
+        if lock is not None:
+            lock.acquire()
+        self.i2c.readfrom_mem_into(self.addr, LSM_REG_OUTX_L_G, self._gyro_view)
+        if lock is not None:
+            lock.release()
+        _unpack_scaled(self._burst_buf, self._acc_gyro_fixed, self._fixed_scales, self._fixed_offsets, 3)
+        for i in range(3):
+            self.irq_v[1][i] = self._acc_gyro_fixed[i] / GYRO_FIXED_PER_MDPS
+        return self.irq_v[1]
+
+    def get_acc_gyro_rates(self):
+        """
+            Get the accelerometer and gyroscope values in mg and mdps in the form of a 2D array.
+            The first row is the acceleration values, the second row is the gyro values.
+            The order of the values is x, y, z.
+        """
+        fixed = self.get_acc_gyro_fixed()
+        for i in range(3):
+            self.irq_v[0][i] = fixed[i+3] / 1000
+            self.irq_v[1][i] = fixed[i] / GYRO_FIXED_PER_MDPS
+        return self.irq_v
+
+    def calibrate(self, calibration_time:float=1, vertical_axis:int= 2):
+        for i in range(6):
+            self._fixed_offsets[i] = 0
+        super().calibrate(calibration_time, vertical_axis)
+        # Mirror the offsets in fixed-point units
+        for i in range(3):
+            self._fixed_offsets[i] = int(round(self.gyro_offsets[i] * GYRO_FIXED_PER_MDPS))
+            self._fixed_offsets[i+3] = int(round(self.acc_offsets[i] * 1000))
+
+    def _update_imu_readings(self):
+        # Called for every sample; integer math only
+        if self._paused:
+            return
+        lock = self._lock
+        if lock is not None:
+            lock.acquire()
+        self.i2c.readfrom_mem_into(self.addr, LSM_REG_OUTX_L_G, self._irq_buf)
+        _unpack_scaled(self._irq_buf, self._irq_gyro_fixed, self._fixed_scales, self._fixed_offsets, 3)
+        fixed = self._irq_gyro_fixed
+        sums = self._gyro_sums
+        fold = False
+        state = disable_irq()
+        for i in range(3):
+            total = sums[i] + fixed[i]
+            sums[i] = total
+            if total > GYRO_SUM_FOLD or total < -GYRO_SUM_FOLD:
+                fold = True
+        enable_irq(state)
+        if lock is not None:
+            lock.release()
+        if fold:
+            self._fold_gyro_sums()
+
+    def _start_timer(self):
+        # Sums so far were taken at the previous rate
+        self._fold_gyro_sums()
+        # degrees per (1/8 mdps) reading, for one sample period
+        self._gyro_deg_per_fixed = 1 / (GYRO_FIXED_PER_MDPS * 1000 * self.timer_frequency)
+        self._paused = False
+        if self._external_updates:
+            return
+        if self._int1 is None:
+            super()._start_timer()
+            return
+        self._stop_timer()
+        # Pulsed data-ready: if a sample is ever missed, the next one still generates an edge
+        self._r_w_reg(LSM_REG_COUNTER_BDR_REG1, LSM_DRDY_PULSED, 0x7F)
+        self._setreg(LSM_REG_INT1_CTRL, LSM_INT1_DRDY_G)
+        self._int1.irq(trigger=Pin.IRQ_RISING, handler=self._data_ready_irq, hard=True)
+
+    def set_external_updates(self, enabled: bool):
+        """
+        Non-api method; with enabled = True, the update timer is stopped and another loop (see Core1Loop)
+        calls _update_imu_readings() at timer_frequency
+
+        :param enabled: If readings are updated externally
+        :type enabled: bool
+        """
+        self._stop_timer()
+        self._external_updates = enabled
+        self._lock = _thread.allocate_lock() if enabled else None
+        self._start_timer()
+
+    def _stop_timer(self):
+        if self._external_updates:
+            self._paused = True
+            return
+        if self._int1 is None:
+            super()._stop_timer()
+            return
+        self._int1.irq(handler=None)
+        self._setreg(LSM_REG_INT1_CTRL, 0)
+
+    def _data_ready_irq(self, pin):
+        # Hard IRQ: record the time and defer the I2C read to the scheduler
+        if self._update_pending:
+            # The previous sample was not read yet; the read that is pending gets this one instead
+            self._dropped += 1
+            return
+        self._irq_time = time.ticks_us()
+        try:
+            micropython.schedule(self._scheduled_update_ref, 0)
+            self._update_pending = True
+        except RuntimeError:
+            # schedule queue is full; this sample is lost
+            self._dropped += 1
+
+    def _scheduled_update(self, _):
+        t = self._irq_time
+        self._update_pending = False
+        if self._samples > 0:
+            period = time.ticks_diff(t, self._last_sample_time)
+            if period < self._min_period:
+                self._min_period = period
+            if period > self._max_period:
+                self._max_period = period
+            self._total_period += period
+        self._last_sample_time = t
+        self._samples += 1
+        self._update_imu_readings()
+
+    def reset_sample_stats(self):
+        """
+        Resets the sample rate statistics collected in data-ready mode
+        """
+        state = disable_irq()
+        self._irq_time = 0
+        self._update_pending = False
+        self._last_sample_time = 0
+        self._samples = 0
+        self._dropped = 0
+        self._min_period = 1 << 29
+        self._max_period = 0
+        self._total_period = 0
+        enable_irq(state)
+
+    def get_sample_stats(self) -> dict:
+        """
+        Measured sampling statistics since the last reset (data-ready mode only).
+        Keys: samples, dropped, rate_hz, min_period_us, max_period_us
+
+        :return: The sampling statistics
+        :rtype: dict
+        """
+        state = disable_irq()
+        samples = self._samples
+        dropped = self._dropped
+        min_period = self._min_period
+        max_period = self._max_period
+        total_period = self._total_period
+        enable_irq(state)
+        if samples < 2:
+            return {"samples": samples, "dropped": dropped, "rate_hz": 0, "min_period_us": 0, "max_period_us": 0}
+        return {
+            "samples": samples,
+            "dropped": dropped,
+            "rate_hz": (samples - 1) * 1000000 / total_period,
+            "min_period_us": min_period,
+            "max_period_us": max_period,
+        }
@@ -0,0 +1,198 @@
+import math
+
+"""
+Motion profiles: position, velocity and acceleration setpoints over time for a move of a given distance.
+Distances can be in any units (cm, degrees); velocities and accelerations are in the same units per second.
+"""
+
+class MotionProfile:
+    """
+    An abstract class for motion profiles. Trapezoidal and jerk-limited (S-curve) profiles are provided
+    """
+
+    duration = 0
+    distance = 0
+
+    def sample(self, t: float):
+        """
+        :param t: Time since the start of the move, in seconds
+        :type t: float
+        :return: The position, velocity and acceleration setpoints at time t
+        :rtype: tuple<float>
+        """
+        pass
+
+    def is_done(self, t: float) -> bool:
+        """
+        :param t: Time since the start of the move, in seconds
+        :type t: float
+        :return: If the profile has finished at time t
+        :rtype: bool
+        """
+        return t >= self.duration
+
+
+class TrapezoidalProfile(MotionProfile):
+
+    def __init__(self, distance: float, max_velocity: float, max_acceleration: float, start_velocity: float = 0, end_velocity: float = 0):
+        """
+        Accelerates at max_acceleration, cruises at max_velocity, then decelerates.
+        If the distance is too short, the cruise phase is dropped and the peak velocity is lowered.
+
+        :param distance: The distance to travel; negative to move backwards
+        :type distance: float
+        :param max_velocity: The maximal velocity (positive)
+        :type max_velocity: float
+        :param max_acceleration: The maximal acceleration (positive)
+        :type max_acceleration: float
+        :param start_velocity: The velocity at the start of the move, in the direction of motion (non-negative)
+        :type start_velocity: float
+        :param end_velocity: The velocity at the end of the move, in the direction of motion (non-negative). Lowered if it can not be reached
+        :type end_velocity: float
+        """
+        self.distance = distance
+        self._sign = -1 if distance < 0 else 1
+        d = abs(distance)
+        a = max_acceleration
+        v0 = min(start_velocity, max_velocity)
+        v1 = min(end_velocity, max_velocity)
+
+        # The end velocity must be reachable from the start velocity within the distance
+        if v1*v1 > v0*v0 + 2*a*d:
+            v1 = math.sqrt(v0*v0 + 2*a*d)
+        elif v0*v0 - 2*a*d > v1*v1:
+            # Can't slow down in time: decelerate over the whole distance
+            v1 = math.sqrt(v0*v0 - 2*a*d)
+
+        # Peak velocity, if there is no room to cruise at max_velocity
+        vp = min(max_velocity, math.sqrt((2*a*d + v0*v0 + v1*v1) / 2))
+        vp = max(vp, v0, v1)
+
+        self.start_velocity = v0
+        self.end_velocity = v1
+        self.peak_velocity = vp
+        self._a = a
+        self._t_acc = (vp - v0) / a
+        self._t_dec = (vp - v1) / a
+        self._d_acc = (vp*vp - v0*v0) / (2*a)
+        self._d_dec = (vp*vp - v1*v1) / (2*a)
+        self._t_cruise = max(0, d - self._d_acc - self._d_dec) / vp if vp > 0 else 0
+        self.duration = self._t_acc + self._t_cruise + self._t_dec
+
+    def sample(self, t: float):
+        if t <= 0:
+            return 0, self._sign*self.start_velocity, 0
+        a = self._a
+        v0 = self.start_velocity
+        vp = self.peak_velocity
+        if t < self._t_acc:
+            pos = v0*t + a*t*t/2
+            vel = v0 + a*t
+            acc = a
+        elif t < self._t_acc + self._t_cruise:
+            tc = t - self._t_acc
+            pos = self._d_acc + vp*tc
+            vel = vp
+            acc = 0
+        elif t < self.duration:
+            td = t - self._t_acc - self._t_cruise
+            pos = self._d_acc + vp*self._t_cruise + vp*td - a*td*td/2
+            vel = vp - a*td
+            acc = -a
+        else:
+            return self.distance, self._sign*self.end_velocity, 0
+        return self._sign*pos, self._sign*vel, self._sign*acc
+
+
+class SCurveProfile(MotionProfile):
+
+    def __init__(self, distance: float, max_velocity: float, max_acceleration: float, max_jerk: float):
+        """
+        Jerk-limited (S-curve) profile from rest to rest: acceleration ramps up and down at max_jerk,
+        so the robot doesn't lurch at the start and end of each phase.
+        If the distance is too short, the peak velocity is lowered.
+
+        :param distance: The distance to travel; negative to move backwards
+        :type distance: float
+        :param max_velocity: The maximal velocity (positive)
+        :type max_velocity: float
+        :param max_acceleration: The maximal acceleration (positive)
+        :type max_acceleration: float
+        :param max_jerk: The maximal jerk, i.e. rate of change of acceleration (positive)
+        :type max_jerk: float
+        """
+        self.distance = distance
+        self._sign = -1 if distance < 0 else 1
+        d = abs(distance)
+        self._j = max_jerk
+        self._a_max = max_acceleration
+
+        v = max_velocity
+        if 2*self._accel_distance(v) > d:
+            # Find the peak velocity for which acceleration and deceleration just cover the distance
+            low = 0
+            high = v
+            for _ in range(30):
+                v = (low + high) / 2
+                if 2*self._accel_distance(v) > d:
+                    high = v
+                else:
+                    low = v
+            v = low
+        self.peak_velocity = v
+        self._set_accel_phase(v)
+        self._d_acc = v*self._t_acc/2
+        self._t_cruise = (d - 2*self._d_acc) / v if v > 0 else 0
+        self.duration = 2*self._t_acc + self._t_cruise
+
+    def _set_accel_phase(self, v):
+        # Jerk phase duration, and the total duration of the acceleration phase
+        if v*self._j < self._a_max*self._a_max:
+            # max_acceleration is never reached
+            self._t_j = math.sqrt(v / self._j)
+            self._t_acc = 2*self._t_j
+        else:
+            self._t_j = self._a_max / self._j
+            self._t_acc = self._t_j + v / self._a_max
+        self._a_peak = self._j * self._t_j
+
+    def _accel_distance(self, v):
+        self._set_accel_phase(v)
+        # The acceleration phase is symmetric, so the average velocity is v/2
+        return v*self._t_acc/2
+
+    def _accel_sample(self, t):
+        # Position, velocity and acceleration during the acceleration phase, 0 <= t <= t_acc
+        j = self._j
+        tj = self._t_j
+        ap = self._a_peak
+        if t < tj:
+            return j*t*t*t/6, j*t*t/2, j*t
+        p1 = j*tj*tj*tj/6
+        v1 = j*tj*tj/2
+        t_const = self._t_acc - 2*tj
+        if t < tj + t_const:
+            tc = t - tj
+            return p1 + v1*tc + ap*tc*tc/2, v1 + ap*tc, ap
+        p2 = p1 + v1*t_const + ap*t_const*t_const/2
+        v2 = v1 + ap*t_const
+        tc = t - tj - t_const
+        return p2 + v2*tc + ap*tc*tc/2 - j*tc*tc*tc/6, v2 + ap*tc - j*tc*tc/2, ap - j*tc
+
+    def sample(self, t: float):
+        if t <= 0:
+            return 0, 0, 0
+        if t >= self.duration:
+            return self.distance, 0, 0
+        if t < self._t_acc:
+            pos, vel, acc = self._accel_sample(t)
+        elif t < self._t_acc + self._t_cruise:
+            pos = self._d_acc + self.peak_velocity*(t - self._t_acc)
+            vel = self.peak_velocity
+            acc = 0
+        else:
+            # Deceleration mirrors acceleration in time
+            pos, vel, acc = self._accel_sample(self.duration - t)
+            pos = abs(self.distance) - pos
+            acc = -acc
+        return self._sign*pos, self._sign*vel, self._sign*acc
@@ -0,0 +1,201 @@
+from XRPLib.controller import Controller
+from .pid import PID
+from .motion_profile import TrapezoidalProfile
+from .drive_commands import DriveCommand
+import time
+import math
+
+"""
+A queue of drivetrain segments (straight, turn in place, arc) driven as one continuous motion.
+The whole queue is planned in advance, so the robot slows down at a joint between segments only
+as much as the change of wheel speeds requires, instead of stopping after every segment.
+
+Each segment is described by the travel of its outer (faster) wheel and the ratios (kl, kr) of the
+left and right wheel speeds to the outer wheel speed, so speeds and accelerations are in cm/s and cm/s^2
+of the fastest wheel for every kind of segment.
+"""
+
+def straight(distance: float):
+    """
+    :param distance: The distance to drive (cm); negative to drive backwards
+    :type distance: float
+    """
+    return ("straight", distance)
+
+def turn(turn_degrees: float):
+    """
+    :param turn_degrees: The angle to turn in place (degrees); positive is counterclockwise
+    :type turn_degrees: float
+    """
+    return ("turn", turn_degrees)
+
+def arc(radius: float, turn_degrees: float):
+    """
+    :param radius: The radius of the arc, measured to the center of the robot (cm)
+    :type radius: float
+    :param turn_degrees: The angle to turn while driving forward (degrees); positive turns left
+    :type turn_degrees: float
+    """
+    return ("arc", radius, turn_degrees)
+
+
+class PlannedSegment:
+
+    def __init__(self, length: float, kl: float, kr: float):
+        # length: outer wheel travel (cm, positive); kl, kr: wheel speed ratios
+        self.length = length
+        self.kl = kl
+        self.kr = kr
+        self.max_end_velocity = 0
+        self.profile = None
+
+
+def _segment_ratios(segment, track_width):
+    kind = segment[0]
+    if kind == "straight":
+        distance = segment[1]
+        sign = -1 if distance < 0 else 1
+        return abs(distance), sign, sign
+    if kind == "turn":
+        degrees = segment[1]
+        length = abs(degrees)*math.pi*track_width/360
+        if degrees < 0:
+            return length, 1, -1
+        return length, -1, 1
+    if kind == "arc":
+        radius = segment[1]
+        degrees = segment[2]
+        if radius <= 0:
+            raise ValueError("Arc radius must be positive")
+        outer = radius + track_width/2
+        inner = (radius - track_width/2) / outer
+        length = abs(degrees)*math.pi*outer/180
+        if degrees < 0:
+            return length, 1, inner
+        return length, inner, 1
+    raise ValueError("Unknown segment type: " + str(kind))
+
+def plan(segments: list, track_width: float, max_speed: float, max_acceleration: float, max_corner_jump: float = 5) -> list:
+    """
+    Plans a trapezoidal profile for every segment, choosing the speed at each joint as high as allowed by
+    max_speed, by the wheel speed jump at the joint and by the room to accelerate or brake within the segments.
+
+    :param segments: The segments, as created by straight(), turn() and arc()
+    :type segments: list
+    :param track_width: The distance between the wheels (cm)
+    :type track_width: float
+    :param max_speed: The maximal wheel speed (cm/s)
+    :type max_speed: float
+    :param max_acceleration: The maximal wheel acceleration (cm/s^2)
+    :type max_acceleration: float
+    :param max_corner_jump: The maximal instant change of a wheel speed at a joint (cm/s)
+    :type max_corner_jump: float
+    :return: The planned segments
+    :rtype: list<PlannedSegment>
+    """
+    planned = []
+    for segment in segments:
+        length, kl, kr = _segment_ratios(segment, track_width)
+        if length > 0:
+            planned.append(PlannedSegment(length, kl, kr))
+    n = len(planned)
+    a = max_acceleration
+
+    # Joint limits: the wheel speeds jump by (difference of ratios) * joint speed
+    for i in range(n - 1):
+        jump = max(abs(planned[i].kl - planned[i+1].kl), abs(planned[i].kr - planned[i+1].kr))
+        limit = max_speed
+        if jump > 0:
+            limit = min(limit, max_corner_jump/jump)
+        planned[i].max_end_velocity = limit
+
+    # Backward pass: make sure every joint speed can be braked down to the next one
+    next_velocity = 0
+    for i in range(n - 1, -1, -1):
+        planned[i].max_end_velocity = min(planned[i].max_end_velocity, next_velocity)
+        next_velocity = math.sqrt(planned[i].max_end_velocity**2 + 2*a*planned[i].length)
+
+    # Forward pass: joint speeds limited by the acceleration from the previous joint
+    start_velocity = 0
+    for p in planned:
+        end_velocity = min(p.max_end_velocity, math.sqrt(start_velocity**2 + 2*a*p.length))
+        p.profile = TrapezoidalProfile(p.length, max_speed, a, start_velocity, end_velocity)
+        start_velocity = p.profile.end_velocity
+    return planned
+
+
+class QueueCommand(DriveCommand):
+
+    def __init__(self, drivetrain, segments: list, max_speed: float = 30, max_acceleration: float = 50, max_corner_jump: float = 5, timeout: float = None, left_controller: Controller = None, right_controller: Controller = None):
+        """
+        Drives a queue of segments without stopping between them; see DifferentialDrive.run_queue()
+        """
+        self.segments = plan(segments, drivetrain.track_width, max_speed, max_acceleration, max_corner_jump)
+        self.duration = sum(p.profile.duration for p in self.segments)
+        super().__init__(drivetrain, None if timeout is None else self.duration + timeout)
+
+        # Wheel position error (cm) -> wheel speed correction (cm/s)
+        if left_controller is None:
+            left_controller = PID(
+                kp = 3,
+                ki = 1,
+                max_output = 20,
+                max_integral = 5,
+                tolerance = 0.25,
+                tolerance_count = 3,
+            )
+        if right_controller is None:
+            right_controller = PID(
+                kp = 3,
+                ki = 1,
+                max_output = 20,
+                max_integral = 5,
+                tolerance = 0.25,
+                tolerance_count = 3,
+            )
+        self.left_controller = left_controller
+        self.right_controller = right_controller
+
+    def _start(self):
+        self.index = 0
+        # planned wheel positions at the start of the current segment, relative to the start of the queue
+        self.left_base = 0
+        self.right_base = 0
+        self.segment_start_time = time.ticks_ms()
+
+    def _step(self) -> bool:
+        drivetrain = self.drivetrain
+        now = time.ticks_ms()
+
+        # Move on to the next segment, carrying over the time already spent past the end of this one
+        while self.index < len(self.segments):
+            segment = self.segments[self.index]
+            t = time.ticks_diff(now, self.segment_start_time) / 1000
+            if t < segment.profile.duration or self.index == len(self.segments) - 1:
+                break
+            self.left_base += segment.kl*segment.length
+            self.right_base += segment.kr*segment.length
+            self.segment_start_time = time.ticks_add(self.segment_start_time, int(segment.profile.duration*1000))
+            self.index += 1
+
+        if self.index < len(self.segments):
+            segment = self.segments[self.index]
+            position, velocity, acceleration = segment.profile.sample(t)
+            kl = segment.kl
+            kr = segment.kr
+            profile_done = self.index == len(self.segments) - 1 and segment.profile.is_done(t)
+        else:
+            # empty queue
+            position = velocity = acceleration = kl = kr = 0
+            profile_done = True
+
+        left_delta = drivetrain.get_left_encoder_position() - self.starting_left
+        right_delta = drivetrain.get_right_encoder_position() - self.starting_right
+        left_correction = self.left_controller.update(self.left_base + kl*position - left_delta)
+        right_correction = self.right_controller.update(self.right_base + kr*position - right_delta)
+
+        if (profile_done and self.left_controller.is_done() and self.right_controller.is_done()) or self._timed_out():
+            return True
+
+        drivetrain.set_speed(kl*velocity + left_correction, kr*velocity + right_correction, kl*acceleration, kr*acceleration)
+        return False
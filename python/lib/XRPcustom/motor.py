@@ -0,0 +1,157 @@
+from machine import Pin, PWM
+
+"""
+Copies of the XRPLib motor classes, with optional battery voltage compensation:
+the effort is scaled by nominal/actual battery voltage, so that the same effort
+gives the same motor voltage (and speed) from a full to a low battery.
+"""
+
+class SinglePWMMotor:
+
+    """
+    A simple class handling direction and power sets for DC motors on the XRP robots
+
+    This version is used for the XRP Beta, which uses the rp2040 processor
+    """
+
+    def __init__(self, in1_direction_pin: int|str, in2_speed_pin: int|str, flip_dir:bool=False, pwm_freq: int = 50):
+        """
+        :param pwm_freq: The PWM frequency, in Hz; see set_pwm_freq()
+        :type pwm_freq: int
+        """
+        self.flip_dir = flip_dir
+        self._MAX_PWM = 65534 # Motor holds when actually at full power
+
+        self._in1DirPin = Pin(in1_direction_pin, Pin.OUT)
+        self._in2SpeedPin = PWM(Pin(in2_speed_pin, Pin.OUT))
+        self.set_pwm_freq(pwm_freq)
+        self._battery = None
+
+    def set_effort(self, effort: float):
+        """
+        Sets the effort value of the motor (corresponds to power)
+
+        :param effort: The effort to set the motor to, between -1 and 1
+        :type effort: float
+        """
+
+        if self._battery is not None:
+            effort *= self._battery.get_compensation()
+        if effort < 0:
+            # Change direction if negative power
+            effort *= -1
+            self._set_direction(1)
+        else:
+            self._set_direction(0)
+        # Cap power to [0,1]
+        effort = max(0,min(effort,1))
+        self._in2SpeedPin.duty_u16(int(effort*self._MAX_PWM))
+
+    def set_pwm_freq(self, freq: int):
+        """
+        Sets the PWM frequency of the motor driver. The default 50 Hz gives noticeable torque ripple at low effort;
+        frequencies above 20 kHz are smoother and inaudible. Efforts keep their meaning: duty is set as a fraction of the period.
+        Both pins of one PWM slice share the frequency.
+
+        :param freq: The PWM frequency, in Hz
+        :type freq: int
+        """
+        self.pwm_freq = freq
+        self._in2SpeedPin.freq(freq)
+
+    def set_voltage_compensation(self, battery):
+        """
+        Enables or disables battery voltage compensation
+
+        :param battery: The battery monitor to compensate with, or None to disable compensation
+        :type battery: BatteryMonitor
+        """
+        self._battery = battery
+
+    def _set_direction(self, direction: int):
+        if self.flip_dir:
+            self._in1DirPin.value(not direction)
+        else:
+            self._in1DirPin.value(direction)
+
+    def brake(self):
+        # Motor holds with the real max duty cycle (65535)
+        self._in2SpeedPin.duty_u16(self._MAX_PWM+1)
+
+    def coast(self):
+        self.set_effort(0)
+
+class DualPWMMotor:
+    """
+    A simple class handling effort setting for DC motors on the XRP robots
+
+    This version of the Motor class is used for the official release of the XRP
+    """
+
+    def __init__(self, in1_pwm_forward: int|str, in2_pwm_backward: int|str, flip_dir:bool=False, pwm_freq: int = 50):
+        """
+        :param pwm_freq: The PWM frequency, in Hz; see set_pwm_freq()
+        :type pwm_freq: int
+        """
+        self.flip_dir = flip_dir
+        self._MAX_PWM = 65535 # Motor holds when actually at full power
+
+        self._in1ForwardPin = PWM(Pin(in1_pwm_forward, Pin.OUT))
+        self._in2BackwardPin = PWM(Pin(in2_pwm_backward, Pin.OUT))
+        self.set_pwm_freq(pwm_freq)
+        self._battery = None
+
+    def set_effort(self, effort: float):
+        """
+        Sets the effort value of the motor (corresponds to power)
+
+        :param effort: The effort to set the motor to, between -1 and 1
+        :type effort: float
+        """
+
+        if self._battery is not None:
+            # Cap power to [-1,1]
+            effort = max(-1, min(effort*self._battery.get_compensation(), 1))
+        in1Pwm = (effort < 0) ^ (self.flip_dir)
+        if in1Pwm:
+            self._in1ForwardPin.duty_u16(int(abs(effort)*self._MAX_PWM))
+            self._in2BackwardPin.duty_u16(int(0))
+        else:
+            self._in1ForwardPin.duty_u16(int(0))
+            self._in2BackwardPin.duty_u16(int(abs(effort)*self._MAX_PWM))
+
+    def set_pwm_freq(self, freq: int):
+        """
+        Sets the PWM frequency of both driver inputs; see SinglePWMMotor.set_pwm_freq()
+
+        :param freq: The PWM frequency, in Hz
+        :type freq: int
+        """
+        self.pwm_freq = freq
+        self._in1ForwardPin.freq(freq)
+        self._in2BackwardPin.freq(freq)
+
+    def set_voltage_compensation(self, battery):
+        """
+        Enables or disables battery voltage compensation
+
+        :param battery: The battery monitor to compensate with, or None to disable compensation
+        :type battery: BatteryMonitor
+        """
+        self._battery = battery
+
+    def brake(self):
+        """
+        Powers the motor in both directions at the same time, enabling it to hold position
+        """
+        self._in1ForwardPin.duty_u16(int(self._MAX_PWM))
+        self._in2BackwardPin.duty_u16(int(self._MAX_PWM))
+
+    def coast(self):
+        """
+        Disables the motor in both directions at the same time, enabling it to spin freely
+        """
+        self._in1ForwardPin.duty_u16(int(0))
+        self._in2BackwardPin.duty_u16(int(0))
+        
+                
@@ -0,0 +1,288 @@
+from .encoded_motor import EncodedMotor
+from .motor_scheduler import MotorScheduler
+from .pid import FixedRatePID
+from .feedforward import FeedforwardPID
+from XRPLib.controller import Controller
+from machine import disable_irq, enable_irq
+from array import array
+
+class MotorGroup(EncodedMotor):
+
+    # Effort added per encoder count that a motor lags behind the group average
+    DEFAULT_SYNC_KP = 0.005
+
+    def __init__(self, *motors: EncodedMotor, scheduler: MotorScheduler = None, sync_kp: float = None):
+        """
+        A wrapper class for multiple motors, allowing them to be treated as one motor.
+        Efforts are applied to all motors at once, and speed control runs one controller for the whole group
+        in the shared control loop, with cross-coupling that keeps the motor positions in sync.
+
+        :param motors: The motors to add to this group
+        :type motors: tuple<EncodedMotor>
+        :param scheduler: The control loop running the speed control of this group. If None, the default (shared) scheduler is used
+        :type scheduler: MotorScheduler
+        :param sync_kp: Effort per encoder count of position difference from the group average; 0 disables cross-coupling
+        :type sync_kp: float
+        """
+        self.motors = []
+        self._start_positions = array('i')
+        self._efforts = array('f')
+        self.sync_kp = self.DEFAULT_SYNC_KP if sync_kp is None else sync_kp
+        self.brake_at_zero = False
+        self.target_speed = None
+        self.target_speed_rpm = None
+        self.DEFAULT_SPEED_CONTROLLER = FixedRatePID(
+            kp=self.DEFAULT_SPEED_KP,
+            ki=self.DEFAULT_SPEED_KI,
+            kd=0,
+            dt=self.DEFAULT_UPDATE_PERIOD,
+            max_integral=self.DEFAULT_SPEED_MAX_INTEGRAL
+        )
+        self.speedController = self.DEFAULT_SPEED_CONTROLLER
+        self.speed = 0
+        self._update_period = self.DEFAULT_UPDATE_PERIOD
+        if scheduler is None:
+            scheduler = MotorScheduler.get_default_motor_scheduler()
+        self._scheduler = scheduler
+        for motor in motors:
+            self.add_motor(motor)
+        self._scheduler.register(self)
+
+    def add_motor(self, motor:EncodedMotor):
+        """
+        :param motor: The motor to add to this group
+        :type motor: EncodedMotor
+        """
+        self.motors.append(motor)
+        # Per-motor buffers are only resized here, so control loop ticks don't allocate
+        self._start_positions = array('i', [0]*len(self.motors))
+        self._efforts = array('f', [0]*len(self.motors))
+        self._reset_sync()
+
+    def remove_motor(self, motor:EncodedMotor):
+        """
+        :param motor: The motor to remove from this group
+        :type motor: EncodedMotor
+        """
+        try:
+            self.motors.remove(motor)
+        except:
+            print("Failed to remove motor from Motor Group")
+            return
+        self._start_positions = array('i', [0]*len(self.motors))
+        self._efforts = array('f', [0]*len(self.motors))
+        self._reset_sync()
+
+    def _set_update_period(self, period: float):
+        """
+        Non-api method; called by the scheduler whenever the control loop rate changes
+        """
+        self._update_period = period
+        scale = self.DEFAULT_UPDATE_PERIOD / period
+        self.DEFAULT_SPEED_CONTROLLER.kp = self.DEFAULT_SPEED_KP * scale
+        self.DEFAULT_SPEED_CONTROLLER.ki = self.DEFAULT_SPEED_KI * scale
+        self.DEFAULT_SPEED_CONTROLLER.max_integral = self.DEFAULT_SPEED_MAX_INTEGRAL / scale
+        self.DEFAULT_SPEED_CONTROLLER.dt = period
+        self.DEFAULT_SPEED_CONTROLLER.set_coefficients()
+        if self.target_speed_rpm is not None and self.motors:
+            self.target_speed = self.target_speed_rpm * self.motors[0]._counts_per_tick_per_rpm
+
+    def _reset_sync(self):
+        # Positions are kept in sync relative to where each motor was on the last control loop tick
+        state = self._scheduler._enter()
+        for i in range(len(self.motors)):
+            self._start_positions[i] = self.motors[i].prev_position
+        self._scheduler._exit(state)
+
+    def _apply_efforts(self):
+        # All motors change effort at the same moment
+        state = disable_irq()
+        for i in range(len(self.motors)):
+            self.motors[i].set_effort(self._efforts[i])
+        enable_irq(state)
+
+    def set_effort(self, effort: float):
+        """
+        :param effort: The effort to set all motors in this group to, from -1 to 1
+        :type effort: float
+        """
+        # Not called by the control loop, which applies its efforts directly
+        state = self._scheduler._enter()
+        for i in range(len(self.motors)):
+            self._efforts[i] = effort
+        self._apply_efforts()
+        self._scheduler._exit(state)
+
+    def set_pwm_freq(self, freq: int):
+        """
+        Sets the PWM frequency of the motor drivers of all motors in this group
+
+        :param freq: The PWM frequency, in Hz
+        :type freq: int
+        """
+        for motor in self.motors:
+            motor.set_pwm_freq(freq)
+
+    def set_voltage_compensation(self, battery):
+        """
+        Enables or disables battery voltage compensation for all motors in this group
+
+        :param battery: The battery monitor to compensate with, or None to disable compensation
+        :type battery: BatteryMonitor
+        """
+        for motor in self.motors:
+            motor.set_voltage_compensation(battery)
+
+    def set_zero_effort_behavior(self, brake_at_zero_effort):
+        """
+        Sets the behavior of all motors in this group at 0 effort to either brake (hold position) or coast (free spin)
+
+        :param brake_at_zero_effort: Whether or not to brake at 0 effort
+        :type brake_at_zero_effort: bool
+        """
+        self.brake_at_zero = brake_at_zero_effort
+        for motor in self.motors:
+            motor.set_zero_effort_behavior(brake_at_zero_effort)
+
+    def brake(self):
+        """
+        Causes all motors in this group to resist rotation.
+        """
+        for motor in self.motors:
+            motor.brake()
+
+    def coast(self):
+        """
+        Allows all motors in this group to spin freely.
+        """
+        for motor in self.motors:
+            motor.coast()
+
+    def get_position(self) -> float:
+        """
+        :return: The average position of all motors in this group, in revolutions, relative to the last time reset was called.
+        :rtype: float
+        """
+        total = 0
+        for motor in self.motors:
+            total += motor.get_position()
+        return total / len(self.motors)
+
+    def get_position_counts(self) -> int:
+        """
+        :return: The average position of all motors in this group, in encoder counts, relative to the last time reset was called.
+        :rtype: int
+        """
+        total = 0
+        for motor in self.motors:
+            total += motor.get_position_counts()
+        return round(total / len(self.motors))
+
+    def reset_encoder_position(self):
+        """
+        Resets the encoder position of all motors in this group back to zero.
+        """
+        for motor in self.motors:
+            motor.reset_encoder_position()
+        self._reset_sync()
+
+    def get_speed(self) -> float:
+        """
+        :return: The average speed of the motors, in rpm
+        :rtype: float
+        """
+        total = 0
+        for motor in self.motors:
+            total += motor.get_speed()
+        return total / len(self.motors)
+
+    def set_speed(self, speed_rpm: float = None, acceleration: float = 0):
+        """
+        Sets target speed (in rpm) to be maintained passively by all motors in this group
+        Call with no parameters or 0 to turn off speed control
+
+        :param speed_rpm: The target speed for these motors in rpm, or None
+        :type speed_rpm: float, or None
+        :param acceleration: The target acceleration in rpm/s, used by a feedforward speed controller
+        :type acceleration: float
+        """
+        if speed_rpm is None or speed_rpm == 0:
+            self.target_speed = None
+            self.target_speed_rpm = None
+            if isinstance(self.speedController, FeedforwardPID):
+                self.speedController.set_target(0)
+            self.set_effort(0)
+            return
+        if self.target_speed is None:
+            # Starting speed control: hand the motors over from their own controllers
+            for motor in self.motors:
+                motor.target_speed = None
+                motor.target_speed_rpm = None
+            self.speedController.clear_history()
+            self._reset_sync()
+        self.target_speed_rpm = speed_rpm
+        self.target_speed = speed_rpm * self.motors[0]._counts_per_tick_per_rpm
+        if isinstance(self.speedController, FeedforwardPID):
+            self.speedController.set_target(speed_rpm, acceleration)
+
+    def set_speed_controller(self, new_controller: Controller):
+        """
+        Sets a new controller for the speed control of the whole group
+
+        :param new_controller: The new Controller for speed control
+        :type new_controller: Controller
+        """
+        self.speedController = new_controller
+        self.speedController.clear_history()
+
+    def set_feedforward(self, ks: float, kv: float, ka: float = 0):
+        """
+        Switches the speed control of the group to feedforward plus the group's default PID controller.
+        The feedforward effort is applied to every motor, so use the constants of one motor of the group,
+        measured with feedforward.characterize().
+
+        :param ks: static friction effort
+        :type ks: float
+        :param kv: effort per rpm
+        :type kv: float
+        :param ka: effort per rpm/s
+        :type ka: float
+        """
+        self.set_speed_controller(FeedforwardPID(ks, kv, ka, feedback=self.DEFAULT_SPEED_CONTROLLER))
+        if self.target_speed_rpm is not None:
+            self.speedController.set_target(self.target_speed_rpm)
+
+    def _sample(self):
+        """
+        Non-api method; the motors of the group are sampled by the scheduler themselves
+        """
+        pass
+
+    def _estimate_speed(self):
+        """
+        Non-api method; the speeds of the motors of the group are estimated by the scheduler themselves
+        """
+        pass
+
+    def _control(self):
+        """
+        Non-api method; called by the scheduler after all motors were sampled: one speed controller
+        for the group, plus a correction of each motor towards the average position
+        """
+        n = len(self.motors)
+        if self.target_speed is None or n == 0:
+            return
+        # Use the positions and speeds sampled by the scheduler on this tick, all taken at the same instant
+        speed = 0
+        offset = 0
+        for i in range(n):
+            motor = self.motors[i]
+            speed += motor.speed
+            offset += motor.prev_position - self._start_positions[i]
+        self.speed = speed / n
+        mean_offset = offset / n
+        effort = self.speedController.update(self.target_speed - self.speed)
+        for i in range(n):
+            lag = mean_offset - (self.motors[i].prev_position - self._start_positions[i])
+            self._efforts[i] = max(-1, min(1, effort + self.sync_kp * lag))
+        self._apply_efforts()
@@ -0,0 +1,206 @@
+from machine import Timer, disable_irq, enable_irq
+import _thread
+import time
+
+class MotorScheduler:
+    """
+    Runs the speed control loops of all registered motors from a single timer.
+    On every tick, all encoder positions are read back-to-back first, and only then
+    the speeds are estimated and the controllers are updated, so that all motors are sampled at the same instant.
+    """
+
+    _DEFAULT_MOTOR_SCHEDULER_INSTANCE = None
+
+    @classmethod
+    def get_default_motor_scheduler(cls):
+        """
+        Get the default motor scheduler instance, shared by all default motors. This is a singleton, so only one instance will ever exist.
+        """
+        if cls._DEFAULT_MOTOR_SCHEDULER_INSTANCE is None:
+            cls._DEFAULT_MOTOR_SCHEDULER_INSTANCE = cls()
+        return cls._DEFAULT_MOTOR_SCHEDULER_INSTANCE
+
+    def __init__(self, freq: int = 50):
+        """
+        :param freq: The control loop rate, in Hz (e.g. 50-500)
+        :type freq: int
+        """
+        self.motors = []
+        self.listeners = []
+        self.freq = freq
+        # Use a virtual timer so we can leave the hardware timers up for the user
+        self._timer = Timer(-1)
+        self._running = False
+        # True while ticks are driven by an external loop (core 1) instead of the timer
+        self._external = False
+        # Only set while ticks run on core 1: disable_irq() only masks interrupts on the calling core.
+        # None in timer mode, where a tick interrupting a lock holder on the same core would deadlock
+        self._lock = None
+        self.reset_stats()
+
+    def register(self, motor):
+        """
+        Adds a motor to the control loop, starting the loop if it is not running yet
+
+        :param motor: The motor to service on every tick
+        :type motor: EncodedMotor
+        """
+        if motor not in self.motors:
+            self.motors.append(motor)
+        motor._set_update_period(1 / self.freq)
+        if not self._running:
+            self.start()
+
+    def unregister(self, motor):
+        """
+        :param motor: The motor to remove from the control loop
+        :type motor: EncodedMotor
+        """
+        if motor in self.motors:
+            self.motors.remove(motor)
+
+    def add_listener(self, callback):
+        """
+        Adds a function called on every tick, after all motors were sampled and updated (e.g. odometry)
+
+        :param callback: The function to call, with no arguments
+        :type callback: function
+        """
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """
+        :param callback: The function to remove
+        :type callback: function
+        """
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def start(self):
+        """
+        Starts (or restarts) the control loop timer
+        """
+        if not self._external:
+            self._timer.init(freq=self.freq, callback=lambda t:self._tick())
+        self._running = True
+
+    def set_external_ticks(self, enabled: bool):
+        """
+        Non-api method; with enabled = True, the timer is stopped and ticks are run by another loop (see Core1Loop)
+
+        :param enabled: If ticks are driven externally
+        :type enabled: bool
+        """
+        self._external = enabled
+        if enabled:
+            self._timer.deinit()
+            self._lock = _thread.allocate_lock()
+        else:
+            self._lock = None
+            if self._running:
+                self.start()
+
+    def _enter(self):
+        """
+        Non-api method; starts a section that changes motor state used by the ticks (encoder positions, efforts),
+        from outside the control loop. Returns the state to pass to _exit()
+        """
+        if self._lock is not None:
+            self._lock.acquire()
+        return disable_irq()
+
+    def _exit(self, state):
+        """
+        Non-api method; ends a section started with _enter()
+        """
+        enable_irq(state)
+        if self._lock is not None:
+            self._lock.release()
+
+    def stop(self):
+        """
+        Stops the control loop timer. Motors keep their last effort.
+        """
+        self._timer.deinit()
+        self._running = False
+
+    def set_freq(self, freq: int):
+        """
+        Changes the control loop rate
+
+        Speed conversions and default speed controller gains of all motors follow the new rate.
+
+        :param freq: The new control loop rate, in Hz
+        :type freq: int
+        """
+        self.freq = freq
+        for motor in self.motors:
+            motor._set_update_period(1 / freq)
+        if self._running:
+            self.start()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Resets the timing statistics
+        """
+        self.ticks = 0
+        self._last_start = 0
+        self._last_duration = 0
+        self._max_duration = 0
+        self._total_duration = 0
+        self._min_interval = 1 << 29
+        self._max_interval = 0
+
+    def get_stats(self) -> dict:
+        """
+        Timing statistics since the last reset, all in microseconds.
+        Keys: ticks, last_us, avg_us, max_us (time spent in a tick), min_interval_us, max_interval_us (time between ticks)
+
+        :return: The timing statistics
+        :rtype: dict
+        """
+        return {
+            "ticks": self.ticks,
+            "last_us": self._last_duration,
+            "avg_us": self._total_duration / self.ticks if self.ticks else 0,
+            "max_us": self._max_duration,
+            "min_interval_us": self._min_interval if self.ticks > 1 else 0,
+            "max_interval_us": self._max_interval,
+        }
+
+    def _tick(self):
+        start = time.ticks_us()
+        if self.ticks > 0:
+            interval = time.ticks_diff(start, self._last_start)
+            if interval < self._min_interval:
+                self._min_interval = interval
+            if interval > self._max_interval:
+                self._max_interval = interval
+        self._last_start = start
+
+        lock = self._lock
+        if lock is not None:
+            lock.acquire()
+        try:
+            # Sample all encoders first, so speeds are measured at the same instant
+            for motor in self.motors:
+                motor._sample()
+            for motor in self.motors:
+                motor._estimate_speed()
+            for motor in self.motors:
+                motor._control()
+        finally:
+            if lock is not None:
+                lock.release()
+        # Listeners run unlocked, so that they can use the motor methods that lock
+        for callback in self.listeners:
+            callback()
+
+        duration = time.ticks_diff(time.ticks_us(), start)
+        self._last_duration = duration
+        self._total_duration += duration
+        if duration > self._max_duration:
+            self._max_duration = duration
+        self.ticks += 1
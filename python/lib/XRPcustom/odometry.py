@@ -0,0 +1,114 @@
+import math
+
+class Odometry:
+
+    def __init__(self, left_motor, right_motor, wheel_diam: float, track_width: float, imu = None):
+        """
+        Tracks the pose (x, y, heading) of a differential drive robot by integrating the wheel movements
+        measured on every tick of the motor control loop. If an IMU is given, heading changes are taken
+        from the IMU yaw, which is not affected by wheel slip; setting or resetting the IMU yaw does not change the pose.
+        The robot starts at (0, 0), facing along the x axis; positive heading is counterclockwise.
+
+        :param left_motor: The left motor of the drivetrain
+        :type left_motor: EncodedMotor
+        :param right_motor: The right motor of the drivetrain
+        :type right_motor: EncodedMotor
+        :param wheel_diam: The diameter of the wheels, in cm
+        :type wheel_diam: float
+        :param track_width: The distance between the wheels, in cm
+        :type track_width: float
+        :param imu: The IMU of the robot, or None to use only the encoders
+        :type imu: IMU
+        """
+        self.left_motor = left_motor
+        self.right_motor = right_motor
+        self.imu = imu
+        self.track_width = track_width
+        self._cm_per_count = math.pi * wheel_diam / left_motor._encoder.resolution
+        # The pose is replaced as a whole, so readers never see a half-updated pose
+        self._pose = (0.0, 0.0, 0.0)
+        self._prev_yaw = imu.get_yaw() if imu is not None else 0
+        self._yaw_resets = getattr(imu, "yaw_resets", 0)
+        left_motor._scheduler.add_listener(self.update)
+
+    def update(self):
+        """
+        Non-api method; integrates the wheel movements of the last control loop tick
+        """
+        left = self.left_motor.last_delta * self._cm_per_count
+        right = self.right_motor.last_delta * self._cm_per_count
+        distance = (left + right) / 2
+        imu = self.imu
+        if imu is not None:
+            resets = getattr(imu, "yaw_resets", 0)
+            yaw = imu.get_yaw()
+            if resets == self._yaw_resets and getattr(imu, "yaw_resets", 0) == resets:
+                dtheta = math.radians(yaw - self._prev_yaw)
+            else:
+                # The yaw was set or reset by the program: the jump is not a rotation, so use the encoders for this tick
+                dtheta = (right - left) / self.track_width
+                self._yaw_resets = getattr(imu, "yaw_resets", 0)
+                yaw = imu.get_yaw()
+            self._prev_yaw = yaw
+        else:
+            dtheta = (right - left) / self.track_width
+
+        x, y, theta = self._pose
+        if abs(dtheta) < 1e-6:
+            # Straight line (second order midpoint, exact in the limit)
+            x += distance * math.cos(theta + dtheta/2)
+            y += distance * math.sin(theta + dtheta/2)
+        else:
+            # Exact integration along a circular arc of radius distance/dtheta
+            radius = distance / dtheta
+            x += radius * (math.sin(theta + dtheta) - math.sin(theta))
+            y -= radius * (math.cos(theta + dtheta) - math.cos(theta))
+        self._pose = (x, y, theta + dtheta)
+
+    def get_pose(self):
+        """
+        :return: The current pose: x and y in cm, and the heading in degrees (unbounded)
+        :rtype: tuple<float>
+        """
+        x, y, theta = self._pose
+        return x, y, math.degrees(theta)
+
+    def get_x(self) -> float:
+        """
+        :return: The x coordinate, in cm
+        :rtype: float
+        """
+        return self._pose[0]
+
+    def get_y(self) -> float:
+        """
+        :return: The y coordinate, in cm
+        :rtype: float
+        """
+        return self._pose[1]
+
+    def get_heading(self) -> float:
+        """
+        :return: The heading, in degrees (unbounded)
+        :rtype: float
+        """
+        return math.degrees(self._pose[2])
+
+    def set_pose(self, x: float, y: float, heading: float):
+        """
+        Sets the current pose
+
+        :param x: The x coordinate, in cm
+        :type x: float
+        :param y: The y coordinate, in cm
+        :type y: float
+        :param heading: The heading, in degrees
+        :type heading: float
+        """
+        self._pose = (x, y, math.radians(heading))
+
+    def reset(self):
+        """
+        Resets the pose to (0, 0), heading 0
+        """
+        self.set_pose(0, 0, 0)
@@ -0,0 +1,276 @@
+import time
+from XRPLib.controller import Controller
+
+"""
+PID controller with exit condition, and a fixed-rate variant with precomputed coefficients
+"""
+
+class PID(Controller):
+
+    def __init__(self,
+                 kp = 1.0,
+                 ki = 0.0,
+                 kd = 0.0,
+                 min_output = 0.0,
+                 max_output = 1.0,
+                 max_derivative = None,
+                 max_integral = None,
+                 tolerance = 0.1,
+                 tolerance_count = 1,
+                 gain_schedule = None,
+                 anti_windup = None,
+                 derivative_filter = None
+                 ):
+        """
+        :param kp: proportional gain
+        :param ki: integral gain
+        :param kd: derivative gain
+        :param min_output: minimum output
+        :param max_output: maximum output
+        :param max_derivative: maximum derivative (change per second)
+        :param max_integral: maximum integral windup allowed (will cap integral at this value)
+        :param tolerance: tolerance for exit condition
+        :param tolerance_count: number of times the error needs to be within tolerance for is_done to return True
+        :param gain_schedule: list of (x, kp, ki, kd) rows sorted by x; gains are interpolated at x = abs(error) (or the schedule_value passed to update), replacing kp, ki, kd
+        :param anti_windup: back-calculation gain; when the output saturates at max_output, the integral is driven back at this rate (1/s). None disables it
+        :param derivative_filter: time constant (in seconds) of the low-pass filter on the derivative term. None disables it
+        """
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.min_output = min_output
+        self.max_output = max_output
+        self.max_derivative = max_derivative
+        self.max_integral = max_integral
+        self.tolerance = tolerance
+        self.tolerance_count = tolerance_count
+        self.gain_schedule = gain_schedule
+        self.anti_windup = anti_windup
+        self.derivative_filter = derivative_filter
+
+        self.prev_error = 0
+        self.prev_integral = 0
+        self.prev_output = 0
+        self.prev_measurement = None
+        self.prev_derivative = 0
+
+        self.start_time = None
+        self.prev_time = None
+
+        # number of actual times in tolerance
+        self.times = 0
+
+    def _handle_exit_condition(self, error: float):
+        if abs(error) < self.tolerance:
+            # if error is within tolerance, increment times in tolerance
+            self.times += 1
+        else:
+            # otherwise, reset times in tolerance, because we need to be in tolerance for numTimesInTolerance consecutive times
+            self.times = 0
+
+    def _scheduled_gains(self, x: float):
+        schedule = self.gain_schedule
+        if x <= schedule[0][0]:
+            return schedule[0][1], schedule[0][2], schedule[0][3]
+        for i in range(1, len(schedule)):
+            if x <= schedule[i][0]:
+                x0, kp0, ki0, kd0 = schedule[i-1]
+                x1, kp1, ki1, kd1 = schedule[i]
+                t = (x - x0) / (x1 - x0)
+                return kp0 + t*(kp1 - kp0), ki0 + t*(ki1 - ki0), kd0 + t*(kd1 - kd0)
+        return schedule[-1][1], schedule[-1][2], schedule[-1][3]
+
+    def update(self, error: float, debug: bool = False, measurement: float = None, schedule_value: float = None) -> float:
+        """
+        Handle a new update of this PID loop given an error.
+
+        :param error: The error of the system being controlled by this PID controller
+        :type error: float
+        :param measurement: The measured value. If given, the derivative is taken on the measurement instead of the error, so setpoint changes cause no derivative kick
+        :type measurement: float
+        :param schedule_value: The value to look up in the gain schedule (e.g. the setpoint). Defaults to abs(error)
+        :type schedule_value: float
+
+        :return: The system output from the controller, to be used as an effort value or for any other purpose
+        :rtype: float
+        """
+        current_time = time.ticks_us()
+        if self.prev_time is None:
+            # First update after instantiation
+            self.start_time = current_time
+            timestep = 0.01
+        else:
+            # get time delta in seconds
+            timestep = time.ticks_diff(current_time, self.prev_time) / 1000000
+            if timestep <= 0:
+                # guard against two updates within the same microsecond
+                timestep = 0.000001
+        self.prev_time = current_time # cache time for next update
+
+        self._handle_exit_condition(error)
+
+        if self.gain_schedule is not None:
+            kp, ki, kd = self._scheduled_gains(abs(error) if schedule_value is None else abs(schedule_value))
+        else:
+            kp, ki, kd = self.kp, self.ki, self.kd
+
+        integral = self.prev_integral + error * timestep
+        
+        if self.max_integral is not None:
+            integral = max(-self.max_integral, min(self.max_integral, integral))
+
+        if measurement is None:
+            derivative = (error - self.prev_error) / timestep
+        elif self.prev_measurement is None:
+            derivative = 0
+        else:
+            derivative = -(measurement - self.prev_measurement) / timestep
+        self.prev_measurement = measurement
+
+        if self.derivative_filter is not None:
+            # First order low-pass filter
+            derivative = self.prev_derivative + timestep / (self.derivative_filter + timestep) * (derivative - self.prev_derivative)
+        self.prev_derivative = derivative
+
+        # derive output
+        output = kp * error + ki * integral + kd * derivative
+        self.prev_error = error
+
+        # Bound output by maximum
+        saturated = max(-self.max_output, min(self.max_output, output))
+
+        # Back-calculation: unwind the integral by the amount the output is saturated
+        if self.anti_windup is not None and ki != 0:
+            integral += self.anti_windup * (saturated - output) / ki * timestep
+        self.prev_integral = integral
+
+        # Bound output by minimum (this is a boost to overcome friction, not a saturation)
+        output = saturated
+        if output > 0:
+            output = max(self.min_output, output)
+        else:
+            output = min(-self.min_output, output)
+        
+        # Bound output by maximum
+        output = max(-self.max_output, min(self.max_output, output))
+
+        # Bound output by maximum acceleration
+        if self.max_derivative is not None:
+            lower_bound = self.prev_output - self.max_derivative * timestep
+            upper_bound = self.prev_output + self.max_derivative * timestep
+            output = max(lower_bound, min(upper_bound, output))
+
+        # cache output for next update
+        self.prev_output = output
+
+        if debug:
+            print(f"{output}: ({kp * error}, {ki * integral}, {kd * derivative})")
+
+        return output
+    
+    def is_done(self) -> bool:
+        """
+        :return: if error is within tolerance for numTimesInTolerance consecutive times, or timed out
+        :rtype: bool
+        """
+        return self.times >= self.tolerance_count
+    
+    def clear_history(self):
+        self.prev_error = 0
+        self.prev_integral = 0
+        self.prev_output = 0
+        self.prev_measurement = None
+        self.prev_derivative = 0
+        self.prev_time = None
+        self.times = 0
+
+class FixedRatePID(Controller):
+
+    def __init__(self,
+                 kp = 1.0,
+                 ki = 0.0,
+                 kd = 0.0,
+                 dt = 0.02,
+                 min_output = 0.0,
+                 max_output = 1.0,
+                 max_integral = None,
+                 tolerance = 0.1,
+                 tolerance_count = 1
+                 ):
+        """
+        PID controller for loops called at a fixed rate, such as the motor control loop.
+        The timestep is not measured; all coefficients are precomputed for dt, so an update
+        only does a few float multiplications and comparisons.
+
+        :param kp: proportional gain
+        :param ki: integral gain
+        :param kd: derivative gain
+        :param dt: the fixed timestep, in seconds
+        :param min_output: minimum output
+        :param max_output: maximum output
+        :param max_integral: maximum integral windup allowed (will cap integral at this value)
+        :param tolerance: tolerance for exit condition
+        :param tolerance_count: number of times the error needs to be within tolerance for is_done to return True
+        """
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.dt = dt
+        self.min_output = min_output
+        self.max_output = max_output
+        self.max_integral = max_integral
+        self.tolerance = tolerance
+        self.tolerance_count = tolerance_count
+        self.set_coefficients()
+        self.clear_history()
+
+    def set_coefficients(self):
+        """
+        Recomputes the precomputed coefficients. Call after changing any gain, limit or dt.
+        """
+        # The integral is accumulated already multiplied by ki*dt
+        self._c_p = self.kp
+        self._c_i = self.ki * self.dt
+        self._c_d = self.kd / self.dt
+        self._i_limit = None if self.max_integral is None else self.ki * self.max_integral
+
+    def update(self, error: float) -> float:
+        """
+        Handle a new update of this PID loop given an error. Must be called every dt seconds.
+
+        :param error: The error of the system being controlled by this PID controller
+        :type error: float
+
+        :return: The system output from the controller
+        :rtype: float
+        """
+        if abs(error) < self.tolerance:
+            self.times += 1
+        else:
+            self.times = 0
+
+        integral = self.integral + self._c_i * error
+        if self._i_limit is not None:
+            integral = max(-self._i_limit, min(self._i_limit, integral))
+        self.integral = integral
+
+        output = self._c_p * error + integral + self._c_d * (error - self.prev_error)
+        self.prev_error = error
+
+        if output > 0:
+            output = max(self.min_output, output)
+        else:
+            output = min(-self.min_output, output)
+        return max(-self.max_output, min(self.max_output, output))
+
+    def is_done(self) -> bool:
+        """
+        :return: if error is within tolerance for tolerance_count consecutive times
+        :rtype: bool
+        """
+        return self.times >= self.tolerance_count
+
+    def clear_history(self):
+        self.prev_error = 0
+        self.integral = 0
+        self.times = 0
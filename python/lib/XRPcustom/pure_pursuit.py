@@ -0,0 +1,156 @@
+from .drive_commands import DriveCommand
+import time
+import math
+
+"""
+Pure pursuit path following: on every step the robot steers along the circle through its
+current position and a lookahead point, a fixed distance further along the path.
+Positions come from the drivetrain odometry, so waypoints are in the odometry frame (cm).
+"""
+
+class Path:
+
+    def __init__(self, waypoints: list):
+        """
+        A polyline through the waypoints, with the cumulative arc length precomputed,
+        so that points can be looked up by their distance along the path.
+
+        :param waypoints: The list of (x, y) points, in cm
+        :type waypoints: list
+        """
+        if len(waypoints) < 2:
+            raise ValueError("A path needs at least two waypoints")
+        self.xs = [float(p[0]) for p in waypoints]
+        self.ys = [float(p[1]) for p in waypoints]
+        self.lengths = [0.0]
+        for i in range(1, len(waypoints)):
+            self.lengths.append(self.lengths[-1] + math.sqrt((self.xs[i] - self.xs[i-1])**2 + (self.ys[i] - self.ys[i-1])**2))
+        self.length = self.lengths[-1]
+
+    def point_at(self, s: float, index: int = 0):
+        """
+        Finds the point at the distance s along the path, searching forward from the given segment.
+        Beyond the end, the last segment is extended, so that steering stays stable when approaching the end.
+
+        :param s: The distance along the path (cm)
+        :type s: float
+        :param index: The segment to start the search from
+        :type index: int
+        :return: x, y and the index of the segment containing the point
+        :rtype: tuple
+        """
+        last = len(self.xs) - 2
+        while index < last and self.lengths[index + 1] < s:
+            index += 1
+        segment_length = self.lengths[index + 1] - self.lengths[index]
+        if segment_length <= 0:
+            return self.xs[index + 1], self.ys[index + 1], index
+        f = (s - self.lengths[index]) / segment_length
+        x = self.xs[index] + f*(self.xs[index + 1] - self.xs[index])
+        y = self.ys[index] + f*(self.ys[index + 1] - self.ys[index])
+        return x, y, index
+
+    def project(self, x: float, y: float, index: int = 0):
+        """
+        Finds the distance along the path of the point closest to (x, y). The search starts at the given
+        segment and moves forward only while the distance to the path decreases, so following the path
+        costs O(1) per step on average.
+
+        :return: The distance along the path (cm) and the index of the segment containing the closest point
+        :rtype: tuple
+        """
+        best_s, best_d = self._project_segment(x, y, index)
+        last = len(self.xs) - 2
+        while index < last:
+            s, d = self._project_segment(x, y, index + 1)
+            if d > best_d:
+                break
+            best_s = s
+            best_d = d
+            index += 1
+        return best_s, index
+
+    def is_past_end(self, x: float, y: float, tolerance: float, index: int) -> bool:
+        """
+        :param index: The segment containing the point of the path closest to (x, y), as returned by project()
+        :type index: int
+        :return: If the point (x, y) is within tolerance of the last waypoint, or, once on the last segment,
+            beyond the last waypoint in the direction of the last segment
+        :rtype: bool
+        """
+        dx = x - self.xs[-1]
+        dy = y - self.ys[-1]
+        if dx*dx + dy*dy <= tolerance*tolerance:
+            return True
+        # Before the last segment, the robot may well be "beyond" the end, e.g. on a path that returns to the start
+        if index < len(self.xs) - 2:
+            return False
+        return dx*(self.xs[-1] - self.xs[-2]) + dy*(self.ys[-1] - self.ys[-2]) > 0
+
+    def _project_segment(self, x, y, i):
+        dx = self.xs[i + 1] - self.xs[i]
+        dy = self.ys[i + 1] - self.ys[i]
+        segment_length = self.lengths[i + 1] - self.lengths[i]
+        if segment_length <= 0:
+            f = 0
+        else:
+            f = ((x - self.xs[i])*dx + (y - self.ys[i])*dy) / (segment_length*segment_length)
+            f = min(1, max(0, f))
+        px = self.xs[i] + f*dx
+        py = self.ys[i] + f*dy
+        return self.lengths[i] + f*segment_length, (x - px)**2 + (y - py)**2
+
+
+class PurePursuitCommand(DriveCommand):
+
+    def __init__(self, drivetrain, waypoints: list, max_speed: float = 20, max_acceleration: float = 50, lookahead: float = 10, tolerance: float = 1, timeout: float = None):
+        """
+        Follows a path through the waypoints; see DifferentialDrive.follow_path()
+        """
+        super().__init__(drivetrain, timeout)
+        self.path = Path(waypoints)
+        self.max_speed = max_speed
+        self.max_acceleration = max_acceleration
+        self.lookahead = lookahead
+        self.tolerance = tolerance
+        # slowest speed while approaching the end, so that the robot does reach it
+        self.min_speed = min(2, max_speed)
+
+    def _start(self):
+        self.closest_index = 0
+        self.lookahead_index = 0
+        self.speed = 0
+        self.last_time = time.ticks_ms()
+
+    def _step(self) -> bool:
+        drivetrain = self.drivetrain
+        x, y, heading = drivetrain.odometry.get_pose()
+        heading = math.radians(heading)
+
+        s, self.closest_index = self.path.project(x, y, self.closest_index)
+        remaining = self.path.length - s
+        if self.path.is_past_end(x, y, self.tolerance, self.closest_index) or self._timed_out():
+            return True
+
+        target_x, target_y, self.lookahead_index = self.path.point_at(s + self.lookahead, max(self.lookahead_index, self.closest_index))
+
+        # Lookahead point in the robot frame; the arc through it has curvature 2*lateral/distance^2
+        dx = target_x - x
+        dy = target_y - y
+        cos_h = math.cos(heading)
+        sin_h = math.sin(heading)
+        lateral = -dx*sin_h + dy*cos_h
+        distance_squared = dx*dx + dy*dy
+        curvature = 2*lateral/distance_squared if distance_squared > 1e-6 else 0
+
+        # Speed: keep the outer wheel under max_speed, brake for the end, and limit acceleration
+        now = time.ticks_ms()
+        dt = time.ticks_diff(now, self.last_time) / 1000
+        self.last_time = now
+        speed = self.max_speed / (1 + abs(curvature)*drivetrain.track_width/2)
+        speed = min(speed, max(self.min_speed, math.sqrt(2*self.max_acceleration*max(remaining, 0))))
+        speed = min(speed, self.speed + self.max_acceleration*dt)
+        self.speed = speed
+
+        drivetrain.curvature_drive(speed, curvature)
+        return False
@@ -0,0 +1,265 @@
+from XRPLib.rangefinder import Rangefinder as _XRPLibRangefinder
+from .motor_scheduler import MotorScheduler
+from machine import Pin, disable_irq, enable_irq
+from array import array
+import time
+
+"""
+Rangefinder with an optional background mode.
+By default, behaves exactly like XRPLib Rangefinder: distance() sends a ping and waits for the echo.
+After start(), pings are sent from the motor control loop, right after the motors are updated,
+so the echo is not delayed by the motor work. The echo pulse is timed by pin interrupts,
+distance() returns the latest measurement immediately, and subscribers get every new measurement.
+
+The last few measurements are kept in a ring buffer, so filtered_distance() can return
+a rolling median without spikes from missed echoes, together with its confidence and age.
+"""
+
+class Rangefinder(_XRPLibRangefinder):
+
+    # Readings further than this from the median (cm, or fraction of the median if larger) are outliers
+    OUTLIER_CM = 3
+    OUTLIER_FRACTION = 0.15
+
+    def __init__(self, trigger_pin: int|str = "RANGE_TRIGGER", echo_pin: int|str = "RANGE_ECHO", timeout_us:int=500*2*30, history: int = 5):
+        """
+        :param history: The number of recent measurements kept for filtering
+        :type history: int
+        """
+        super().__init__(trigger_pin, echo_pin, timeout_us)
+        # Ring buffer of echo pulse lengths (us, 0 for no echo) and their ticks_us timestamps
+        self._history_pulses = array('i', [0]*history)
+        self._history_times = array('i', [0]*history)
+        self._history_index = 0
+        self._filter_pulses = array('i', [0]*history)
+        self._filter_times = array('i', [0]*history)
+        self._scheduler = None
+        self._running = False
+        self._ping_ticks = 1
+        self._ticks_to_ping = 0
+        self._subscribers = []
+        self._published = 0
+        # Echo timing, written by the echo interrupt handler (integers only, so the handler doesn't allocate)
+        self._echo_start = 0
+        self._pulse_us = 0
+        self._pulse_time = 0
+        self._waiting = False
+        self._readings = 0
+
+    def start(self, period: float = 0.06, scheduler: MotorScheduler = None):
+        """
+        Starts measuring in the background: a ping is sent every period seconds.
+        The HC-SR04 needs about 60 ms between pings, so that echoes of the previous ping die out.
+        Pings are sent on ticks of the motor control loop, so the period is rounded up to a whole number of ticks.
+
+        :param period: The minimal time between pings, in seconds
+        :type period: float
+        :param scheduler: The control loop to send pings from; by default, the shared motor control loop
+        :type scheduler: MotorScheduler
+        """
+        self.stop()
+        if scheduler is None:
+            scheduler = MotorScheduler.get_default_motor_scheduler()
+        self._scheduler = scheduler
+        self._ping_ticks = max(1, int(period*scheduler.freq + 0.999))
+        self._ticks_to_ping = 0
+        self._waiting = False
+        self._pulse_us = 0
+        self._published = self._readings
+        self.echo.irq(trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING, handler=self._echo_irq, hard=True)
+        scheduler.add_listener(self._on_tick)
+        if not scheduler._running:
+            scheduler.start()
+        self._running = True
+
+    def stop(self):
+        """
+        Stops background measuring; distance() goes back to measuring on every call
+        """
+        if self._scheduler is not None:
+            self._scheduler.remove_listener(self._on_tick)
+            self._scheduler = None
+        self.echo.irq(handler=None)
+        self._running = False
+
+    def subscribe(self, callback):
+        """
+        Adds a function called with every new background measurement (in cm, or MAX_VALUE if nothing is in range).
+        It is called from the motor control loop, so it should be short.
+
+        :param callback: The function to call, with the distance as the argument
+        :type callback: function
+        """
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """
+        :param callback: The function to remove
+        :type callback: function
+        """
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _on_tick(self):
+        # Called by the scheduler after the motors were updated: publish the last echo, then ping if due
+        if self._readings != self._published:
+            self._published = self._readings
+            if self._subscribers:
+                d = self.distance()
+                for callback in self._subscribers:
+                    callback(d)
+        self._ticks_to_ping -= 1
+        if self._ticks_to_ping <= 0:
+            self._ticks_to_ping = self._ping_ticks
+            self._ping()
+
+    def is_running(self) -> bool:
+        """
+        :return: If the rangefinder is measuring in the background
+        :rtype: bool
+        """
+        return self._running
+
+    def _ping(self):
+        if self._waiting:
+            # No complete echo since the last ping: nothing in range
+            self._store_pulse(0, time.ticks_us())
+        self._waiting = True
+        self._trigger.value(1)
+        # Send a 10us pulse.
+        self._delay_us(10)
+        self._trigger.value(0)
+
+    def _echo_irq(self, pin):
+        # Hard IRQ: only timestamps, no floats
+        now = time.ticks_us()
+        if pin.value():
+            self._echo_start = now
+        elif self._waiting:
+            pulse = time.ticks_diff(now, self._echo_start)
+            if pulse > self.timeout_us:
+                pulse = 0
+            self._store_pulse(pulse, now)
+
+    def _store_pulse(self, pulse_us, t):
+        self._pulse_us = pulse_us
+        self._pulse_time = t
+        self._waiting = False
+        i = self._history_index
+        self._history_pulses[i] = pulse_us
+        self._history_times[i] = t
+        i += 1
+        if i == len(self._history_pulses):
+            i = 0
+        self._history_index = i
+        self._readings += 1
+
+    def get_reading_count(self) -> int:
+        """
+        :return: The number of measurements completed in the background (including timeouts); use it to detect new readings
+        :rtype: int
+        """
+        return self._readings
+
+    def distance(self) -> float:
+        """
+        Get the distance in centimeters. In background mode, returns the latest measurement without waiting;
+        otherwise sends a ping and measures the echo pulse time
+
+        :return: The distance (cm), or MAX_VALUE (65535) if nothing is in range
+        :rtype: float
+        """
+        if not self._running:
+            self._measure_if_stale()
+        state = disable_irq()
+        pulse_us = self._pulse_us
+        enable_irq(state)
+        if pulse_us <= 0:
+            return self.MAX_VALUE
+        self.cms = self._pulse_to_cm(pulse_us)
+        return self.cms
+
+    def _pulse_to_cm(self, pulse_us):
+        # sound travels the distance twice, at 1 cm per 29.1 us
+        return (pulse_us / 2) / 29.1
+
+    def _measure_if_stale(self):
+        # Blocking mode: ping unless the last measurement is recent. Unlike XRPLib, a missed echo
+        # is cached too, so a dropout doesn't trigger a burst of extra blocking pings
+        if self._readings > 0 and time.ticks_diff(time.ticks_us(), self._pulse_time) < self.cache_time_us:
+            return
+        try:
+            pulse_us = self._send_pulse_and_wait()
+        except OSError as exception:
+            # We don't want programs to crash if the HC-SR04 doesn't see anything in range
+            if exception.args[0] != 110: # 110 = ETIMEDOUT
+                raise exception
+            pulse_us = 0
+        self._store_pulse(max(pulse_us, 0), time.ticks_us())
+
+    def _filter(self, max_age_us):
+        # Copy the fresh measurements, then take the median of the valid ones
+        state = disable_irq()
+        now = time.ticks_us()
+        n = 0
+        for i in range(len(self._history_pulses)):
+            age = time.ticks_diff(now, self._history_times[i])
+            if i >= self._readings or age > max_age_us:
+                continue
+            if self._history_pulses[i] > 0:
+                self._filter_pulses[n] = self._history_pulses[i]
+                self._filter_times[n] = age
+                n += 1
+        enable_irq(state)
+        if n == 0:
+            return 0, 0, None
+        valid = sorted(self._filter_pulses[0:n])
+        median = valid[n // 2] if n % 2 else (valid[n//2 - 1] + valid[n//2]) // 2
+        # Readings close to the median are inliers; dropouts and outliers lower the confidence
+        tolerance = max(self.OUTLIER_CM * 58.2, self.OUTLIER_FRACTION * median)
+        inliers = 0
+        age = max_age_us
+        for i in range(n):
+            if abs(self._filter_pulses[i] - median) <= tolerance:
+                inliers += 1
+                if self._filter_times[i] < age:
+                    age = self._filter_times[i]
+        return median, inliers / len(self._history_pulses), age
+
+    def filtered_distance(self, max_age: float = 0.5) -> float:
+        """
+        Get the median distance of the recent measurements, ignoring missed echoes.
+        In blocking mode, a new measurement is made if the last one is not recent.
+
+        :param max_age: Measurements older than this (in seconds) are ignored
+        :type max_age: float
+        :return: The filtered distance (cm), or MAX_VALUE (65535) if there are no valid recent measurements
+        :rtype: float
+        """
+        if not self._running:
+            self._measure_if_stale()
+        median, _, _ = self._filter(int(max_age * 1000000))
+        if median <= 0:
+            return self.MAX_VALUE
+        return self._pulse_to_cm(median)
+
+    def get_confidence(self, max_age: float = 0.5) -> float:
+        """
+        :param max_age: Measurements older than this (in seconds) are ignored
+        :type max_age: float
+        :return: The fraction of the recent measurements that agree with the filtered distance, from 0 to 1.
+            Missed echoes, outliers and stale measurements lower the confidence
+        :rtype: float
+        """
+        return self._filter(int(max_age * 1000000))[1]
+
+    def get_age(self, max_age: float = 0.5) -> float:
+        """
+        :param max_age: Measurements older than this (in seconds) are ignored
+        :type max_age: float
+        :return: The time since the newest measurement that agrees with the filtered distance (in seconds), or None if there is none
+        :rtype: float
+        """
+        age = self._filter(int(max_age * 1000000))[2]
+        return None if age is None else age / 1000000
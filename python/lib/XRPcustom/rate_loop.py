@@ -0,0 +1,138 @@
+from array import array
+import time
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+"""
+Pacing for control loops on absolute deadlines, with timing statistics.
+Unlike time.sleep(period) after the loop body, the period does not grow with the time the body takes.
+"""
+
+class RateLoop:
+
+    def __init__(self, period: float = 0.01, bin_width_us: int = 250, bins: int = 16):
+        """
+        Wakes up on absolute ticks_us deadlines, period apart. Records how late each wake-up was
+        (jitter) in a histogram, and counts overruns, i.e. iterations whose body took longer than the period.
+
+        :param period: The loop period, in seconds
+        :type period: float
+        :param bin_width_us: The width of a histogram bin, in microseconds
+        :type bin_width_us: int
+        :param bins: The number of histogram bins; the last bin also counts all larger delays
+        :type bins: int
+        """
+        self.period_us = int(period * 1000000)
+        self.bin_width_us = bin_width_us
+        self._histogram = array('i', [0]*bins)
+        self._deadline = time.ticks_us()
+        self._overrun = False
+        self.reset_stats()
+
+    def start(self):
+        """
+        Starts timing: the first wait() returns one period from now
+        """
+        self._deadline = time.ticks_add(time.ticks_us(), self.period_us)
+
+    def _remaining_us(self) -> int:
+        # Time until the deadline; a negative value is an overrun
+        now = time.ticks_us()
+        remaining = time.ticks_diff(self._deadline, now)
+        self._overrun = remaining < 0
+        if self._overrun:
+            self.overruns += 1
+            if -remaining > self.max_overrun_us:
+                self.max_overrun_us = -remaining
+        return remaining
+
+    def _record(self):
+        # Lateness of this wake-up relative to its deadline, overruns included
+        now = time.ticks_us()
+        late = time.ticks_diff(now, self._deadline)
+        if late < 0:
+            late = 0
+        if late > self.max_late_us:
+            self.max_late_us = late
+        self._total_late_us += late
+        i = late // self.bin_width_us
+        if i >= len(self._histogram):
+            i = len(self._histogram) - 1
+        self._histogram[i] += 1
+        self.iterations += 1
+        if self._overrun:
+            # Restart the schedule from now, instead of running a burst of late iterations to catch up
+            self._deadline = time.ticks_add(now, self.period_us)
+        else:
+            self._deadline = time.ticks_add(self._deadline, self.period_us)
+
+    def wait(self):
+        """
+        Sleeps until the next deadline
+        """
+        remaining = self._remaining_us()
+        if remaining > 0:
+            time.sleep_us(remaining)
+        self._record()
+
+    async def wait_async(self):
+        """
+        Same as wait(), for asyncio tasks: other tasks run until the next deadline.
+        The asyncio scheduler only guarantees millisecond resolution.
+        """
+        remaining = self._remaining_us()
+        if remaining > 0:
+            await asyncio.sleep_ms((remaining + 999) // 1000)
+        self._record()
+
+    def reset_stats(self):
+        """
+        Clears the timing statistics
+        """
+        for i in range(len(self._histogram)):
+            self._histogram[i] = 0
+        self.iterations = 0
+        self.overruns = 0
+        self.max_overrun_us = 0
+        self.max_late_us = 0
+        self._total_late_us = 0
+
+    def get_histogram(self) -> array:
+        """
+        :return: The number of wake-ups by lateness: bin i counts delays from i*bin_width_us to (i+1)*bin_width_us
+        :rtype: array
+        """
+        return self._histogram
+
+    def get_stats(self) -> dict:
+        """
+        Timing statistics since the last reset.
+        Keys: iterations, overruns, max_overrun_us, max_late_us, mean_late_us
+
+        :return: The timing statistics
+        :rtype: dict
+        """
+        return {
+            "iterations": self.iterations,
+            "overruns": self.overruns,
+            "max_overrun_us": self.max_overrun_us,
+            "max_late_us": self.max_late_us,
+            "mean_late_us": self._total_late_us / self.iterations if self.iterations else 0,
+        }
+
+    def print_stats(self):
+        """
+        Prints the timing statistics and the lateness histogram
+        """
+        stats = self.get_stats()
+        print("period %d us: %d iterations, %d overruns (max %d us), late max %d us, mean %.0f us" % (
+            self.period_us, stats["iterations"], stats["overruns"], stats["max_overrun_us"],
+            stats["max_late_us"], stats["mean_late_us"]))
+        for i in range(len(self._histogram)):
+            if self._histogram[i]:
+                if i == len(self._histogram) - 1:
+                    print("  >= %5d us: %d" % (i*self.bin_width_us, self._histogram[i]))
+                else:
+                    print("  %5d-%5d us: %d" % (i*self.bin_width_us, (i+1)*self.bin_width_us, self._histogram[i]))
@@ -0,0 +1,36 @@
+from XRPLib.reflectance import Reflectance as _XRPLibReflectance
+from .adc_sampler import AdcSampler
+
+class Reflectance(_XRPLibReflectance):
+    """
+    Analog reflectance sensors read in the background by an AdcSampler, so get_left()/get_right()
+    return oversampled, low-pass filtered values without reading the ADC.
+    """
+
+    def __init__(self, leftPin: int|str = "LINE_L", rightPin: int|str = "LINE_R", sampler: AdcSampler = None):
+        """
+        :param sampler: The sampler reading the sensors; by default, the shared ADC sampler
+        :type sampler: AdcSampler
+        """
+        super().__init__(leftPin, rightPin)
+        if sampler is None:
+            sampler = AdcSampler.get_default_adc_sampler()
+        self.sampler = sampler
+        self._left_channel = sampler.add_channel(leftPin)
+        self._right_channel = sampler.add_channel(rightPin)
+
+    def get_left(self) -> float:
+        """
+        Gets the the filtered reflectance of the left reflectance sensor
+        : return: The reflectance ranging from 0 (white) to 1 (black)
+        : rtype: float
+        """
+        return self.sampler.get_value(self._left_channel) / self.MAX_ADC_VALUE
+
+    def get_right(self) -> float:
+        """
+        Gets the the filtered reflectance of the right reflectance sensor
+        : return: The reflectance ranging from 0 (white) to 1 (black)
+        : rtype: float
+        """
+        return self.sampler.get_value(self._right_channel) / self.MAX_ADC_VALUE
@@ -0,0 +1,161 @@
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+from .rate_loop import RateLoop
+import time
+
+"""
+Cooperative (asyncio) versions of the blocking XRP operations, so that several tasks
+(driving, sensors, display, telemetry) can run at the same time on one core.
+Motions are awaited with drivetrain.straight_async(), turn_async(), etc.
+
+    from XRPcustom.defaults import *
+    from XRPcustom import runtime
+
+    async def main():
+        await runtime.wait_for_button()
+        runtime.write_line(1, "Driving")
+        await drivetrain.straight_async(50)
+
+    runtime.run(main())
+"""
+
+_display = None
+_display_dirty = False
+
+def _get_display(display):
+    if display is not None:
+        return display
+    if _display is not None:
+        return _display
+    from .defaults import display
+    return display
+
+async def wait_until(condition, period: float = 0.01, timeout: float = None) -> bool:
+    """
+    Waits until condition() returns True, checking it every period seconds while other tasks run
+
+    :param condition: A function with no arguments, e.g. linearray.all_black
+    :type condition: function
+    :param period: The time between checks, in seconds
+    :type period: float
+    :param timeout: The maximal time to wait, in seconds, or None to wait forever
+    :type timeout: float
+    :return: True if the condition became true, False on timeout
+    :rtype: bool
+    """
+    loop = RateLoop(period)
+    loop.start()
+    # A deadline rather than a number of checks: a slow condition or busy tasks make the checks late
+    deadline = None if timeout is None else time.ticks_add(time.ticks_ms(), int(timeout * 1000))
+    while not condition():
+        if deadline is not None and time.ticks_diff(time.ticks_ms(), deadline) >= 0:
+            return False
+        await loop.wait_async()
+    return True
+
+async def wait_for_button(display = None) -> int:
+    """
+    Waits until a display button is pressed and released. Returns button index: 1 for button A, 2 for button B
+    """
+    display = _get_display(display)
+    press = None
+    def pressed():
+        nonlocal press
+        if display.is_button_pressed(display.buttonA):
+            press = 1
+        elif display.is_button_pressed(display.buttonB):
+            press = 2
+        return press is not None
+    await wait_until(pressed)
+    await wait_until(lambda: not (display.is_button_pressed(display.buttonA) or display.is_button_pressed(display.buttonB)))
+    return press
+
+async def read_distance(rangefinder = None, filtered: bool = False) -> float:
+    """
+    Waits for the next rangefinder measurement, without blocking other tasks.
+    Starts background measuring of the rangefinder if it is not running.
+
+    :param filtered: If True, return the filtered (median) distance instead of the latest measurement
+    :type filtered: bool
+    :return: The distance, in cm
+    :rtype: float
+    """
+    if rangefinder is None:
+        from .defaults import rangefinder
+    if not rangefinder.is_running():
+        rangefinder.start()
+    count = rangefinder.get_reading_count()
+    await wait_until(lambda: rangefinder.get_reading_count() != count, period=0.005)
+    return rangefinder.filtered_distance() if filtered else rangefinder.distance()
+
+async def move_servo(servo, degrees: float, speed: float = 90, acceleration: float = 360):
+    """
+    Moves the servo smoothly to the given angle and waits until the move is finished; see Servo.move_to()
+    """
+    servo.move_to(degrees, speed, acceleration)
+    await wait_until(servo.is_done, period=0.02)
+
+def write_line(line, text, font = None, fg = None, display = None):
+    """
+    Same as display.write_line(), but only draws the text in memory; the screen is updated
+    by the display task started by run(), at most 10 times per second. Several writes are shown together,
+    and the slow transfer to the screen doesn't delay the task that writes.
+    """
+    global _display_dirty
+    _get_display(display).write_line(line, text, font, fg, show=False)
+    _display_dirty = True
+
+async def refresh_display(display = None, period: float = 0.1):
+    """
+    The display task: shows the lines written with write_line() every period seconds
+    """
+    global _display_dirty
+    display = _get_display(display)
+    loop = RateLoop(period)
+    loop.start()
+    while True:
+        if _display_dirty:
+            _display_dirty = False
+            display.display.show()
+        await loop.wait_async()
+
+async def every(period: float, callback):
+    """
+    Calls callback() every period seconds, e.g. for telemetry: asyncio.create_task(runtime.every(0.5, print_pose))
+    """
+    loop = RateLoop(period)
+    loop.start()
+    while True:
+        callback()
+        await loop.wait_async()
+
+def run(main_coro, display = None, drivetrain = None):
+    """
+    Runs the main coroutine together with the display task, and stops the drivetrain when it finishes
+    (also on an error or Ctrl-C)
+
+    :param main_coro: The main coroutine, e.g. main()
+    :param display: The display, by default the default display
+    :type display: XrpDisplay
+    :param drivetrain: The drivetrain to stop at the end, by default the default drivetrain
+    :type drivetrain: DifferentialDrive
+    """
+    global _display
+    _display = _get_display(display)
+    if drivetrain is None:
+        from .defaults import drivetrain
+    async def main():
+        refresher = asyncio.create_task(refresh_display(_display))
+        try:
+            return await main_coro
+        finally:
+            refresher.cancel()
+            if _display_dirty:
+                _display.display.show()
+    try:
+        return asyncio.run(main())
+    finally:
+        drivetrain.stop()
+        asyncio.new_event_loop()
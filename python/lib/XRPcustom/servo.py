@@ -0,0 +1,119 @@
+from XRPLib.servo import Servo as _XRPLibServo
+from .servo_motion import ServoMotion, limited_velocity
+
+class Servo(_XRPLibServo):
+    """
+    Servo with smooth, non-blocking moves: move_to() returns at once, and the shared ServoMotion
+    engine moves the servo with limited speed and acceleration, avoiding current spikes.
+    set_angle() still jumps to the angle immediately.
+    """
+
+    _DEFAULT_SERVO_ONE_INSTANCE = None
+    _DEFAULT_SERVO_TWO_INSTANCE = None
+    _DEFAULT_SERVO_THREE_INSTANCE = None
+    _DEFAULT_SERVO_FOUR_INSTANCE = None
+
+    def __init__(self, signal_pin: int|str, engine: ServoMotion = None):
+        """
+        :param engine: The engine moving this servo; by default, the shared servo motion engine
+        :type engine: ServoMotion
+        """
+        super().__init__(signal_pin)
+        if engine is None:
+            engine = ServoMotion.get_default_servo_motion()
+        self._engine = engine
+        # The commanded angle is unknown until the first command
+        self._angle = None
+        self._velocity = 0
+        self._target = None
+        self._max_speed = 0
+        self._max_acceleration = 0
+        self._moving = False
+        self._done_callback = None
+        engine.register(self)
+
+    def _cancel(self):
+        # Ends a move without finishing it: on_done is not called
+        self._moving = False
+        self._velocity = 0
+        self._done_callback = None
+
+    def _write(self, degrees):
+        self._servo.duty_ns(int(degrees * self.MICROSEC_PER_DEGREE + self.LOW_ANGLE_OFFSET))
+
+    def set_angle(self, degrees: float):
+        """
+        Sets the angle of the servo immediately, cancelling any move in progress (its on_done function is not called)
+        :param degrees: The angle to set the servo to [0,200]
+        :ptype degrees: float
+        """
+        self._cancel()
+        self._angle = degrees
+        self._target = degrees
+        self._write(degrees)
+
+    def move_to(self, degrees: float, speed: float = 90, acceleration: float = 360, on_done = None):
+        """
+        Starts moving the servo to the given angle, and returns immediately.
+        If the current angle is unknown (no command since start-up), the servo goes there at once, as with set_angle().
+
+        :param degrees: The target angle [0,200]
+        :type degrees: float
+        :param speed: The maximal speed, in degrees per second
+        :type speed: float
+        :param acceleration: The maximal acceleration, in degrees per second squared
+        :type acceleration: float
+        :param on_done: A function called with the servo as the argument when the move is finished (from the timer, so keep it short)
+        :type on_done: function
+        """
+        if self._angle is None:
+            self.set_angle(degrees)
+            # Already there: the engine calls on_done on its next tick
+            self._done_callback = on_done
+            self._engine.start()
+            return
+        self._done_callback = on_done
+        self._target = degrees
+        self._max_speed = speed
+        self._max_acceleration = acceleration
+        self._moving = True
+        self._engine.start()
+
+    def _step(self, dt):
+        # Called by the engine on every tick while moving
+        distance = self._target - self._angle
+        self._velocity = limited_velocity(distance, self._velocity, self._max_speed, self._max_acceleration, dt)
+        self._angle += self._velocity * dt
+        if abs(self._target - self._angle) < 0.05 or (self._target - self._angle) * distance < 0:
+            self._angle = self._target
+            self._velocity = 0
+            self._moving = False
+        self._write(self._angle)
+
+    def is_done(self) -> bool:
+        """
+        :return: True if the servo is not moving
+        :rtype: bool
+        """
+        return not self._moving
+
+    def get_angle(self) -> float:
+        """
+        :return: The angle commanded to the servo right now (the servo itself may lag behind), or None if unknown
+        :rtype: float
+        """
+        return self._angle
+
+    def stop(self):
+        """
+        Stops a move in progress at the current angle; its on_done function is not called
+        """
+        self._cancel()
+
+    def free(self):
+        """
+        Allows the servo to spin freely without holding position
+        """
+        self._cancel()
+        self._angle = None
+        super().free()
@@ -0,0 +1,91 @@
+from machine import Timer
+import math
+
+class ServoMotion:
+    """
+    Moves servos smoothly from one shared timer. On every tick, each moving servo steps towards
+    its target with limited speed and acceleration, and all servos get their new positions in the same tick.
+    The timer only runs while some servo is moving.
+    """
+
+    _DEFAULT_SERVO_MOTION_INSTANCE = None
+
+    @classmethod
+    def get_default_servo_motion(cls):
+        """
+        Get the default servo motion engine, shared by the default servos. This is a singleton, so only one instance will ever exist.
+        """
+        if cls._DEFAULT_SERVO_MOTION_INSTANCE is None:
+            cls._DEFAULT_SERVO_MOTION_INSTANCE = cls()
+        return cls._DEFAULT_SERVO_MOTION_INSTANCE
+
+    def __init__(self, freq: int = 50):
+        """
+        :param freq: The update rate, in Hz. Servos read their position once per 20 ms PWM frame, so 50 Hz is enough
+        :type freq: int
+        """
+        self.freq = freq
+        self.servos = []
+        # Use a virtual timer so we can leave the hardware timers up for the user
+        self._timer = Timer(-1)
+        self._running = False
+
+    def register(self, servo):
+        """
+        :param servo: The servo to move from this engine
+        :type servo: Servo
+        """
+        if servo not in self.servos:
+            self.servos.append(servo)
+
+    def start(self):
+        """
+        Starts the update timer, if it is not running yet
+        """
+        if not self._running:
+            self._timer.init(freq=self.freq, callback=lambda t: self._tick())
+            self._running = True
+
+    def stop(self):
+        """
+        Stops the update timer; moving servos stop where they are
+        """
+        self._timer.deinit()
+        self._running = False
+
+    def _tick(self):
+        dt = 1 / self.freq
+        for servo in self.servos:
+            if servo._moving:
+                servo._step(dt)
+        # Report completions after all servos were updated
+        for servo in self.servos:
+            if servo._done_callback is not None and not servo._moving:
+                callback = servo._done_callback
+                servo._done_callback = None
+                callback(servo)
+        # Checked after the callbacks, which may start new moves
+        for servo in self.servos:
+            if servo._moving:
+                return
+        self.stop()
+
+
+def limited_velocity(distance: float, velocity: float, max_speed: float, max_acceleration: float, dt: float) -> float:
+    """
+    The velocity for the next step towards a target at the given distance: as fast as allowed by max_speed,
+    without changing velocity faster than max_acceleration, and slow enough to stop at the target.
+
+    :param distance: The remaining distance (signed)
+    :type distance: float
+    :param velocity: The current velocity
+    :type velocity: float
+    :return: The new velocity
+    :rtype: float
+    """
+    sign = 1 if distance >= 0 else -1
+    # Fastest speed from which we can still stop in the remaining distance
+    stopping = math.sqrt(2 * max_acceleration * abs(distance))
+    desired = sign * min(max_speed, stopping, abs(distance) / dt)
+    change = max_acceleration * dt
+    return max(velocity - change, min(velocity + change, desired))
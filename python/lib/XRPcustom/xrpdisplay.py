@@ -13,7 +13,7 @@ This is a micropython library for XRP display by Alexander Kirillov.
 """
 
 # import micropython libraries 
-from machine import Pin, SPI, ADC
+from machine import Pin, SPI
 import time
 import sys
 import neopixel
@@ -24,6 +24,7 @@ from .st7789_purefb import ST7789_SPI
 from . import PTSans_NarrowBold_32 
 from . import ezFBfont_helvB14_ascii_18 
 from . import PTSans_Narrow_24 
+from .battery import BatteryMonitor
 
 disp_sck    = 18 # default SCK of SPI(0)
 disp_mosi   = 19 # default MOSI of SPI(0)
@@ -34,7 +35,6 @@ disp_cs     = 17
 neopixel_pin = 37
 buttonA_pin = 36
 buttonB_pin = 12 
-vin_pin     = 46
 
 class XrpDisplay:
     def __init__(self):
@@ -87,9 +87,7 @@ class XrpDisplay:
         #self.smallfont2.write('Press any button \nto continue', 5, 85)
         
         #get battery voltage
-        self.adc = ADC(Pin(vin_pin))
-        
-        voltage = self.adc.read_u16()*(3.3/65535)*4.03
+        voltage = BatteryMonitor.get_default_battery_monitor().get_voltage()
 
         self.smallfont2.write(f'Battery: {voltage:1.2f}v', 40, 55, fg = self.BLUE)
         self.display.show()
@@ -98,14 +96,16 @@ class XrpDisplay:
         self.display.fill(self.BLACK)
         self.display.show()  
 
-    def write_line(self, line, text, font = None, fg = None):
+    def write_line(self, line, text, font = None, fg = None, show = True):
         if font is None:
             font = self.smallfont
         # first, clear the space from previous messages
         numlines = text.count('\n') + 1
         self.display.fill_rect(1, 22*(line-1)+3, self.display.width, 22*numlines, self.BLACK)
         font.write(text, 5, 22*(line-1)+3, fg = fg)
-        self.display.show()
+        # with show = False, the text is only drawn in memory until the next show()
+        if show:
+            self.display.show()
 
     def set_leds(self, left_color, right_color = None):
         if right_color is None:
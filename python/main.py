@@ -1,26 +1,11 @@
 from machine import Pin
 import time
-import xrpdisplay
-from XRPLib.defaults import *
-from XRPLib.pid import PID
+from XRPcustom.defaults import *
+from XRPcustom.pid import PID
 
 
 def turn2(angle, max_effort = 0.4, timeout = 1.5):
-    turn_controller =  PID(
-                # kp = 0.2,
-                # ki = 0.004,
-                # kd = 0.0036,
-                kd = 0.003, #scale*(0.0036 + 0.0034 * (max(max_effort, 0.5) - 0.5) * 2),
-                kp = 0.03,
-                ki = 0.003, # 0.003,
-                #kd = 0.007,
-                min_output = 0.12,
-                max_output = max_effort,
-                max_integral = 30,
-                tolerance = 1, #degree
-                tolerance_count = 3
-    )
-    drivetrain.turn (angle, timeout = timeout, main_controller = turn_controller)    
+    drivetrain.turn(angle, max_effort, timeout = timeout, tolerance = 1)
 
 def straight2(distance, max_effort = 0.5, timeout = None):
     dist_controller = PID(
@@ -50,7 +35,7 @@ GREEN = (0,32,0)
 BLUE = (0,0,64)
 
 
-d = xrpdisplay.XrpDisplay()
+d = display
 # Setting LED colors. First argument is color of left LED, second, of right.
 # Second argument is optional; if omitted, same color is used for both LEDs:
 # d.set_leds(RED)
@@ -0,0 +1,48 @@
+"""
+Host tests run the library under CPython, with the MicroPython-only modules replaced by the stubs
+in tests/stubs and the MicroPython time functions driven by a fake microsecond clock.
+"""
+import builtins
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tests", "stubs"))
+sys.path.insert(0, os.path.join(ROOT, "python", "XRP-default-software"))
+sys.path.insert(0, os.path.join(ROOT, "python", "lib"))
+
+# XRPLib only imports on the XRP board
+sys.implementation._machine = "SparkFun XRP Controller (Beta) with RP2040"
+
+# Viper pointer annotations are evaluated when the functions are defined
+builtins.ptr8 = builtins.ptr16 = builtins.ptr32 = object
+
+TICKS_PERIOD = 1 << 30
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.us = 0
+
+    def advance(self, us):
+        self.us += int(us)
+
+
+clock = FakeClock()
+
+time.ticks_us = lambda: clock.us % TICKS_PERIOD
+time.ticks_ms = lambda: (clock.us // 1000) % TICKS_PERIOD
+time.ticks_add = lambda t, delta: (t + delta) % TICKS_PERIOD
+time.ticks_diff = lambda a, b: ((a - b + TICKS_PERIOD // 2) % TICKS_PERIOD) - TICKS_PERIOD // 2
+time.sleep_ms = lambda ms: clock.advance(ms * 1000)
+time.sleep_us = lambda us: clock.advance(us)
+
+
+@pytest.fixture
+def fake_clock():
+    clock.us = 0
+    return clock
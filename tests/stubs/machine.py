@@ -0,0 +1,125 @@
+"""
+Host stand-in for the MicroPython machine module: pins whose IRQs are fired by the test,
+an I2C bus backed by a register array, and timers that only remember their callback.
+"""
+
+_irq_disabled = 0
+
+def disable_irq():
+    global _irq_disabled
+    _irq_disabled += 1
+    return _irq_disabled - 1
+
+def enable_irq(state):
+    global _irq_disabled
+    _irq_disabled = state
+
+def freq():
+    return 125000000
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, pin, mode=IN, pull=None, value=0):
+        self.pin = pin
+        self._value = value
+        self.handler = None
+        self.trigger = None
+        self.hard = False
+
+    def __index__(self):
+        return self.pin if isinstance(self.pin, int) else 0
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = v
+
+    def irq(self, handler=None, trigger=IRQ_RISING, hard=False):
+        self.handler = handler
+        self.trigger = trigger
+        self.hard = hard
+
+    def fire(self):
+        # Simulates an edge on the pin: runs the IRQ handler like the hardware would
+        if self.handler is not None:
+            self.handler(self)
+
+
+class I2C:
+
+    def __init__(self, id=0, scl=None, sda=None, freq=400000):
+        self.regs = bytearray(256)
+        # WHO_AM_I of the LSM6DSO, and CTRL3_C after reset
+        self.regs[0x0F] = 0x6C
+        self.regs[0x12] = 0x04
+
+    def readfrom_mem_into(self, addr, reg, buf):
+        for i in range(len(buf)):
+            buf[i] = self.regs[reg + i]
+
+    def writeto_mem(self, addr, reg, buf):
+        for i in range(len(buf)):
+            self.regs[reg + i] = buf[i]
+        if reg == 0x12 and buf[0] & 0x01:
+            # Software reset completes immediately
+            self.regs[0x12] = 0x04
+
+    def write_int16(self, reg, value):
+        # Test helper: stores a little-endian int16 output register
+        value &= 0xFFFF
+        self.regs[reg] = value & 0xFF
+        self.regs[reg + 1] = value >> 8
+
+
+class Timer:
+
+    def __init__(self, id=-1):
+        self.callback = None
+        self.freq = None
+
+    def init(self, mode=None, freq=None, period=None, callback=None):
+        self.freq = freq
+        self.callback = callback
+
+    def deinit(self):
+        self.callback = None
+
+
+class ADC:
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.value = 0
+
+    def read_u16(self):
+        return self.value
+
+
+class PWM:
+
+    def __init__(self, pin, freq=50, duty_u16=0):
+        self._freq = freq
+        self._duty = duty_u16
+        self._duty_ns = 0
+
+    def freq(self, f=None):
+        if f is None:
+            return self._freq
+        self._freq = f
+
+    def duty_u16(self, d=None):
+        if d is None:
+            return self._duty
+        self._duty = d
+
+    def duty_ns(self, d=None):
+        if d is None:
+            return self._duty_ns
+        self._duty_ns = d
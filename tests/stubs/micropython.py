@@ -0,0 +1,28 @@
+"""
+Host stand-in for the MicroPython micropython module.
+Code emitters are no-ops, and scheduled callbacks wait in a queue until the test runs them.
+"""
+
+SCHEDULE_DEPTH = 8
+
+_queue = []
+
+def const(value):
+    return value
+
+def native(f):
+    return f
+
+def viper(f):
+    return f
+
+def schedule(func, arg):
+    if len(_queue) >= SCHEDULE_DEPTH:
+        raise RuntimeError("schedule queue full")
+    _queue.append((func, arg))
+
+def run_scheduled():
+    # Test helper: runs the pending callbacks, as the VM does between bytecodes
+    while _queue:
+        func, arg = _queue.pop(0)
+        func(arg)
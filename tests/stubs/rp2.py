@@ -0,0 +1,43 @@
+"""
+Host stand-in for the rp2 module: PIO programs are not assembled, and state machines
+only have an RX FIFO that the test fills.
+"""
+
+class PIO:
+    SHIFT_LEFT = 0
+    SHIFT_RIGHT = 1
+
+
+def asm_pio(**kwargs):
+    def decorator(program):
+        return program
+    return decorator
+
+
+class StateMachine:
+
+    def __init__(self, id, program=None, freq=None, **kwargs):
+        self.id = id
+        self.program = program
+        self.freq = freq
+        self.fifo = []
+        self.running = False
+
+    def active(self, value=None):
+        if value is not None:
+            self.running = bool(value)
+        return self.running
+
+    def exec(self, instruction):
+        pass
+
+    def put(self, value):
+        self.fifo.append(value)
+
+    def rx_fifo(self):
+        return len(self.fifo)
+
+    def get(self):
+        if not self.fifo:
+            return 0
+        return self.fifo.pop(0)
@@ -0,0 +1,30 @@
+"""
+Host stand-in for the uctypes module, limited to 8-bit bitfields in a bytearray.
+"""
+
+BF_POS = 17
+BF_LEN = 22
+BFUINT8 = 0
+
+def addressof(buf):
+    return buf
+
+
+class struct:
+
+    def __init__(self, buf, layout):
+        object.__setattr__(self, "_buf", buf)
+        object.__setattr__(self, "_layout", layout)
+
+    def _field(self, name):
+        desc = self._layout[name]
+        return (desc >> BF_POS) & 0x1F, (desc >> BF_LEN) & 0x1F
+
+    def __getattr__(self, name):
+        pos, length = self._field(name)
+        return (self._buf[0] >> pos) & ((1 << length) - 1)
+
+    def __setattr__(self, name, value):
+        pos, length = self._field(name)
+        mask = ((1 << length) - 1) << pos
+        self._buf[0] = (self._buf[0] & ~mask) | ((int(value) << pos) & mask)
@@ -0,0 +1,145 @@
+import sys
+import time
+
+import pytest
+
+from XRPcustom.core1 import STATE_SIZE, Core1Loop, SharedState
+from XRPcustom.imu import IMU
+from XRPcustom.motor_scheduler import MotorScheduler
+
+
+class ChangingValues:
+    """
+    Stands in for the values array: a complete write happens on core 1 while the first `writes` reads are copying
+    """
+
+    def __init__(self, state, writes):
+        self.state = state
+        self.writes = writes
+        self.values = [float(i) for i in range(STATE_SIZE)]
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        if i == 0 and self.writes > 0:
+            self.writes -= 1
+            self.state.begin_write()
+            self.state.end_write()
+        return self.values[i]
+
+
+def test_read_returns_a_copy():
+    state = SharedState(STATE_SIZE)
+    state.begin_write()
+    state._values[0] = 5
+    state.end_write()
+    values = state.read()
+    assert values[0] == 5
+    state._values[0] = 6
+    assert values[0] == 5
+
+
+def test_read_retries_while_the_writer_changes_values():
+    state = SharedState(STATE_SIZE)
+    state._values = ChangingValues(state, 3)
+    assert list(state.read(tries=4)) == list(range(STATE_SIZE))
+
+
+def test_read_gives_up_after_tries():
+    state = SharedState(STATE_SIZE)
+    state._values = ChangingValues(state, 3)
+    assert state.read(tries=3) is None
+    # Halfway through a write
+    state = SharedState(STATE_SIZE)
+    state.begin_write()
+    assert state.read() is None
+    state.end_write()
+    assert state.read() is not None
+
+
+class FakeMotor:
+
+    def get_speed(self):
+        return 0
+
+
+class FakeOdometry:
+
+    def __init__(self):
+        self.fail = False
+
+    @property
+    def _pose(self):
+        if self.fail:
+            raise ValueError("odometry failed")
+        return 0, 0, 0
+
+
+class FakeDrivetrain:
+
+    def __init__(self, imu):
+        self.imu = imu
+        self.odometry = FakeOdometry()
+        self.left_motor = FakeMotor()
+        self.right_motor = FakeMotor()
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def loop(fake_clock, monkeypatch):
+    # MicroPython only
+    monkeypatch.setattr(sys, "print_exception", lambda e: None, raising=False)
+    scheduler = MotorScheduler()
+    scheduler.start()
+    imu = IMU()
+    loop = Core1Loop(FakeDrivetrain(imu), imu, scheduler)
+    yield loop
+    loop.stop()
+
+
+def wait_stopped(loop):
+    # The loop runs in a real thread; wait for it on the real clock
+    for _ in range(1000):
+        if loop._stopped:
+            return
+        time.sleep(0.001)
+    raise AssertionError("the loop did not stop")
+
+
+def test_start_and_stop_move_the_work_to_core1_and_back(loop):
+    scheduler, imu = loop.scheduler, loop.imu
+    loop.start()
+    assert loop.is_running()
+    assert scheduler._external and scheduler._timer.callback is None and scheduler._lock is not None
+    assert imu._external_updates and imu.update_timer.callback is None and imu._lock is not None
+    loop.stop()
+    assert not loop.is_running()
+    assert not scheduler._external and scheduler._timer.callback is not None and scheduler._lock is None
+    assert not imu._external_updates and imu.update_timer.callback is not None and imu._lock is None
+
+
+def test_exception_stops_the_motors(loop):
+    loop.drivetrain.odometry.fail = True
+    loop.start()
+    wait_stopped(loop)
+    assert isinstance(loop.error, ValueError)
+    assert not loop.is_running()
+    assert loop.drivetrain.stopped
+    # stop() still gives the work back to the timers
+    loop.stop()
+    assert not loop.scheduler._external and loop.scheduler._timer.callback is not None
+    assert not loop.imu._external_updates and loop.imu.update_timer.callback is not None
+
+
+def test_stopped_imu_timer_pauses_core1_updates(loop):
+    # calibrate() stops the timer while it reads the offsets
+    imu = loop.imu
+    loop.start()
+    imu._stop_timer()
+    assert imu._paused
+    imu._start_timer()
+    assert not imu._paused
@@ -0,0 +1,20 @@
+import pytest
+
+from XRPcustom.encoded_motor import EncodedMotor
+from XRPcustom.encoder import Encoder
+from XRPcustom.motor import SinglePWMMotor
+from XRPcustom.motor_scheduler import MotorScheduler
+
+
+@pytest.fixture
+def motor(fake_clock):
+    return EncodedMotor(SinglePWMMotor(6, 7), Encoder(0, 4, 5), scheduler=MotorScheduler())
+
+
+def test_integral_limit_does_not_change_with_rate(motor):
+    controller = motor.DEFAULT_SPEED_CONTROLLER
+    limit = controller._i_limit
+    assert limit == pytest.approx(EncodedMotor.DEFAULT_SPEED_KI * EncodedMotor.DEFAULT_SPEED_MAX_INTEGRAL)
+    for freq in (200, 500, 25):
+        motor._scheduler.set_freq(freq)
+        assert controller._i_limit == pytest.approx(limit)
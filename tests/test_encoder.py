@@ -0,0 +1,228 @@
+import types
+
+import machine
+import pytest
+
+from XRPcustom.encoder import Encoder
+
+# A slow state machine clock keeps the cycle-by-cycle simulation short: 1 cycle = 1 us
+SM_FREQ = 1000000
+
+
+class PioProgram:
+    """
+    Assembles a PIO program written with the rp2.asm_pio syntax into a list of instructions,
+    by running the program function with the assembler names bound to recorders.
+    """
+
+    def __init__(self, function):
+        self.instructions = []
+        self.labels = {}
+        self.wrap_target = 0
+        self.wrap = None
+        names = {
+            "wrap_target": self._wrap_target, "wrap": self._wrap, "label": self._label,
+            "mov": self._mov, "jmp": self._jmp, "push": self._push,
+            "invert": lambda source: ("invert", source),
+            "x": "x", "isr": "isr", "null": "null", "pin": "pin", "x_dec": "x_dec", "noblock": "noblock",
+        }
+        types.FunctionType(function.__code__, names)()
+        if self.wrap is None:
+            self.wrap = len(self.instructions) - 1
+
+    def _wrap_target(self):
+        self.wrap_target = len(self.instructions)
+
+    def _wrap(self):
+        self.wrap = len(self.instructions) - 1
+
+    def _label(self, name):
+        self.labels[name] = len(self.instructions)
+
+    def _mov(self, destination, source):
+        self.instructions.append(("mov", destination, source))
+
+    def _jmp(self, condition, target=None):
+        if target is None:
+            condition, target = None, condition
+        self.instructions.append(("jmp", condition, target))
+
+    def _push(self, *options):
+        self.instructions.append(("push", "noblock" in options))
+
+
+class StateMachineModel:
+    """
+    Executes a PIO program one instruction per cycle, with 32-bit registers and a 4-deep RX FIFO
+    (the FIFO of the stub state machine).
+    """
+
+    def __init__(self, program, sm):
+        self.program = program
+        self.sm = sm
+        self.pc = 0
+        self.x = 0
+        self.isr = 0
+        self.cycle = 0
+
+    def _value(self, source):
+        if isinstance(source, tuple):
+            return ~self._value(source[1]) & 0xFFFFFFFF
+        return {"null": 0, "x": self.x, "isr": self.isr}[source]
+
+    def step(self, pin):
+        op = self.program.instructions[self.pc]
+        next_pc = self.pc + 1
+        if op[0] == "mov":
+            setattr(self, op[1], self._value(op[2]))
+        elif op[0] == "jmp":
+            condition, target = op[1], self.program.labels[op[2]]
+            if condition is None:
+                taken = True
+            elif condition == "pin":
+                taken = pin
+            else:
+                taken = self.x != 0
+                self.x = (self.x - 1) & 0xFFFFFFFF
+            if taken:
+                next_pc = target
+        elif op[0] == "push":
+            if len(self.sm.fifo) < Encoder.FIFO_DEPTH:
+                self.sm.fifo.append(self.isr)
+            self.isr = 0
+        if self.pc == self.program.wrap and next_pc == self.pc + 1:
+            next_pc = self.program.wrap_target
+        self.pc = next_pc
+        self.cycle += 1
+
+
+class Channel:
+    """
+    The timed encoder channel: high for the first half of each period; the period may change over time
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.phase = 0
+
+    def level(self):
+        return self.phase < self.period // 2
+
+    def advance(self):
+        self.phase += 1
+        if self.phase >= self.period:
+            self.phase = 0
+
+
+class Rig:
+
+    def __init__(self, encoder, clock, period):
+        self.encoder = encoder
+        self.clock = clock
+        self.channel = Channel(period)
+        self.model = StateMachineModel(PioProgram(Encoder._edge_timer), encoder.period_sm)
+        self.rises = []
+
+    def run(self, us):
+        # 1 cycle per microsecond: the fake clock advances with the state machine
+        for _ in range(us):
+            before = self.channel.level()
+            self.channel.advance()
+            if self.channel.level() and not before:
+                self.rises.append(self.clock.us + 1)
+            self.model.step(self.channel.level())
+            self.clock.advance(1)
+
+
+@pytest.fixture
+def encoder(fake_clock, monkeypatch):
+    monkeypatch.setattr(machine, "freq", lambda: SM_FREQ)
+    return Encoder(0, 4, 5)
+
+
+def rig(encoder, clock, period):
+    return Rig(encoder, clock, period)
+
+
+def test_edge_cycles_match_the_program(encoder, fake_clock):
+    program = PioProgram(Encoder._edge_timer)
+    assert [op[0] for op in program.instructions] == ["mov", "jmp", "jmp", "jmp", "jmp", "jmp", "mov", "push"]
+    r = rig(encoder, fake_clock, 1000)
+    r.run(5000)
+    values = list(encoder.period_sm.fifo)
+    # The first value counts from the start of the program, the others are full periods
+    assert len(values) == 4
+    assert all(2*loops + Encoder.EDGE_CYCLES == 1000 for loops in values[1:])
+
+
+@pytest.mark.parametrize("period", [998, 1000, 1001, 1003])
+def test_periods_are_exact_on_average(encoder, fake_clock, period):
+    r = rig(encoder, fake_clock, period)
+    r.run(period + 10)
+    encoder.get_period_us()
+    measured = []
+    for _ in range(3):
+        r.run(period)
+        measured.append(encoder.get_period_us())
+    # Edges are detected every 2 cycles, so a single period is within 2 cycles
+    assert all(abs(m - period) <= 2 for m in measured)
+    assert sum(measured) / len(measured) == pytest.approx(period, abs=1)
+
+
+def test_low_speed_uses_period(encoder, fake_clock):
+    # 4 counts per 50 ms = 80 counts/s, i.e. 1.6 counts per 20 ms tick: counting alone gives 50 or 100
+    r = rig(encoder, fake_clock, 50000)
+    r.run(110000)
+    assert encoder.estimate_velocity(0, 20000) == pytest.approx(80, rel=1e-3)
+    weight = 1 / Encoder.BLEND_COUNTS
+    assert encoder.estimate_velocity(1, 20000) == pytest.approx(weight*50 + (1 - weight)*80, rel=1e-3)
+    # The direction follows the counts
+    assert encoder.estimate_velocity(-1, 20000) == pytest.approx(-(weight*50 + (1 - weight)*80), rel=1e-3)
+
+
+def test_blend_of_period_and_counts(encoder, fake_clock):
+    # Period says 400 counts/s
+    r = rig(encoder, fake_clock, 10000)
+    r.run(30000)
+    # 4 counts in 20 ms (200 counts/s) weigh half
+    assert encoder.estimate_velocity(4, 20000) == pytest.approx(0.5*200 + 0.5*400, rel=1e-3)
+    # From BLEND_COUNTS per tick up, only counts are used
+    assert encoder.estimate_velocity(Encoder.BLEND_COUNTS, 20000) == pytest.approx(400)
+
+
+def test_edge_time_is_tracked_between_reads(encoder, fake_clock):
+    r = rig(encoder, fake_clock, 7300)
+    r.run(15000)
+    encoder.estimate_velocity(0, 20000)
+    for _ in range(10):
+        # Reads at times unrelated to the edges
+        r.run(20000)
+        encoder.estimate_velocity(2, 20000, fake_clock.us)
+        assert abs(encoder._last_edge_time - r.rises[-1]) <= 2
+
+
+def test_decay_without_edges(encoder, fake_clock):
+    r = rig(encoder, fake_clock, 20000)
+    r.run(45000)
+    encoder.estimate_velocity(0, 20000)
+    last_rise = r.rises[-1]
+    # The motor stops: no more edges
+    r.channel.period = 10**9
+    r.run(30000)
+    since_edge = fake_clock.us - last_rise
+    assert since_edge > 20000
+    # No edge for longer than the last period: the motor is slowing down
+    assert encoder.estimate_velocity(0, 20000) == pytest.approx(4000000 / since_edge, rel=1e-3)
+    r.run(Encoder.STOP_TIMEOUT_US)
+    assert encoder.estimate_velocity(0, 20000) == 0
+
+
+def test_full_fifo_does_not_give_stale_edge_time(encoder, fake_clock):
+    # 1 ms period: far more than 4 edges per 20 ms tick, so most periods are dropped
+    r = rig(encoder, fake_clock, 1000)
+    r.run(20000)
+    encoder.estimate_velocity(0, 20000)
+    r.run(20000)
+    velocity = encoder.estimate_velocity(80, 20000, fake_clock.us)
+    assert encoder._last_edge_time == fake_clock.us
+    assert velocity == pytest.approx(4000)
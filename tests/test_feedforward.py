@@ -0,0 +1,77 @@
+import pytest
+
+from XRPcustom import feedforward
+from XRPcustom.motor_scheduler import MotorScheduler
+
+KS, KV, KA = 0.1, 0.004, 0.0004
+
+
+class SimulatedMotor:
+    """
+    A motor with effort = ks*sign(v) + kv*v + ka*dv/dt (v in rpm), whose speed is measured
+    on the scheduler ticks like EncodedMotor
+    """
+
+    def __init__(self, scheduler):
+        self._scheduler = scheduler
+        self.effort = 0
+        self.rpm = 0
+        self.measured = 0
+        scheduler.register(self)
+
+    def _set_update_period(self, period):
+        self.period = period
+
+    def get_update_period(self):
+        return self.period
+
+    def _sample(self):
+        self.measured = self.rpm
+
+    def _estimate_speed(self):
+        pass
+
+    def _control(self):
+        pass
+
+    def set_speed(self, speed_rpm=None, acceleration=0):
+        self.effort = 0
+
+    def set_effort(self, effort):
+        self.effort = effort
+
+    def get_speed(self):
+        return self.measured
+
+    def physics(self, dt):
+        drive = self.effort
+        if self.rpm > 0 or (self.rpm == 0 and drive > KS):
+            drive -= KS
+        elif self.rpm < 0 or (self.rpm == 0 and drive < -KS):
+            drive += KS
+        else:
+            return
+        self.rpm += (drive - KV*self.rpm) / KA * dt
+
+
+def test_characterize_finds_constants(fake_clock, monkeypatch):
+    scheduler = MotorScheduler()
+    motor = SimulatedMotor(scheduler)
+    tick_us = int(motor.period * 1000000)
+
+    late = [0]
+
+    def sleep(seconds):
+        # time.sleep() returns up to 15 ms late, so it drifts against the control loop ticks
+        late[0] = (late[0] * 7 + 13) % 150
+        for _ in range(int(seconds * 10000) + late[0]):
+            fake_clock.advance(100)
+            motor.physics(0.0001)
+            if fake_clock.us % tick_us == 0:
+                scheduler._tick()
+
+    monkeypatch.setattr(feedforward.time, "sleep", sleep)
+    constants = feedforward.characterize(motor, settle_time=0.3)
+    assert constants["ks"] == pytest.approx(KS, rel=0.05)
+    assert constants["kv"] == pytest.approx(KV, rel=0.05)
+    assert constants["ka"] == pytest.approx(KA, rel=0.15)
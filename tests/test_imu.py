@@ -0,0 +1,142 @@
+import micropython
+import pytest
+
+from XRPcustom.imu import IMU
+
+LSM_REG_OUTZ_L_G = 0x26
+# 2000 dps range: 4.375 mdps/LSB * 16
+MDPS_PER_LSB = 70
+
+
+@pytest.fixture
+def imu(fake_clock):
+    micropython._queue.clear()
+    return IMU(int1_pin=15)
+
+
+def edge(imu, clock, period_us):
+    clock.advance(period_us)
+    imu._int1.fire()
+
+
+def test_data_ready_irq_is_routed_to_pin(imu):
+    assert imu._int1.handler == imu._data_ready_irq
+    assert imu._int1.hard
+
+
+def test_one_sample_integrated_per_edge(imu, fake_clock):
+    imu.i2c.write_int16(LSM_REG_OUTZ_L_G, 1000)
+    for _ in range(5):
+        edge(imu, fake_clock, 4808)
+        # The hard IRQ only schedules the read
+        assert len(micropython._queue) == 1
+        micropython.run_scheduled()
+    expected = 5 * 1000 * MDPS_PER_LSB / 1000 / imu.timer_frequency
+    assert imu.get_yaw() == pytest.approx(expected)
+    assert imu.get_pitch() == 0
+
+
+def test_sample_stats(imu, fake_clock):
+    imu.reset_sample_stats()
+    for period in (4800, 4810, 4805, 4809):
+        edge(imu, fake_clock, period)
+        micropython.run_scheduled()
+    stats = imu.get_sample_stats()
+    assert stats["samples"] == 4
+    assert stats["dropped"] == 0
+    # The first edge only starts the measurement
+    assert stats["min_period_us"] == 4805
+    assert stats["max_period_us"] == 4810
+    assert stats["rate_hz"] == pytest.approx(3 * 1000000 / (4810 + 4805 + 4809))
+
+
+def test_edges_before_the_read_are_dropped(imu, fake_clock):
+    imu.reset_sample_stats()
+    for _ in range(3):
+        edge(imu, fake_clock, 4808)
+    assert len(micropython._queue) == 1
+    micropython.run_scheduled()
+    edge(imu, fake_clock, 4808)
+    micropython.run_scheduled()
+    stats = imu.get_sample_stats()
+    assert stats["samples"] == 2
+    assert stats["dropped"] == 2
+    # Periods are measured between the edges that were read
+    assert stats["min_period_us"] == 3 * 4808
+
+
+def test_dropped_when_schedule_queue_is_full(imu, fake_clock, monkeypatch):
+    monkeypatch.setattr(micropython, "SCHEDULE_DEPTH", 0)
+    imu.reset_sample_stats()
+    edge(imu, fake_clock, 4808)
+    monkeypatch.setattr(micropython, "SCHEDULE_DEPTH", 8)
+    edge(imu, fake_clock, 4808)
+    micropython.run_scheduled()
+    stats = imu.get_sample_stats()
+    assert stats["samples"] == 1
+    assert stats["dropped"] == 1
+
+
+def test_stats_need_two_samples(imu, fake_clock):
+    imu.reset_sample_stats()
+    edge(imu, fake_clock, 4808)
+    micropython.run_scheduled()
+    assert imu.get_sample_stats() == {"samples": 1, "dropped": 0, "rate_hz": 0, "min_period_us": 0, "max_period_us": 0}
+
+
+def test_background_update_does_not_corrupt_foreground_reads(fake_clock, monkeypatch):
+    imu = IMU()
+    i2c = imu.i2c
+    i2c.write_int16(0x28, 1000)              # acc x
+    i2c.write_int16(0x22, -2000)             # gyro x
+    read = i2c.readfrom_mem_into
+    in_update = []
+
+    def read_then_interrupt(addr, reg, buf):
+        # The background sampler runs right after every foreground read
+        read(addr, reg, buf)
+        if not in_update:
+            in_update.append(True)
+            imu._update_imu_readings()
+            in_update.pop()
+
+    monkeypatch.setattr(i2c, "readfrom_mem_into", read_then_interrupt)
+    # 16 g range: 0.061 mg/LSB * 8
+    assert imu.get_acc_x() == pytest.approx(1000 * 0.061 * 8)
+    acc, gyro = imu.get_acc_gyro_rates()
+    assert acc[0] == pytest.approx(1000 * 0.061 * 8)
+    assert gyro[0] == pytest.approx(-2000 * MDPS_PER_LSB)
+
+
+def test_angles_integrate_in_integer_sums(fake_clock):
+    imu = IMU()
+    imu.i2c.write_int16(LSM_REG_OUTZ_L_G, 1000)
+    for _ in range(10):
+        imu._update_imu_readings()
+    # The sampling path only adds integers; the getter converts
+    assert imu.running_yaw == 0
+    assert imu._gyro_sums[2] == 10 * 1000 * MDPS_PER_LSB * 8
+    expected = 10 * 1000 * MDPS_PER_LSB / 1000 / imu.timer_frequency
+    assert imu.get_yaw() == pytest.approx(expected)
+    assert imu._gyro_sums[2] == 0
+
+
+def test_large_sums_are_folded(fake_clock):
+    imu = IMU()
+    imu.i2c.write_int16(LSM_REG_OUTZ_L_G, 32000)
+    samples = 2000
+    for _ in range(samples):
+        imu._update_imu_readings()
+        assert abs(imu._gyro_sums[2]) <= (1 << 28) + 32000 * MDPS_PER_LSB * 8
+    expected = samples * 32000 * MDPS_PER_LSB / 1000 / imu.timer_frequency
+    assert imu.get_yaw() == pytest.approx(expected)
+
+
+def test_set_yaw_drops_pending_sums(fake_clock):
+    imu = IMU()
+    imu.i2c.write_int16(LSM_REG_OUTZ_L_G, 1000)
+    imu._update_imu_readings()
+    imu.set_yaw(90)
+    assert imu.get_yaw() == 90
+    imu.reset_pitch()
+    assert imu.get_pitch() == 0
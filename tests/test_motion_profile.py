@@ -0,0 +1,76 @@
+import pytest
+
+from XRPcustom.motion_profile import SCurveProfile, TrapezoidalProfile
+
+DT = 0.0005
+
+
+def check_consistent(profile, max_velocity, max_acceleration):
+    times = [i * DT for i in range(int(profile.duration / DT) + 1)] + [profile.duration]
+    points = [profile.sample(t) for t in times]
+    assert points[0][0] == 0
+    assert points[-1][0] == profile.distance
+    for i in range(1, len(points)):
+        (p0, v0, a0), (p1, v1, a1) = points[i - 1], points[i]
+        dt = times[i] - times[i - 1]
+        assert abs(v1) <= max_velocity + 1e-9
+        assert abs(a1) <= max_acceleration + 1e-9
+        # Position is the integral of velocity, velocity the integral of acceleration
+        assert p1 - p0 == pytest.approx((v0 + v1) / 2 * dt, abs=1e-3)
+        assert v1 - v0 == pytest.approx((a0 + a1) / 2 * dt, abs=max_acceleration * DT)
+    return points
+
+
+@pytest.mark.parametrize("distance", [50, -50])
+def test_trapezoid_cruises(distance):
+    profile = TrapezoidalProfile(distance, 20, 40)
+    assert profile.peak_velocity == 20
+    # 0.5 s to accelerate over 5 units, 2 s cruising over 40, 0.5 s to stop
+    assert profile.duration == pytest.approx(3)
+    assert profile.sample(1.5) == pytest.approx((distance / 2, 20 * (1 if distance > 0 else -1), 0))
+    check_consistent(profile, 20, 40)
+
+
+def test_trapezoid_short_distance_lowers_peak():
+    profile = TrapezoidalProfile(4, 20, 40)
+    # Accelerates over half the distance
+    assert profile.peak_velocity == pytest.approx((40 * 4) ** 0.5)
+    assert profile.duration == pytest.approx(2 * profile.peak_velocity / 40)
+    check_consistent(profile, 20, 40)
+
+
+def test_trapezoid_start_and_end_velocity():
+    profile = TrapezoidalProfile(30, 20, 40, start_velocity=10, end_velocity=5)
+    assert profile.sample(0)[1] == 10
+    assert profile.sample(profile.duration)[1] == 5
+    check_consistent(profile, 20, 40)
+
+
+def test_trapezoid_lowers_unreachable_end_velocity():
+    profile = TrapezoidalProfile(5, 50, 10, end_velocity=50)
+    # From rest, 5 units at 10 units/s^2 only reach 10 units/s
+    assert profile.end_velocity == pytest.approx(10)
+    check_consistent(profile, 50, 10)
+
+
+@pytest.mark.parametrize("distance", [100, -100, 3])
+def test_s_curve_limits(distance):
+    profile = SCurveProfile(distance, 30, 60, 300)
+    points = check_consistent(profile, 30, 60)
+    assert points[-1][1] == 0 and points[-1][2] == 0
+    # The acceleration changes at most at max_jerk
+    for (_, _, a0), (_, _, a1) in zip(points, points[1:]):
+        assert abs(a1 - a0) <= 300 * DT + 1e-9
+
+
+def test_s_curve_reaches_max_velocity_on_long_moves():
+    profile = SCurveProfile(100, 30, 60, 300)
+    assert profile.peak_velocity == 30
+    assert profile.sample(profile.duration / 2)[1] == pytest.approx(30)
+
+
+def test_s_curve_short_move_lowers_peak():
+    profile = SCurveProfile(3, 30, 60, 300)
+    assert profile.peak_velocity < 30
+    # Acceleration and deceleration cover the whole distance
+    assert profile._t_cruise == pytest.approx(0, abs=1e-6)
@@ -0,0 +1,68 @@
+import math
+
+import pytest
+
+from XRPcustom.motion_queue import arc, plan, straight, turn
+
+TRACK_WIDTH = 15.5
+
+
+def joint_velocities(planned):
+    return [p.profile.end_velocity for p in planned]
+
+
+def test_segment_lengths_and_ratios():
+    planned = plan([straight(-20), turn(90), arc(20, -45)], TRACK_WIDTH, 30, 50)
+    assert [(p.length, p.kl, p.kr) for p in planned] == pytest.approx([
+        (20, -1, -1),
+        (math.pi * TRACK_WIDTH / 4, -1, 1),
+        (math.pi * (20 + TRACK_WIDTH / 2) / 4, 1, (20 - TRACK_WIDTH / 2) / (20 + TRACK_WIDTH / 2)),
+    ])
+
+
+def test_empty_segments_are_dropped():
+    assert len(plan([straight(0), turn(0), straight(10)], TRACK_WIDTH, 30, 50)) == 1
+
+
+def test_unknown_or_invalid_segment_raises():
+    with pytest.raises(ValueError):
+        plan([arc(0, 90)], TRACK_WIDTH, 30, 50)
+    with pytest.raises(ValueError):
+        plan([("spin", 90)], TRACK_WIDTH, 30, 50)
+
+
+def test_straights_are_joined_at_full_speed():
+    planned = plan([straight(50), straight(50)], TRACK_WIDTH, 30, 50)
+    assert joint_velocities(planned) == pytest.approx([30, 0])
+    assert planned[1].profile.start_velocity == pytest.approx(30)
+
+
+def test_turn_in_place_slows_down_to_the_corner_jump():
+    planned = plan([straight(50), turn(90), straight(50)], TRACK_WIDTH, 30, 50, max_corner_jump=5)
+    # The inner wheel reverses: its speed jumps by twice the joint speed
+    assert joint_velocities(planned) == pytest.approx([2.5, 2.5, 0])
+
+
+def test_wide_arc_keeps_most_of_the_speed():
+    planned = plan([straight(50), arc(100, 90), straight(50)], TRACK_WIDTH, 30, 50, max_corner_jump=5)
+    jump = 1 - (100 - TRACK_WIDTH / 2) / (100 + TRACK_WIDTH / 2)
+    assert joint_velocities(planned)[0] == pytest.approx(min(30, 5 / jump))
+    assert joint_velocities(planned)[0] > 25
+
+
+def test_joints_respect_acceleration():
+    # Too short to reach full speed, or to brake from it
+    planned = plan([straight(2), straight(50), straight(2)], TRACK_WIDTH, 30, 50)
+    assert joint_velocities(planned) == pytest.approx([math.sqrt(2 * 50 * 2), math.sqrt(2 * 50 * 2), 0], abs=1e-6)
+
+
+def test_wheel_speeds_are_continuous_within_the_corner_jump():
+    segments = [straight(30), arc(20, 90), straight(10), turn(-90), arc(40, -45), straight(20)]
+    planned = plan(segments, TRACK_WIDTH, 30, 50, max_corner_jump=5)
+    assert planned[0].profile.start_velocity == 0
+    assert planned[-1].profile.end_velocity == 0
+    for p, q in zip(planned, planned[1:]):
+        v = p.profile.end_velocity
+        assert q.profile.start_velocity == pytest.approx(v)
+        assert abs(p.kl - q.kl) * v <= 5 + 1e-9
+        assert abs(p.kr - q.kr) * v <= 5 + 1e-9
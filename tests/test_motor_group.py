@@ -0,0 +1,48 @@
+import pytest
+
+from XRPcustom.battery import BatteryMonitor
+from XRPcustom.encoded_motor import EncodedMotor
+from XRPcustom.encoder import Encoder
+from XRPcustom.motor import SinglePWMMotor
+from XRPcustom.motor_group import MotorGroup
+from XRPcustom.motor_scheduler import MotorScheduler
+
+
+@pytest.fixture
+def group(fake_clock):
+    scheduler = MotorScheduler()
+    motors = [EncodedMotor(SinglePWMMotor(6 + 2*i, 7 + 2*i), Encoder(i, 2*i, 2*i + 1), scheduler=scheduler) for i in range(2)]
+    return MotorGroup(*motors, scheduler=scheduler)
+
+
+def test_pwm_freq_applies_to_all_motors(group):
+    group.set_pwm_freq(20000)
+    assert [motor._motor.pwm_freq for motor in group.motors] == [20000, 20000]
+
+
+def test_voltage_compensation_applies_to_all_motors(group):
+    battery = BatteryMonitor(vin_pin=28)
+    group.set_voltage_compensation(battery)
+    assert all(motor._motor._battery is battery for motor in group.motors)
+    group.set_voltage_compensation(None)
+    assert all(motor._motor._battery is None for motor in group.motors)
+
+
+def test_feedforward_drives_group_controller(group):
+    group.set_feedforward(0.1, 0.01, 0.001)
+    group.set_speed(30, acceleration=50)
+    assert group.speedController.target_velocity == 30
+    assert group.speedController._feedforward == pytest.approx(0.1 + 0.3 + 0.05)
+    # At the target speed, the effort is the feedforward alone
+    for motor in group.motors:
+        motor.speed = group.target_speed
+    group._control()
+    assert list(group._efforts) == pytest.approx([0.45, 0.45])
+    group.set_speed(0)
+    assert group.speedController._feedforward == 0
+
+
+def test_feedforward_follows_running_target(group):
+    group.set_speed(20)
+    group.set_feedforward(0.1, 0.01)
+    assert group.speedController._feedforward == pytest.approx(0.3)
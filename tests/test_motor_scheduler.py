@@ -0,0 +1,31 @@
+from XRPcustom.motor_scheduler import MotorScheduler
+
+
+class RecordingMotor:
+
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def _set_update_period(self, period):
+        pass
+
+    def _sample(self):
+        self.log.append(("sample", self.name))
+
+    def _estimate_speed(self):
+        self.log.append(("estimate", self.name))
+
+    def _control(self):
+        self.log.append(("control", self.name))
+
+
+def test_all_encoders_are_read_before_any_estimation(fake_clock):
+    log = []
+    scheduler = MotorScheduler()
+    for name in ("left", "right", "three"):
+        scheduler.register(RecordingMotor(name, log))
+    scheduler.add_listener(lambda: log.append(("listener", None)))
+    scheduler._tick()
+    phases = [phase for phase, _ in log]
+    assert phases == ["sample"]*3 + ["estimate"]*3 + ["control"]*3 + ["listener"]
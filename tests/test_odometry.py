@@ -0,0 +1,56 @@
+import math
+
+import pytest
+
+from XRPcustom.imu import IMU
+from XRPcustom.motor_scheduler import MotorScheduler
+from XRPcustom.odometry import Odometry
+
+
+class FakeEncoder:
+    resolution = 585
+
+
+class FakeMotor:
+
+    def __init__(self, scheduler):
+        self._encoder = FakeEncoder()
+        self._scheduler = scheduler
+        self.last_delta = 0
+
+
+@pytest.fixture
+def setup(fake_clock):
+    scheduler = MotorScheduler()
+    left, right = FakeMotor(scheduler), FakeMotor(scheduler)
+    imu = IMU()
+    odometry = Odometry(left, right, 6, 15.5, imu)
+    return odometry, left, right, imu
+
+
+def test_heading_follows_imu(setup):
+    odometry, left, right, imu = setup
+    imu.running_yaw += 30
+    odometry.update()
+    assert odometry.get_heading() == pytest.approx(30)
+
+
+@pytest.mark.parametrize("change", [lambda imu: imu.reset_yaw(), lambda imu: imu.set_yaw(-120)])
+def test_yaw_reset_does_not_rotate_pose(setup, change):
+    odometry, left, right, imu = setup
+    imu.running_yaw += 45
+    odometry.update()
+    change(imu)
+    # Driving straight while the yaw is reset
+    left.last_delta = right.last_delta = 100
+    odometry.update()
+    x, y, heading = odometry.get_pose()
+    assert heading == pytest.approx(45)
+    distance = 100 * math.pi * 6 / 585
+    assert x == pytest.approx(distance * math.cos(math.radians(45)))
+    assert y == pytest.approx(distance * math.sin(math.radians(45)))
+    # Later changes are integrated from the new yaw
+    left.last_delta = right.last_delta = 0
+    imu.running_yaw += 10
+    odometry.update()
+    assert odometry.get_heading() == pytest.approx(55)
@@ -0,0 +1,60 @@
+import pytest
+
+from XRPcustom.pid import PID
+
+SCHEDULE = [
+    (5, 0.03, 0.003, 0.003),
+    (30, 0.025, 0.003, 0.003),
+    (90, 0.02, 0.003, 0.003),
+]
+
+
+def run(pid, fake_clock, error, steps, dt_us=10000):
+    output = None
+    for _ in range(steps):
+        fake_clock.advance(dt_us)
+        output = pid.update(error)
+    return output
+
+
+@pytest.mark.parametrize("x, kp", [(0, 0.03), (5, 0.03), (17.5, 0.0275), (60, 0.0225), (90, 0.02), (180, 0.02)])
+def test_gain_schedule_interpolates(x, kp):
+    pid = PID(gain_schedule=SCHEDULE)
+    assert pid._scheduled_gains(x)[0] == pytest.approx(kp)
+
+
+@pytest.mark.parametrize("error", [-60, -3, 17.5, 60])
+def test_gain_schedule_uses_abs_error(fake_clock, error):
+    pid = PID(max_output=10, gain_schedule=[(10, 0.04, 0, 0), (100, 0.01, 0, 0)])
+    kp = pid._scheduled_gains(abs(error))[0]
+    assert pid.update(error) == pytest.approx(kp * error)
+
+
+def test_gain_schedule_value(fake_clock):
+    pid = PID(max_output=10, gain_schedule=[(10, 0.04, 0, 0), (100, 0.01, 0, 0)])
+    assert pid.update(50, schedule_value=100) == pytest.approx(0.5)
+
+
+def test_anti_windup_limits_integral_while_saturated(fake_clock):
+    plain = PID(kp=0.01, ki=0.5, max_output=0.5)
+    guarded = PID(kp=0.01, ki=0.5, max_output=0.5, anti_windup=5)
+    assert run(plain, fake_clock, 20, 200) == 0.5
+    assert run(guarded, fake_clock, 20, 200) == 0.5
+    # Without back-calculation, the integral keeps growing for as long as the output is saturated
+    assert plain.prev_integral == pytest.approx(40)
+    # With it, the integral settles where the unwinding balances the error
+    assert guarded.prev_integral < 5
+
+
+def test_anti_windup_recovers_faster(fake_clock):
+    def steps_to_reverse(pid):
+        run(pid, fake_clock, 20, 200)
+        for step in range(1, 5000):
+            fake_clock.advance(10000)
+            if pid.update(-2) < 0:
+                return step
+        return None
+
+    plain = steps_to_reverse(PID(kp=0.01, ki=0.5, max_output=0.5))
+    guarded = steps_to_reverse(PID(kp=0.01, ki=0.5, max_output=0.5, anti_windup=5))
+    assert guarded < plain / 10
@@ -0,0 +1,86 @@
+import math
+
+import pytest
+
+from XRPcustom.pure_pursuit import Path, PurePursuitCommand
+
+STEP_US = 10000
+
+
+class FakeOdometry:
+
+    def __init__(self):
+        self.pose = [0.0, 0.0, 0.0]
+
+    def get_pose(self):
+        x, y, theta = self.pose
+        return x, y, math.degrees(theta)
+
+
+class SimulatedDrivetrain:
+    """
+    Kinematic differential drive: the wheels reach the commanded speeds at once
+    """
+
+    track_width = 15.5
+
+    def __init__(self):
+        self.odometry = FakeOdometry()
+        self.speeds = (0, 0)
+
+    def curvature_drive(self, speed, curvature, acceleration=0):
+        difference = speed*curvature*self.track_width/2
+        self.speeds = (speed - difference, speed + difference)
+
+    def stop(self):
+        self.speeds = (0, 0)
+
+    def get_left_encoder_position(self):
+        return 0
+
+    def get_right_encoder_position(self):
+        return 0
+
+    def move(self, dt):
+        left, right = self.speeds
+        x, y, theta = self.odometry.pose
+        speed = (left + right) / 2
+        theta += (right - left) / self.track_width * dt
+        self.odometry.pose = [x + speed*math.cos(theta)*dt, y + speed*math.sin(theta)*dt, theta]
+
+
+def follow(waypoints, clock, max_steps=5000):
+    drivetrain = SimulatedDrivetrain()
+    command = PurePursuitCommand(drivetrain, waypoints)
+    command.start()
+    steps = 0
+    while not command.step():
+        clock.advance(STEP_US)
+        drivetrain.move(STEP_US / 1000000)
+        steps += 1
+        assert steps < max_steps
+    command.finish()
+    return drivetrain.odometry.get_pose(), steps
+
+
+def test_straight_path(fake_clock):
+    (x, y, heading), steps = follow([(0, 0), (100, 0)], fake_clock)
+    assert steps > 0
+    assert x == pytest.approx(100, abs=1.5)
+    assert y == pytest.approx(0, abs=0.5)
+
+
+def test_path_returning_towards_the_start(fake_clock):
+    # The last segment points back at the start: the robot must not stop before driving the loop
+    (x, y, heading), steps = follow([(0, 0), (50, 0), (50, 50), (0, 50), (0, 10)], fake_clock)
+    assert steps > 100
+    assert x == pytest.approx(0, abs=3)
+    assert y == pytest.approx(10, abs=3)
+
+
+def test_past_end_only_on_last_segment():
+    path = Path([(0, 0), (50, 0), (50, 50), (0, 50), (0, 10)])
+    # The start is beyond the end in the direction of the last segment
+    assert not path.is_past_end(0, 0, 1, 0)
+    assert path.is_past_end(0, 0, 1, 3)
+    assert path.is_past_end(0, 10.5, 1, 0)
@@ -0,0 +1,80 @@
+import pytest
+
+from XRPcustom.motor_scheduler import MotorScheduler
+from XRPcustom.rangefinder import Rangefinder
+
+US_PER_CM = 58.2
+
+
+@pytest.fixture
+def rangefinder(fake_clock):
+    rangefinder = Rangefinder()
+    # The trigger pulse busy-waits on ticks_us, which only moves when the fake clock is advanced
+    rangefinder._delay_us = fake_clock.advance
+    rangefinder.start(scheduler=MotorScheduler())
+    yield rangefinder
+    rangefinder.stop()
+
+
+def ping(rangefinder, fake_clock, cm=None):
+    # One background measurement: a ping, then an echo pulse of the length for cm (none if cm is None)
+    fake_clock.advance(60000)
+    rangefinder._ping()
+    if cm is None:
+        return
+    fake_clock.advance(200)
+    rangefinder.echo.value(1)
+    rangefinder.echo.fire()
+    fake_clock.advance(cm * US_PER_CM)
+    rangefinder.echo.value(0)
+    rangefinder.echo.fire()
+
+
+def test_distance_is_latest_echo(rangefinder, fake_clock):
+    ping(rangefinder, fake_clock, 20)
+    assert rangefinder.distance() == pytest.approx(20, rel=0.01)
+    assert rangefinder.get_reading_count() == 1
+
+
+def test_missed_echo_is_max_value(rangefinder, fake_clock):
+    ping(rangefinder, fake_clock)
+    ping(rangefinder, fake_clock)
+    assert rangefinder.get_reading_count() == 1
+    assert rangefinder.distance() == rangefinder.MAX_VALUE
+
+
+def test_median_ignores_dropouts_and_spikes(rangefinder, fake_clock):
+    for cm in [40, 30, None, 31, 120, 29]:
+        ping(rangefinder, fake_clock, cm)
+    # The oldest reading (40) was pushed out of the history; the dropout is skipped, so the median
+    # of 30, 31, 120 and 29 is the mean of the middle two
+    assert rangefinder.filtered_distance() == pytest.approx(30.5, rel=0.01)
+    # 30, 31 and 29 agree; the dropout and the spike don't
+    assert rangefinder.get_confidence() == pytest.approx(3 / 5)
+
+
+def test_confidence_counts_dropouts(rangefinder, fake_clock):
+    for cm in [30, None, None, 30, 30]:
+        ping(rangefinder, fake_clock, cm)
+    assert rangefinder.filtered_distance() == pytest.approx(30, rel=0.01)
+    assert rangefinder.get_confidence() == pytest.approx(3 / 5)
+
+
+def test_even_count_median(rangefinder, fake_clock):
+    for cm in [20, 22]:
+        ping(rangefinder, fake_clock, cm)
+    assert rangefinder.filtered_distance() == pytest.approx(21, rel=0.01)
+    assert rangefinder.get_confidence() == pytest.approx(2 / 5)
+
+
+def test_stale_readings_are_ignored(rangefinder, fake_clock):
+    for cm in [40, 40, 40]:
+        ping(rangefinder, fake_clock, cm)
+    fake_clock.advance(400000)
+    assert rangefinder.get_age() == pytest.approx(0.4)
+    # Readings come about 62 ms apart, so the oldest one is now more than 0.5 s old
+    assert rangefinder.get_confidence() == pytest.approx(2 / 5)
+    fake_clock.advance(1000000)
+    assert rangefinder.get_confidence() == 0
+    assert rangefinder.get_age() is None
+    assert rangefinder.filtered_distance() == rangefinder.MAX_VALUE
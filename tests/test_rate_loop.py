@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from XRPcustom.rate_loop import RateLoop
+
+
+def run_body(clock, us):
+    clock.advance(us)
+
+
+def test_on_time_iterations_are_not_late(fake_clock):
+    loop = RateLoop(0.01)
+    loop.start()
+    start = time.ticks_us()
+    for _ in range(5):
+        run_body(fake_clock, 3000)
+        loop.wait()
+    # Absolute deadlines: the body time does not add to the period
+    assert time.ticks_diff(time.ticks_us(), start) == 50000
+    assert loop.get_histogram()[0] == 5
+    assert loop.get_stats()["overruns"] == 0
+
+
+def test_overrun_lateness_is_recorded(fake_clock):
+    loop = RateLoop(0.01, bin_width_us=250, bins=16)
+    loop.start()
+    run_body(fake_clock, 11000)
+    loop.wait()
+    stats = loop.get_stats()
+    assert stats["overruns"] == 1
+    assert stats["max_overrun_us"] == 1000
+    assert stats["max_late_us"] == 1000
+    histogram = loop.get_histogram()
+    assert histogram[0] == 0
+    assert histogram[1000 // 250] == 1
+    # The schedule restarts from the late wake-up
+    deadline = time.ticks_us()
+    run_body(fake_clock, 2000)
+    loop.wait()
+    assert time.ticks_diff(time.ticks_us(), deadline) == 10000
+    assert loop.get_histogram()[0] == 1
+
+
+def test_large_overrun_goes_to_last_bin(fake_clock):
+    loop = RateLoop(0.01, bin_width_us=250, bins=16)
+    loop.start()
+    run_body(fake_clock, 50000)
+    loop.wait()
+    assert loop.get_histogram()[15] == 1
+    assert loop.get_stats()["mean_late_us"] == pytest.approx(40000)
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+import pytest
+
+from XRPcustom import runtime
+
+
+@pytest.fixture
+def sleep_ms(fake_clock, monkeypatch):
+    # MicroPython's asyncio.sleep_ms, on the fake clock
+    async def sleep_ms(ms):
+        fake_clock.advance(ms * 1000)
+
+    monkeypatch.setattr(asyncio, "sleep_ms", sleep_ms, raising=False)
+
+
+def test_wait_until_returns_when_condition_is_true(fake_clock, sleep_ms):
+    start = time.ticks_us()
+    done = lambda: time.ticks_diff(time.ticks_us(), start) >= 55000
+    assert asyncio.run(runtime.wait_until(done, period=0.01, timeout=1)) is True
+    assert time.ticks_diff(time.ticks_us(), start) == 60000
+
+
+def test_wait_until_times_out(fake_clock, sleep_ms):
+    start = time.ticks_us()
+    assert asyncio.run(runtime.wait_until(lambda: False, period=0.01, timeout=0.5)) is False
+    assert time.ticks_diff(time.ticks_us(), start) == 500000
+
+
+def test_wait_until_timeout_counts_time_not_checks(fake_clock, sleep_ms):
+    calls = [0]
+
+    def slow_condition():
+        # Takes three periods, e.g. a blocking sensor read
+        calls[0] += 1
+        fake_clock.advance(30000)
+        return False
+
+    start = time.ticks_us()
+    assert asyncio.run(runtime.wait_until(slow_condition, period=0.01, timeout=0.5)) is False
+    assert time.ticks_diff(time.ticks_us(), start) < 550000
+    assert calls[0] == 17
+
+
+def test_wait_until_without_timeout_waits(fake_clock, sleep_ms):
+    calls = [0]
+
+    def condition():
+        calls[0] += 1
+        return calls[0] > 500
+
+    assert asyncio.run(runtime.wait_until(condition, period=0.01)) is True
+    assert calls[0] == 501
@@ -0,0 +1,64 @@
+import pytest
+
+from XRPcustom.servo import Servo
+from XRPcustom.servo_motion import ServoMotion
+
+
+@pytest.fixture
+def servo(fake_clock):
+    engine = ServoMotion()
+    servo = Servo(16, engine=engine)
+    servo.set_angle(0)
+    return servo
+
+
+def run(servo, ticks):
+    for _ in range(ticks):
+        servo._engine._tick()
+
+
+def test_on_done_after_finished_move(servo):
+    done = []
+    servo.move_to(90, on_done=done.append)
+    run(servo, 10)
+    assert done == []
+    run(servo, 200)
+    assert servo.is_done()
+    assert servo.get_angle() == 90
+    assert done == [servo]
+
+
+@pytest.mark.parametrize("cancel", [
+    lambda servo: servo.stop(),
+    lambda servo: servo.set_angle(45),
+    lambda servo: servo.free(),
+])
+def test_cancelled_move_does_not_call_on_done(servo, cancel):
+    done = []
+    servo.move_to(180, on_done=done.append)
+    run(servo, 10)
+    cancel(servo)
+    run(servo, 200)
+    assert done == []
+
+
+def test_on_done_for_first_move(fake_clock):
+    # The first move jumps to the angle, and still reports completion
+    servo = Servo(16, engine=ServoMotion())
+    done = []
+    servo.move_to(30, on_done=done.append)
+    run(servo, 1)
+    assert done == [servo]
+
+
+def test_move_chained_from_on_done(servo):
+    servo.move_to(10, on_done=lambda s: s.move_to(0))
+    engine = servo._engine
+    # Run the engine like its timer would: only while it is running
+    for _ in range(500):
+        if not engine._running:
+            break
+        engine._tick()
+    assert servo.is_done()
+    assert servo.get_angle() == 0
+    assert not engine._running